@@ -0,0 +1,305 @@
+import concurrent.futures
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+
+import assetsync
+import manifest
+import pagewriter
+import patterns
+
+try:
+    from compression import zstd  # python 3.14+, brotli has no stdlib module at all
+except ImportError:
+    zstd = None
+
+# the pipeline reads a built site (docs/) and writes a copy for a caching CDN: fingerprinted asset names,
+# minified html and css, and precompressed siblings. docs/ itself is never changed, so incremental builds keep working
+ASSETS_CACHE_VERSION = 1
+
+# assets that get a name.<hash>.ext copy, html keeps its url
+FINGERPRINT_TYPES = {".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif", ".ico", ".woff", ".woff2"}
+# text formats worth a precompressed sibling, images and fonts are compressed already
+COMPRESS_TYPES = {".html", ".css", ".js", ".svg", ".json", ".xml", ".txt"}
+
+def fingerprint_name(rel_path, content_hash):
+    """index.css -> index.1a2b3c4d.css, from the sha256 hex digest of the bytes served under that name"""
+    root, ext = posixpath.splitext(rel_path)
+    return f"{root}.{content_hash[:8]}{ext}"
+
+def compressed_siblings(data):
+    """(suffix, bytes) for every stdlib compressor whose output is smaller than data"""
+    siblings = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if zstd is not None:
+        siblings.append((".zst", zstd.compress(data, level=19)))
+    return [(suffix, packed) for suffix, packed in siblings if len(packed) < len(data)]
+
+def _squeeze_css(code):
+    code = patterns.WHITESPACE.sub(" ", code)
+    code = patterns.CSS_PUNCTUATION_SPACE.sub(lambda m: m.group(1) or ":", code)
+    return code.replace(";}", "}")
+
+def _string_end(text, quote, pos):
+    """index after the quote that closes a css string opened before pos, len(text) when it never closes"""
+    while True:
+        end = text.find(quote, pos)
+        if end == -1:
+            return len(text)
+        backslashes = 0
+        while text[end - 1 - backslashes] == "\\":
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return end + 1
+        pos = end + 1
+
+def minify_css(text):
+    """drops comments (except /*! notices) and whitespace css does not need, strings are kept as they are"""
+    out = []
+    pos = 0
+    while True:
+        region = patterns.CSS_REGION_OPEN.search(text, pos)
+        if region is None:
+            out.append(_squeeze_css(text[pos:]))
+            break
+        out.append(_squeeze_css(text[pos:region.start()]))
+        if region.group() == "/*":
+            end = text.find("*/", region.end())
+            end = len(text) if end == -1 else end + 2
+            if text.startswith("/*!", region.start()):
+                out.append(text[region.start():end])
+        else:
+            end = _string_end(text, region.group(), region.end())
+            out.append(text[region.start():end])
+        pos = end
+    return "".join(out).strip()
+
+def _collapse_space(match):
+    return "\n" if "\n" in match.group() else " "
+
+def minify_html(text):
+    """
+    collapses whitespace runs to one space (one newline when the run held one) and drops comments.
+    pre, code, textarea, script and style keep their content, conditional comments are kept
+    """
+    out = []
+    pos = 0
+    while pos < len(text):
+        tag = patterns.HTML_PRESERVED_OPEN.search(text, pos)
+        comment = text.find("<!--", pos)
+        if tag is None and comment == -1:
+            out.append(patterns.WHITESPACE.sub(_collapse_space, text[pos:]))
+            break
+        if comment != -1 and (tag is None or comment < tag.start()):
+            out.append(patterns.WHITESPACE.sub(_collapse_space, text[pos:comment]))
+            end = text.find("-->", comment + 4)
+            end = len(text) if end == -1 else end + 3
+            if text.startswith("<!--[if", comment):
+                out.append(text[comment:end])
+        else:
+            out.append(patterns.WHITESPACE.sub(_collapse_space, text[pos:tag.start()]))
+            close = patterns.HTML_PRESERVED_CLOSE[tag.group(1).lower()].search(text, tag.end())
+            # an unclosed region runs to the end, like it does in a browser
+            end = len(text) if close is None else close.end()
+            out.append(text[tag.start():end])
+        pos = end
+    return "".join(out)
+
+def asset_path(url, from_dir, base_path):
+    """the path under the site root a url points at, None for urls of other sites, data: and the like"""
+    if not url or "://" in url or url.startswith(("//", "#", "data:", "mailto:", "javascript:")):
+        return None
+    path = url.split("#", 1)[0].split("?", 1)[0]
+    if path.startswith(base_path):
+        path = path[len(base_path):]
+    elif path.startswith("/"):
+        path = path[1:]
+    else:
+        path = posixpath.join(from_dir, path)
+    return posixpath.normpath(path)
+
+def rewrite_url(url, from_dir, base_path, names):
+    """url with its file name swapped for the fingerprinted one, unchanged when it is no fingerprinted asset"""
+    fingerprinted = names.get(asset_path(url, from_dir, base_path))
+    if fingerprinted is None:
+        return url
+    # only the last path segment differs, the base path, query and fragment stay as written
+    end = len(url.split("#", 1)[0].split("?", 1)[0])
+    folder = url[:end].rpartition("/")[0]
+    name = posixpath.basename(fingerprinted)
+    return f"{folder}/{name}{url[end:]}" if folder or url.startswith("/") else f"{name}{url[end:]}"
+
+def rewrite_srcset(srcset, from_dir, base_path, names):
+    candidates = []
+    for candidate in srcset.split(","):
+        url, space, descriptor = candidate.strip().partition(" ")
+        candidates.append(f"{rewrite_url(url, from_dir, base_path, names)}{space}{descriptor}")
+    return ", ".join(candidates)
+
+def rewrite_html_urls(html, page_rel, base_path, names):
+    from_dir = posixpath.dirname(page_rel)
+
+    def rewrite(match):
+        if match.group(1).endswith("srcset=\""):
+            value = rewrite_srcset(match.group(2), from_dir, base_path, names)
+        else:
+            value = rewrite_url(match.group(2), from_dir, base_path, names)
+        return f"{match.group(1)}{value}{match.group(3)}"
+    return patterns.HTML_URL_ATTRIBUTE.sub(rewrite, html)
+
+def rewrite_css_urls(css, css_rel, base_path, names):
+    from_dir = posixpath.dirname(css_rel)
+    return patterns.CSS_URL.sub(
+        lambda m: f"url({m.group(1)}{rewrite_url(m.group(2), from_dir, base_path, names)}{m.group(1)})", css)
+
+
+class AssetPipeline:
+    """
+    turns the site in src_path into dest_path. Every file is keyed by the hash of its bytes (plus the
+    fingerprinted names it refers to and the base path), files whose key did not change since the last run
+    are skipped without being minified or compressed again, outputs no source produces any more are removed
+    """
+
+    def __init__(self, src_path, dest_path, base_path="/", cache_path=None, threads=None):
+        self.src_path = src_path
+        self.dest_path = dest_path
+        self.base_path = base_path if base_path.endswith("/") else f"{base_path}/"
+        self.cache_path = cache_path
+        self.threads = threads
+        # source path under src_path -> {"key", "outputs", "name"}
+        self.entries = self.load_cache()
+        # source path -> path of its fingerprinted copy
+        self.names = {}
+        self.processed = 0
+        self.cached = 0
+
+    def load_cache(self):
+        if self.cache_path is None or not os.path.isfile(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != ASSETS_CACHE_VERSION:
+            return {}
+        return data.get("files", {})
+
+    def save_cache(self):
+        if self.cache_path is None:
+            return
+        folder = os.path.dirname(self.cache_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            json.dump({"version": ASSETS_CACHE_VERSION, "files": self.entries}, fd, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
+
+    def names_digest(self):
+        """changes whenever any fingerprinted name does, css and html that refer to them are redone then"""
+        return hashlib.sha256(json.dumps(self.names, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def process(self, rel_path, extra_key, transform):
+        """
+        writes one source to dest_path unless its cache entry is current. transform turns the source bytes into
+        the bytes to serve, without one the source is linked as it is. Returns (rel_path, entry, processed)
+        """
+        src = f"{self.src_path}/{rel_path}"
+        ext = posixpath.splitext(rel_path)[1].lower()
+        data = None
+        if transform is None and ext not in COMPRESS_TYPES:
+            # images and fonts are hashed in chunks and never held in memory
+            content_hash = manifest.file_hash(src)
+        else:
+            with open(src, "rb") as fd:
+                data = fd.read()
+            content_hash = hashlib.sha256(data).hexdigest()
+        key = content_hash + extra_key
+        entry = self.entries.get(rel_path)
+        if entry is not None and entry["key"] == key and all(os.path.isfile(f"{self.dest_path}/{out}") for out in entry["outputs"]):
+            return rel_path, entry, False
+
+        if transform is not None:
+            data = transform(data)
+            content_hash = hashlib.sha256(data).hexdigest()
+        names = [rel_path]
+        entry = {"key": key}
+        if ext in FINGERPRINT_TYPES:
+            entry["name"] = fingerprint_name(rel_path, content_hash)
+            names.append(entry["name"])
+        siblings = compressed_siblings(data) if ext in COMPRESS_TYPES else []
+        outputs = []
+        for name in names:
+            dest = f"{self.dest_path}/{name}"
+            if transform is None:
+                # the served bytes are the source bytes, a hardlink costs no space (docs/ files are only ever replaced)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                assetsync.copy_file(src, dest, hardlink=True)
+            else:
+                pagewriter.write_if_changed(dest, data)
+            outputs.append(name)
+            for suffix, packed in siblings:
+                pagewriter.write_if_changed(f"{dest}{suffix}", packed)
+                outputs.append(f"{name}{suffix}")
+        entry["outputs"] = outputs
+        return rel_path, entry, True
+
+    def run_stage(self, jobs):
+        """runs (rel_path, extra_key, transform) jobs on a thread pool, zlib lets go of the GIL while it compresses"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.threads) as pool:
+            results = list(pool.map(lambda job: self.process(*job), jobs))
+        for rel_path, entry, processed in results:
+            self.entries[rel_path] = entry
+            if "name" in entry:
+                self.names[rel_path] = entry["name"]
+            if processed:
+                self.processed += 1
+            else:
+                self.cached += 1
+
+    def run(self):
+        """runs the pipeline, returns the number of files processed, skipped as cached and removed"""
+        sources = []
+        for dir_path, dir_names, file_names in os.walk(self.src_path):
+            dir_names.sort()
+            for name in sorted(file_names):
+                sources.append(os.path.relpath(f"{dir_path}/{name}", self.src_path).replace(os.sep, "/"))
+        kinds = {".html": [], ".css": [], "": []}
+        for rel_path in sources:
+            ext = posixpath.splitext(rel_path)[1].lower()
+            kinds[ext if ext in kinds else ""].append(rel_path)
+
+        # assets first, css refers to them and html to both, so each stage needs the names of the one before
+        self.run_stage([(rel, "", None) for rel in kinds[""]])
+        digest = self.names_digest()
+        self.run_stage([(rel, digest, self.css_transform(rel)) for rel in kinds[".css"]])
+        digest = f"{self.names_digest()}{self.base_path}"
+        self.run_stage([(rel, digest, self.html_transform(rel)) for rel in kinds[".html"]])
+
+        # sources that are gone and outputs no source produces any more
+        for rel_path in set(self.entries) - set(sources):
+            del self.entries[rel_path]
+        outputs = {out for entry in self.entries.values() for out in entry["outputs"]}
+        removed = 0
+        for dir_path, _, file_names in os.walk(self.dest_path):
+            for name in file_names:
+                path = f"{dir_path}/{name}"
+                if os.path.relpath(path, self.dest_path).replace(os.sep, "/") not in outputs:
+                    manifest.remove_output(path)
+                    removed += 1
+        self.save_cache()
+        return {"processed": self.processed, "cached": self.cached, "removed": removed}
+
+    def css_transform(self, rel_path):
+        def transform(data):
+            css = rewrite_css_urls(data.decode("utf-8"), rel_path, self.base_path, self.names)
+            return minify_css(css).encode("utf-8")
+        return transform
+
+    def html_transform(self, rel_path):
+        def transform(data):
+            html = rewrite_html_urls(data.decode("utf-8"), rel_path, self.base_path, self.names)
+            return minify_html(html).encode("utf-8")
+        return transform
@@ -0,0 +1,115 @@
+import concurrent.futures
+import errno
+import os
+import shutil
+
+import manifest
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, reflinks are simply skipped there
+    fcntl = None
+
+# ioctl request that makes dest share the extents of src (btrfs, xfs, bcachefs)
+FICLONE = 0x40049409
+
+def _reflink(src, dest):
+    with open(src, "rb") as fd_src, open(dest, "wb") as fd_dest:
+        fcntl.ioctl(fd_dest.fileno(), FICLONE, fd_src.fileno())
+
+def _copy_file_range(src, dest):
+    with open(src, "rb") as fd_src, open(dest, "wb") as fd_dest:
+        remaining = os.fstat(fd_src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fd_src.fileno(), fd_dest.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+        if remaining > 0:
+            raise OSError(errno.EIO, "copy_file_range stopped early", src)
+
+def _copy(src, dest):
+    shutil.copyfile(src, dest)
+
+def _strategies(hardlink):
+    strategies = []
+    if hardlink:
+        strategies.append(os.link)
+    if fcntl is not None:
+        strategies.append(_reflink)
+    if hasattr(os, "copy_file_range"):
+        strategies.append(_copy_file_range)
+    strategies.append(_copy)
+    return strategies
+
+def copy_file(src, dest, hardlink=False):
+    """
+    copies src to dest with the cheapest mechanism the filesystem allows: a hardlink (only when asked for,
+    the copy then shares its bytes with static/), a reflink, copy_file_range, then a plain copy.
+    The copy replaces dest atomically and keeps the permission bits of src
+    """
+    tmp_path = f"{dest}.tmp"
+    for strategy in _strategies(hardlink):
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            strategy(src, tmp_path)
+        except OSError:
+            # unsupported here (other filesystem, old kernel), fall through to the next mechanism
+            if strategy is _copy:
+                raise
+            continue
+        if strategy is not os.link:
+            shutil.copymode(src, tmp_path)
+        os.replace(tmp_path, dest)
+        if strategy is os.link and os.path.lexists(tmp_path):
+            # rename does nothing when both names already link the same file
+            os.remove(tmp_path)
+        return strategy.__name__.lstrip("_")
+
+def _sync_one(src, dest, known_hash, hardlink):
+    """hashes a changed asset and copies it unless the copy already holds the same bytes"""
+    content_hash = manifest.file_hash(src)
+    if content_hash == known_hash and os.path.isfile(dest) and os.path.getsize(dest) == os.path.getsize(src):
+        # only the mtime moved (touch, checkout), nothing to copy
+        return content_hash, False
+    copy_file(src, dest, hardlink)
+    return content_hash, True
+
+def sync_static(static_path, dest_path, build_manifest, threads=None, hardlink=False):
+    """
+    mirrors static_path into dest_path. Assets whose size and mtime match the manifest are skipped
+    without being read, changed ones are copied on a thread pool and copies of deleted assets are removed.
+    Returns the list of copied source paths
+    """
+    build_manifest.seen_static.clear()
+    pending = []
+    for dir_path, dir_names, file_names in os.walk(static_path):
+        dir_names.sort()
+        rel_dir = os.path.relpath(dir_path, static_path)
+        out_dir = dest_path if rel_dir == "." else f"{dest_path}/{rel_dir}"
+        os.makedirs(out_dir, exist_ok=True)
+        for name in sorted(file_names):
+            src = f"{dir_path}/{name}"
+            dest = f"{out_dir}/{name}"
+            stat = os.stat(src)
+            if not build_manifest.static_unchanged(src, stat.st_size, stat.st_mtime_ns, dest):
+                pending.append((src, dest, stat))
+
+    def work(item):
+        src, dest, _ = item
+        return _sync_one(src, dest, build_manifest.static_hash(src), hardlink)
+
+    if len(pending) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(work, pending))
+    else:
+        results = [work(item) for item in pending]
+
+    copied = []
+    for (src, dest, stat), (content_hash, did_copy) in zip(pending, results):
+        build_manifest.record_static(src, content_hash, dest, stat.st_size, stat.st_mtime_ns)
+        if did_copy:
+            copied.append(src)
+    build_manifest.prune_static()
+    return copied
@@ -0,0 +1,252 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import highlight
+import utils
+
+# usage: python3 src/bench.py [--corpus NAME ...] [--pages N] [--blocks N] [--output FILE] [--compare OLD.json]
+
+TEMPLATE = '<!doctype html>\n<html>\n<head><title>{{ Title }}</title><link href="/index.css" rel="stylesheet" /></head>\n<body><article>{{ Content }}</article></body>\n</html>'
+
+STAGES = ["markdown_to_blocks", "block_to_block_type", "text_to_textnodes", "highlight", "markdown_to_html_node", "to_html", "generate_page", "write"]
+# fence languages of the generated code blocks, "" leaves a block unhighlighted
+CODE_LANGUAGES = ["", "python", "js", "sh"]
+
+def words(rnd, count):
+    return " ".join(rnd.choice(["middle", "earth", "ring", "elf", "dwarf", "hobbit", "wizard", "shire", "road", "tower"]) for _ in range(count))
+
+def paragraph(rnd, count, links=0.05):
+    """a paragraph of count words with some inline markdown, links is the share of words that are links"""
+    parts = []
+    for i in range(count):
+        roll = rnd.random()
+        if roll < links:
+            parts.append(f"[{words(rnd, 2)}](/page/{rnd.randint(0, 999)})")
+        elif roll < links + 0.04:
+            parts.append(f"**{words(rnd, 1)}**")
+        elif roll < links + 0.08:
+            parts.append(f"_{words(rnd, 1)}_")
+        elif roll < links + 0.10:
+            parts.append(f"`{words(rnd, 1)}`")
+        else:
+            parts.append(words(rnd, 1))
+    return " ".join(parts)
+
+def code(rnd):
+    """a few lines that every lexer finds tokens in: keywords, strings, numbers and comments"""
+    return "\n".join(f'if {words(rnd, 1)} in "{words(rnd, 2)}": return {rnd.randint(0, 99)}  # {words(rnd, 3)} *not* _inline_' for _ in range(rnd.randint(2, 6)))
+
+def unordered(rnd, items, links=0.05):
+    return "\n".join(f"- {paragraph(rnd, rnd.randint(3, 12), links)}" for _ in range(items))
+
+def ordered(rnd, items):
+    return "\n".join(f"{i}. {paragraph(rnd, rnd.randint(3, 12))}" for i in range(1, items + 1))
+
+def page(rnd, blocks, links=0.05, lists=0.15):
+    """a markdown page with a title and `blocks` blocks of mixed types"""
+    parts = [f"# {words(rnd, 4)}"]
+    for _ in range(blocks):
+        roll = rnd.random()
+        if roll < lists:
+            parts.append(unordered(rnd, rnd.randint(3, 9), links) if rnd.random() < 0.5 else ordered(rnd, rnd.randint(3, 9)))
+        elif roll < lists + 0.10:
+            parts.append(f"## {words(rnd, 3)}")
+        elif roll < lists + 0.14:
+            parts.append(f"> {paragraph(rnd, 20)}\n> {paragraph(rnd, 10)}")
+        elif roll < lists + 0.17:
+            parts.append(f"```{rnd.choice(CODE_LANGUAGES)}\n{code(rnd)}\n```")
+        else:
+            parts.append(paragraph(rnd, rnd.randint(20, 80), links))
+    return "\n\n".join(parts)
+
+def corpus_small(rnd, pages, blocks):
+    """many small pages"""
+    return [page(rnd, rnd.randint(5, 15)) for _ in range(pages)]
+
+def corpus_huge(rnd, pages, blocks):
+    """a few huge pages"""
+    return [page(rnd, blocks) for _ in range(max(1, pages // 100))]
+
+def corpus_links(rnd, pages, blocks):
+    """link heavy pages, like an index of posts"""
+    return [page(rnd, rnd.randint(5, 15), links=0.5) for _ in range(pages)]
+
+def corpus_lists(rnd, pages, blocks):
+    """list heavy pages"""
+    return [page(rnd, rnd.randint(5, 15), lists=0.8) for _ in range(pages)]
+
+CORPORA = {"small": corpus_small, "huge": corpus_huge, "links": corpus_links, "lists": corpus_lists}
+
+def inline_inputs(block, block_type):
+    """the strings block_to_html_parent_node hands to text_to_textnodes for one block"""
+    if block_type == utils.BlockType.PARAGRAPH:
+        return [block]
+    if block_type == utils.BlockType.CODE:
+        # code never goes through the inline splitter
+        return []
+    _, text = utils.block_to_simple_text(block, block_type)
+    if block_type in (utils.BlockType.UNORDERED, utils.BlockType.ORDERED):
+        return text.splitlines()
+    return [text]
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def bench_corpus(pages):
+    """times every pipeline stage over the pages and returns the seconds per stage"""
+    blocks = [utils.markdown_to_blocks(markdown) for markdown in pages]
+    typed = [(block, utils.block_to_block_type(block)) for page_blocks in blocks for block in page_blocks]
+    inline = [text for block, block_type in typed for text in inline_inputs(block, block_type)]
+    code_blocks = [utils.split_code_block(block) for block, block_type in typed if block_type == utils.BlockType.CODE]
+    nodes = [utils.markdown_to_html_node(markdown) for markdown in pages]
+    html = [node.to_html() for node in nodes]
+
+    seconds = {
+        "markdown_to_blocks": timed(lambda: [utils.markdown_to_blocks(markdown) for markdown in pages]),
+        "block_to_block_type": timed(lambda: [utils.block_to_block_type(block) for block, _ in typed]),
+        "text_to_textnodes": timed(lambda: [utils.text_to_textnodes(text) for text in inline]),
+        # without the highlight cache, every block is tokenized
+        "highlight": timed(lambda: [highlight.highlight(language, code) for language, code in code_blocks]),
+        "markdown_to_html_node": timed(lambda: [utils.markdown_to_html_node(markdown) for markdown in pages]),
+        "to_html": timed(lambda: [node.to_html() for node in nodes]),
+    }
+
+    with tempfile.TemporaryDirectory() as root:
+        template_path = f"{root}/template.html"
+        with open(template_path, "w", encoding="utf-8") as fd:
+            fd.write(TEMPLATE)
+        for i, markdown in enumerate(pages):
+            with open(f"{root}/page{i}.md", "w", encoding="utf-8") as fd:
+                fd.write(markdown)
+
+        def generate():
+            for i in range(len(pages)):
+                utils.generate_page(f"{root}/page{i}.md", template_path, f"{root}/out/page{i}.html", "/site/")
+
+        def write():
+            for i, page_html in enumerate(html):
+                with open(f"{root}/raw{i}.html", "w", encoding="utf-8") as fd:
+                    fd.write(page_html)
+
+        os.mkdir(f"{root}/out")
+        # generate_page logs every page, keep that out of the measurement
+        level = utils.logger.level
+        utils.logger.setLevel(logging.WARNING)
+        try:
+            seconds["generate_page"] = timed(generate)
+        finally:
+            utils.logger.setLevel(level)
+        seconds["write"] = timed(write)
+    return seconds
+
+def peak_memory(pages):
+    """peak traced allocation while rendering the biggest page of the corpus"""
+    biggest = max(pages, key=len)
+    tracemalloc.start()
+    utils.markdown_to_html_node(biggest).to_html()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def import_time(module):
+    """
+    microseconds `python -X importtime` spends importing module from src/, with its heaviest imports.
+    The import runs twice so the measured one does not include writing bytecode caches
+    """
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(2):
+        stderr = subprocess.run(command, cwd=src_dir, capture_output=True, text=True, check=True).stderr
+    # lines read "import time: self [us] | cumulative | imported package", nested imports are indented
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    heaviest = sorted(((name, us) for name, us in times.items() if name != module), key=lambda item: item[1], reverse=True)[:5]
+    return {"microseconds": times.get(module), "heaviest": [{"module": name, "microseconds": us} for name, us in heaviest]}
+
+def run(corpora, page_count, blocks, seed):
+    """runs the benchmark for every named corpus and returns the report as a dict"""
+    report = {"commit": git_commit(), "python": platform.python_version(), "pages": page_count, "blocks": blocks, "seed": seed, "corpora": {}}
+    for name in corpora:
+        pages = CORPORA[name](random.Random(seed), page_count, blocks)
+        size_mb = sum(len(markdown.encode("utf-8")) for markdown in pages) / 1e6
+        stages = {}
+        for stage, seconds in bench_corpus(pages).items():
+            stages[stage] = {
+                "seconds": round(seconds, 6),
+                "pages_per_s": round(len(pages) / seconds, 2) if seconds else None,
+                "mb_per_s": round(size_mb / seconds, 3) if seconds else None,
+            }
+        report["corpora"][name] = {"pages": len(pages), "mb": round(size_mb, 3), "peak_memory_bytes": peak_memory(pages), "stages": stages}
+    # startup cost of the CLI and of the renderer, the part short preview builds are dominated by
+    report["import_time"] = {module: import_time(module) for module in ["main", "utils"]}
+    # ru_maxrss is in KiB on Linux
+    report["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
+
+def compare(report, old_report):
+    """lines of per-stage throughput ratios of report over old_report, > 1.0 means faster now"""
+    lines = []
+    for name, corpus in report["corpora"].items():
+        old_corpus = old_report.get("corpora", {}).get(name)
+        if old_corpus is None:
+            continue
+        for stage, result in corpus["stages"].items():
+            old_result = old_corpus["stages"].get(stage)
+            # MB/s is compared so runs with a different corpus size still line up
+            if old_result and old_result["mb_per_s"] and result["mb_per_s"]:
+                lines.append(f"{name:<6} {stage:<22} {result['mb_per_s'] / old_result['mb_per_s']:6.2f}x")
+    for module, result in report.get("import_time", {}).items():
+        old_result = old_report.get("import_time", {}).get(module)
+        # import time is compared old over new, so > 1.0 also means faster startup
+        if old_result and old_result["microseconds"] and result["microseconds"]:
+            lines.append(f"import {module:<22} {old_result['microseconds'] / result['microseconds']:6.2f}x")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the markdown to html pipeline on synthetic corpora")
+    parser.add_argument("--corpus", nargs="+", choices=sorted(CORPORA), default=sorted(CORPORA), help="corpora to run (default: all)")
+    parser.add_argument("--pages", type=int, default=200, help="pages per corpus, the huge corpus makes one page per 100 (default: 200)")
+    parser.add_argument("--blocks", type=int, default=5000, help="blocks per page in the huge corpus (default: 5000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", help="JSON report of an earlier run to print speedups against")
+    args = parser.parse_args()
+
+    report = run(args.corpus, args.pages, args.blocks, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fd:
+            fd.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fd:
+            old_report = json.load(fd)
+        for line in compare(report, old_report):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
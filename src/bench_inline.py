@@ -0,0 +1,68 @@
+import random
+import sys
+import time
+
+import textnode
+import utils
+
+# usage: python3 src/bench_inline.py [paragraphs] [words per paragraph]
+
+def chained_text_to_textnodes(text):
+    """the chained split passes text_to_textnodes used before the single scan, test_utils checks compat mode against it"""
+    nodes = [textnode.TextNode(text, textnode.TextType.NORMAL)]
+    nodes = utils.split_nodes_delimiter(nodes, "**", textnode.TextType.BOLD)
+    nodes = utils.split_nodes_delimiter(nodes, "*", textnode.TextType.ITALIC)
+    nodes = utils.split_nodes_delimiter(nodes, "`", textnode.TextType.CODE)
+    nodes = utils.split_nodes_delimiter(nodes, "_", textnode.TextType.ITALIC)
+    nodes = utils.splite_node_images(nodes)
+    return utils.splite_node_links(nodes)
+
+def generate_paragraph(rnd, words):
+    """builds one long paragraph sprinkled with every kind of inline markdown"""
+    parts = []
+    for i in range(words):
+        roll = rnd.random()
+        if roll < 0.05:
+            parts.append(f"**bold{i}**")
+        elif roll < 0.10:
+            parts.append(f"_italic{i}_")
+        elif roll < 0.13:
+            parts.append(f"`code{i}`")
+        elif roll < 0.16:
+            parts.append(f"[link{i}](/page/{i})")
+        elif roll < 0.17:
+            parts.append(f"![image{i}](/images/{i}.png)")
+        else:
+            parts.append(f"word{i}")
+    return " ".join(parts)
+
+def time_it(func, paragraphs):
+    start = time.perf_counter()
+    for paragraph in paragraphs:
+        func(paragraph)
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    words = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rnd = random.Random(0)
+    paragraphs = [generate_paragraph(rnd, words) for _ in range(count)]
+    size_mb = sum(len(p) for p in paragraphs) / 1e6
+
+    # both paths must agree before their timings mean anything
+    for paragraph in paragraphs:
+        if utils.text_to_textnodes(paragraph) != chained_text_to_textnodes(paragraph):
+            raise Exception("single scan and chained passes disagree")
+
+    results = [
+        ("chained passes", time_it(chained_text_to_textnodes, paragraphs)),
+        ("single scan (compat)", time_it(utils.text_to_textnodes, paragraphs)),
+        ("single scan (strict)", time_it(lambda p: utils.text_to_textnodes(p, compat=False), paragraphs)),
+    ]
+    print(f"{count} paragraphs x {words} words ({size_mb:.2f} MB)")
+    for name, seconds in results:
+        print(f"{name:<22} {seconds:8.3f}s {size_mb / seconds:8.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
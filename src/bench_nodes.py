@@ -0,0 +1,70 @@
+import random
+import sys
+import tracemalloc
+
+import textnode
+import utils
+
+# usage: python3 src/bench_nodes.py [blocks]
+
+class DictTextNode:
+    """a TextNode as it was before __slots__, used as the per-node baseline"""
+
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+class DictHTMLNode:
+    """an HTMLNode as it was before __slots__, used as the per-node baseline"""
+
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+def node_size(node):
+    """bytes held by the node object itself, including its __dict__ when it has one"""
+    size = sys.getsizeof(node)
+    if hasattr(node, "__dict__"):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+def generate_document(rnd, blocks):
+    """builds a markdown document of mixed paragraphs, headings and lists"""
+    parts = ["# Generated"]
+    for i in range(blocks):
+        roll = rnd.random()
+        if roll < 0.1:
+            parts.append(f"## Section {i}")
+        elif roll < 0.3:
+            parts.append("\n".join(f"- item **{j}** of [list](/list/{i})" for j in range(5)))
+        else:
+            parts.append(f"Paragraph {i} with **bold**, _italic_, `code` and a [link](/page/{i % 100}). Read more.")
+    return "\n\n".join(parts)
+
+def count_nodes(node):
+    if not node.children:
+        return 1
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    markdown = generate_document(random.Random(0), blocks)
+
+    print("bytes per node")
+    print(f"  TextNode  dict {node_size(DictTextNode('t', textnode.TextType.NORMAL)):5d}  slots {node_size(textnode.TextNode('t', textnode.TextType.NORMAL)):5d}")
+    print(f"  HTMLNode  dict {node_size(DictHTMLNode('p', None, [])):5d}  slots {node_size(utils.parentnode.ParentNode('p', [])):5d}")
+
+    tracemalloc.start()
+    html_node = utils.markdown_to_html_node(markdown)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes = count_nodes(html_node)
+    print(f"{blocks} blocks, {len(markdown) / 1e6:.2f} MB of markdown -> {nodes} html nodes")
+    print(f"  tree {current / 1e6:.2f} MB ({current / nodes:.0f} bytes/node), peak while parsing {peak / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import random
+import re
+import sys
+import time
+
+import patterns
+
+# usage: python3 src/bench_patterns.py [documents] [characters per document]
+
+# how utils called each pattern before the patterns module: the raw string went through re's cache on every call
+ORIGINALS = {
+    "IMAGE_PATTERN": (r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", "findall"),
+    "LINK_PATTERN": (r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", "findall"),
+    "BLANK_LINE": (r"\n[ \t]*\n", "split"),
+    "TITLE_PATTERN": (r"# (.*)\s{0,4}", "findall"),
+    "FILE_EXTENSION": (r"\.[a-zA-Z]{1,16}$", "sub"),
+}
+
+# characters every pattern cares about, mixed with plain text
+ALPHABET = "![]()#*_`.>-1 \t\nabcXYZ"
+
+def random_text(rnd, size):
+    return "".join(rnd.choice(ALPHABET) for _ in range(size))
+
+def original_result(name, text):
+    source, method = ORIGINALS[name]
+    if method == "sub":
+        return re.sub(source, ".html", text)
+    if method == "findall" and name == "TITLE_PATTERN":
+        # only the first title was ever used
+        titles = re.findall(source, text)
+        return titles[0] if titles else None
+    return getattr(re, method)(source, text)
+
+def compiled_result(name, text):
+    pattern = getattr(patterns, name)
+    method = ORIGINALS[name][1]
+    if method == "sub":
+        return pattern.sub(".html", text)
+    if name == "TITLE_PATTERN":
+        title = pattern.search(text)
+        return title.group(1) if title else None
+    return getattr(pattern, method)(text)
+
+def time_it(func, name, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            func(name, text)
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+    rnd = random.Random(0)
+    texts = [random_text(rnd, size) for _ in range(count)]
+
+    # both forms must agree before their timings mean anything
+    for name in ORIGINALS:
+        for text in texts:
+            if original_result(name, text) != compiled_result(name, text):
+                raise Exception(f"{name} disagrees with its original on {text!r}")
+
+    print(f"{count} texts x {size} characters, 10 rounds")
+    for name in ORIGINALS:
+        before = time_it(original_result, name, texts, 10)
+        after = time_it(compiled_result, name, texts, 10)
+        print(f"{name:<16} raw string {before:7.3f}s  compiled {after:7.3f}s  {before / after:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
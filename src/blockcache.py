@@ -0,0 +1,101 @@
+import collections
+import hashlib
+import json
+import os
+
+def block_key(block):
+    """short digest of a block's markdown, the cache never holds the block text itself"""
+    return hashlib.blake2b(block.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class BlockCache:
+    """
+    bounded LRU of rendered block html keyed by the block's markdown digest.
+    The version names the renderer output, a persisted cache of another version is thrown away
+    """
+
+    def __init__(self, max_entries=4096, version=None):
+        self.max_entries = max_entries
+        self.version = version
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # entries put since the last drain(), only recorded in page workers that hand them back to the build
+        self.new = None
+        self.drained = (0, 0)
+
+    def get(self, key):
+        html = self.entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def put(self, key, html):
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+        if self.new is not None:
+            self.new[key] = html
+        # drop the least recently used blocks once the cache is full
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def track_new(self):
+        """starts recording the entries put from now on, for drain()"""
+        self.new = {}
+
+    def drain(self):
+        """returns the (key, html) entries put and the hits and misses counted since the last drain"""
+        entries, self.new = list(self.new.items()), {}
+        hits, misses = self.hits - self.drained[0], self.misses - self.drained[1]
+        self.drained = (self.hits, self.misses)
+        return entries, hits, misses
+
+    def merge(self, entries, hits, misses):
+        """takes in what a worker's drain() returned, so the build's cache learns and counts what the workers did"""
+        for key, html in entries:
+            self.put(key, html)
+        self.hits += hits
+        self.misses += misses
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    @classmethod
+    def load(cls, path, max_entries=4096, version=None):
+        """reads a persisted cache, a missing, unreadable or outdated one starts empty"""
+        cache = cls(max_entries, version)
+        if not os.path.isfile(path):
+            return cache
+        try:
+            with open(path, "r", encoding="utf-8") as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return cache
+        if not isinstance(data, dict) or data.get("version") != version:
+            return cache
+        # entries are stored oldest first, so the most recent ones survive a smaller max_entries
+        for key, html in data.get("entries", [])[-max_entries:]:
+            cache.entries[key] = html
+        return cache
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            json.dump({"version": self.version, "entries": list(self.entries.items())}, fd)
+        os.replace(tmp_path, path)
@@ -0,0 +1,249 @@
+import datetime
+import hashlib
+import html
+import json
+import os
+import urllib.parse
+
+import manifest
+import pagetemplate
+import pagewriter
+import patterns
+
+COLLECTIONS_VERSION = 2
+# posts on a listing page, the newest page holds up to twice as many
+PAGE_SIZE = 10
+FEED_ENTRIES = 20
+# the <updated> of posts and feeds without a date
+EPOCH = "1970-01-01"
+
+# what a collection "blog" (content/blog/) writes into dest_path:
+#   blog/index.html                 the newest posts, page N of N
+#   blog/page/<n>/index.html        older posts, page 1 holds the oldest
+#   blog/tags/<tag>/index.html      the same listing for the posts of one tag, with its own page/<n>/
+#   blog/feed.xml                   Atom feed of the newest FEED_ENTRIES posts
+# Pages are counted from the oldest post, so a new post only changes the newest page of its listings
+
+def parse_date(value):
+    """the YYYY-MM-DD date a front matter value starts with, or "" when it has none"""
+    try:
+        return datetime.date.fromisoformat(value[:10]).isoformat()
+    except (TypeError, ValueError):
+        return ""
+
+def tag_slug(tag):
+    """the url folder of a tag, "Middle Earth" -> middle-earth"""
+    return patterns.TAG_SLUG.sub("-", tag.casefold()).strip("-") or "tag"
+
+def paginate(posts, page_size=PAGE_SIZE):
+    """splits posts, oldest first, into pages of page_size, the last page also takes what is left over"""
+    count = max(1, len(posts) // page_size)
+    return [posts[i * page_size:(i + 1) * page_size] for i in range(count - 1)] + [posts[(count - 1) * page_size:]]
+
+def post_entry(post):
+    """what listings and feeds show of a post: (url, title, date, tags, summary, author)"""
+    return post["url"], post["title"], post["date"], tuple(post["tags"]), post["summary"], post["author"]
+
+def listing_html(collection, entries, newer, older):
+    """the content of a listing page, entries are (url, title, date, tags, summary, author) newest first"""
+    parts = ["<div><ul>"]
+    for url, title, date, tags, summary, _ in entries:
+        parts.append(f'<li><a href="{html.escape(url)}">{html.escape(title)}</a>')
+        if date:
+            parts.append(f' <time datetime="{date}">{date}</time>')
+        for tag in tags:
+            parts.append(f' <a href="/{collection}/tags/{tag_slug(tag)}/" rel="tag">{html.escape(tag)}</a>')
+        if summary:
+            parts.append(f"<p>{html.escape(summary)}</p>")
+        parts.append("</li>")
+    parts.append("</ul>")
+    if newer or older:
+        parts.append("<nav>")
+        if newer:
+            parts.append(f'<a href="{newer}" rel="prev">Newer posts</a>')
+        if older:
+            parts.append(f'<a href="{older}" rel="next">Older posts</a>')
+        parts.append("</nav>")
+    parts.append("</div>")
+    return "".join(parts)
+
+def feed_author(site_url, author=""):
+    """the author of a feed: the one given, else the host of site_url, so every entry has one as Atom requires"""
+    return author or urllib.parse.urlsplit(site_url).hostname or "unknown"
+
+def feed_xml(title, site_url, folder_url, entries, author):
+    """
+    an Atom feed of entries, site_url is the absolute scheme, host and base path the root relative urls are
+    joined to. author names the feed, a post's front matter author names its own entry
+    """
+    def absolute(url):
+        return html.escape(f"{site_url.rstrip('/')}/{url.lstrip('/')}")
+
+    updated = max((date for _, _, date, _, _, _ in entries), default="") or EPOCH
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"<title>{html.escape(title)}</title>",
+        f'<link href="{absolute(folder_url)}"/><link rel="self" href="{absolute(folder_url + "feed.xml")}"/>',
+        f"<id>{absolute(folder_url)}</id><updated>{updated}T00:00:00Z</updated>",
+        f"<author><name>{html.escape(author)}</name></author>",
+    ]
+    for url, post_title, date, tags, summary, post_author in entries:
+        parts.append(f'<entry><title>{html.escape(post_title)}</title><link href="{absolute(url)}"/><id>{absolute(url)}</id>')
+        parts.append(f"<updated>{date or EPOCH}T00:00:00Z</updated>")
+        if post_author:
+            parts.append(f"<author><name>{html.escape(post_author)}</name></author>")
+        if summary:
+            parts.append(f"<summary>{html.escape(summary)}</summary>")
+        for tag in tags:
+            parts.append(f'<category term="{html.escape(tag)}"/>')
+        parts.append("</entry>")
+    parts.append("</feed>\n")
+    return "\n".join(parts)
+
+
+class Collections:
+    """
+    the posts of every collection folder with the title and front matter they rendered with, kept between builds
+    so listing pages, tag pages and feeds never read a post again. write() only renders the pages whose posts changed
+    """
+
+    def __init__(self, path, content_path, names, posts=None, outputs=None):
+        self.path = path
+        self.content_path = content_path
+        # folders under content_path, "blog" for content/blog/, the deepest one a post is in holds it
+        self.names = sorted(names, key=len, reverse=True)
+        # source -> {"collection": name, "url": str, "title": str, "date": str, "tags": [str], "summary": str, "author": str}
+        self.posts = posts if posts is not None else {}
+        # output path -> digest of what it was rendered from
+        self.outputs = outputs if outputs is not None else {}
+
+    @classmethod
+    def load(cls, path, content_path, names):
+        """reads the posts from disk, a missing, unreadable or outdated file starts empty"""
+        if not os.path.isfile(path):
+            return cls(path, content_path, names)
+        try:
+            with open(path, "r", encoding="utf-8") as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return cls(path, content_path, names)
+        if not isinstance(data, dict) or data.get("version") != COLLECTIONS_VERSION:
+            return cls(path, content_path, names)
+        return cls(path, content_path, names, data["posts"], data["outputs"])
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            json.dump({"version": COLLECTIONS_VERSION, "posts": self.posts, "outputs": self.outputs}, fd, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def collection_of(self, src):
+        """the collection a source is a post of, or None"""
+        rel_path = os.path.relpath(src, self.content_path).replace(os.sep, "/")
+        for name in self.names:
+            if rel_path.startswith(f"{name}/"):
+                return name
+        return None
+
+    def has(self, src):
+        return src in self.posts
+
+    def record(self, src, url, title, meta):
+        """stores a post's url, its title and what listings show of its front matter"""
+        self.posts[src] = {
+            "collection": self.collection_of(src),
+            "url": url,
+            "title": title,
+            "date": parse_date(meta.get("date", "")),
+            "tags": list(meta.get("tags", [])),
+            "summary": meta.get("summary", ""),
+            "author": meta.get("author", ""),
+        }
+
+    def forget(self, src):
+        self.posts.pop(src, None)
+
+    def retain(self, sources):
+        """drops every post whose source is gone or no longer in a collection"""
+        sources = set(sources)
+        for src in [src for src in self.posts if src not in sources or self.collection_of(src) is None]:
+            del self.posts[src]
+
+    def listings(self, name, title, posts, page_size):
+        """yields (url, title, entries, newer url, older url) of every page listing posts, oldest first, in folder name"""
+        chunks = paginate(posts, page_size)
+        last = len(chunks)
+
+        def listing_url(number):
+            return f"/{name}/" if number == last else f"/{name}/page/{number}/"
+
+        for number, chunk in enumerate(chunks, 1):
+            entries = [post_entry(post) for post in reversed(chunk)]
+            newer = listing_url(number + 1) if number < last else None
+            older = listing_url(number - 1) if number > 1 else None
+            yield listing_url(number), title if number == last else f"{title}, page {number}", entries, newer, older
+
+    def write(self, dest_path, template_path, base_path, site_url, author="", page_size=PAGE_SIZE):
+        """
+        writes the listing pages, tag pages and feed of every collection into dest_path. A page is only rendered
+        when its posts, title, links or the template changed, pages no collection makes any more are removed.
+        site_url (scheme and host) makes the feed urls absolute, author names the feeds, the host of site_url
+        when it is empty. Returns the number of pages rendered
+        """
+        template = pagetemplate.load_template(template_path, base_path)
+        # a changed template or base path changes every page, the pieces hold both
+        template_key = repr(template.pieces)
+        feed_base = f"{site_url.rstrip('/')}{base_path}"
+        author = feed_author(site_url, author)
+        by_collection = {name: [] for name in self.names}
+        for post in self.posts.values():
+            if post["collection"] in by_collection:
+                by_collection[post["collection"]].append(post)
+
+        outputs = {}
+        rendered = 0
+
+        def render(output, key, make_text):
+            nonlocal rendered
+            digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+            outputs[output] = digest
+            if self.outputs.get(output) != digest or not os.path.isfile(output):
+                pagewriter.write_if_changed(output, make_text())
+                rendered += 1
+
+        for name, posts in by_collection.items():
+            # oldest first, posts of the same day in url order
+            posts.sort(key=lambda post: (post["date"], post["url"]))
+            title = name.rsplit("/", 1)[-1].replace("-", " ").capitalize()
+            tags = {}
+            for post in posts:
+                for tag in post["tags"]:
+                    # the first spelling of a tag names its page
+                    tags.setdefault(tag_slug(tag), (tag, []))[1].append(post)
+
+            pages = list(self.listings(name, title, posts, page_size))
+            for slug, (tag, tag_posts) in sorted(tags.items()):
+                pages.extend(self.listings(f"{name}/tags/{slug}", f"{title} tagged {tag}", tag_posts, page_size))
+            for url, page_title, entries, newer, older in pages:
+                render(f"{dest_path}{url}index.html", (template_key, page_title, entries, newer, older),
+                       lambda: template.render(page_title, listing_html(name, entries, newer, older)))
+
+            newest = [post_entry(post) for post in reversed(posts[-FEED_ENTRIES:])]
+            render(f"{dest_path}/{name}/feed.xml", (feed_base, author, title, newest), lambda: feed_xml(title, feed_base, f"/{name}/", newest, author))
+
+        for output in self.outputs:
+            if output not in outputs:
+                manifest.remove_output(output)
+        self.outputs = outputs
+        return rendered
+
+    def remove(self):
+        """deletes every page the collections wrote and the saved posts, for a build that no longer has collections"""
+        for output in self.outputs:
+            manifest.remove_output(output)
+        self.outputs = {}
+        if os.path.isfile(self.path):
+            os.remove(self.path)
@@ -0,0 +1,149 @@
+import functools
+import http.server
+import os
+import threading
+import time
+
+import assetsync
+import manifest
+import utils
+
+def snapshot(root):
+    """maps every file under root (or root itself when it is a file) to its (mtime, size)"""
+    files = {}
+    if os.path.isfile(root):
+        paths = [root]
+    else:
+        paths = [f"{dir_path}/{name}" for dir_path, _, file_names in os.walk(root) for name in file_names]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # deleted since it was listed, this snapshot already counts it as removed
+            continue
+        files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+def changes(old, new):
+    """returns the (changed, removed) paths between two snapshots, new files count as changed"""
+    changed = sorted(path for path, version in new.items() if old.get(path) != version)
+    removed = sorted(path for path in old if path not in new)
+    return changed, removed
+
+
+class SiteWatcher:
+    """
+    keeps a built site in sync with its sources. Each poll only redoes what a change affects:
+    a markdown file re-renders its own page, a static file re-copies itself, the template re-renders every page
+    """
+
+    def __init__(self, base_path, content_path="content", static_path="static", template_path="template.html", dest_path="docs", manifest_path=".ssg-cache/manifest.json"):
+        self.base_path = base_path
+        self.content_path = content_path
+        self.static_path = static_path
+        self.template_path = template_path
+        self.dest_path = dest_path
+        self.build_manifest = manifest.Manifest.load(manifest_path)
+        self.snapshots = {}
+
+    def build(self):
+        """full incremental build, then remembers the state of every source"""
+        self.snapshots = {root: snapshot(root) for root in (self.content_path, self.static_path, self.template_path)}
+        try:
+            utils.create_public_dir(self.dest_path, self.build_manifest, self.static_path)
+            utils.generate_pages_recursive(self.content_path, self.template_path, self.dest_path, self.base_path, self.build_manifest)
+        finally:
+            self.build_manifest.save()
+
+    def poll(self):
+        """rebuilds whatever changed since the last poll and returns the source paths that were handled"""
+        handled = []
+        new_snapshots = {root: snapshot(root) for root in self.snapshots}
+        template_changed, _ = changes(self.snapshots[self.template_path], new_snapshots[self.template_path])
+        content_changed, content_removed = changes(self.snapshots[self.content_path], new_snapshots[self.content_path])
+        static_changed, static_removed = changes(self.snapshots[self.static_path], new_snapshots[self.static_path])
+        self.snapshots = new_snapshots
+
+        if template_changed:
+            # every page embeds the template, the manifest sees the new template hash on all of them
+            try:
+                utils.generate_pages_recursive(self.content_path, self.template_path, self.dest_path, self.base_path, self.build_manifest)
+            except utils.PageBuildError as e:
+                utils.logger.error(e)
+            handled.extend(template_changed)
+        else:
+            # recorded the way a build records it, so the next build finds these pages current
+            template_hash = utils.page_template_key(self.template_path)
+            for src in content_changed:
+                self.render_page(src, template_hash)
+            handled.extend(content_changed)
+        for src in content_removed:
+            self.build_manifest.forget_page(src)
+        handled.extend(content_removed)
+
+        for src in static_changed:
+            self.copy_static(src)
+        for src in static_removed:
+            self.build_manifest.forget_static(src)
+        handled.extend(static_changed + static_removed)
+
+        if handled:
+            self.build_manifest.save()
+        return handled
+
+    def render_page(self, src, template_hash):
+        dest = utils.page_dest_path(src, self.content_path, self.dest_path)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            content_hash = manifest.file_hash(src)
+            utils.generate_page(src, self.template_path, dest, self.base_path)
+        except Exception as e:
+            # a half written markdown file must not stop the watch loop
+            utils.logger.error(f"{src}: {type(e).__name__}: {e}")
+            return
+        self.build_manifest.record_page(src, content_hash, template_hash, self.base_path, dest)
+
+    def copy_static(self, src):
+        dest = f"{self.dest_path}/{os.path.relpath(src, self.static_path)}"
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            stat = os.stat(src)
+            assetsync.copy_file(src, dest)
+            content_hash = manifest.file_hash(src)
+        except FileNotFoundError:
+            # removed again before it could be copied, the next poll forgets it
+            return
+        self.build_manifest.record_static(src, content_hash, dest, stat.st_size, stat.st_mtime_ns)
+        utils.logger.info(f"Copied {src} to {dest}")
+
+
+def serve(base_path="/", port=8888, watch=False, interval=0.5):
+    """builds the site, serves docs/ over http and, with watch, keeps rebuilding what changes until interrupted"""
+    watcher = SiteWatcher(base_path)
+    # the process stays up, so blocks rendered once are reused by every later rebuild
+    if utils.block_cache is None:
+        utils.enable_block_cache()
+    try:
+        watcher.build()
+    except utils.PageBuildError as e:
+        utils.logger.error(e)
+
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=watcher.dest_path)
+    server = http.server.ThreadingHTTPServer(("", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    utils.logger.warning(f"Serving {watcher.dest_path}/ at http://localhost:{port}/")
+    try:
+        while True:
+            time.sleep(interval)
+            if watch:
+                try:
+                    watcher.poll()
+                except Exception as e:
+                    # whatever a poll trips over, the next one starts from a fresh snapshot
+                    utils.logger.error(f"rebuild failed: {type(e).__name__}: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,63 @@
+import html
+
+import blockcache
+import leafnode
+import parentnode
+import patterns
+
+# fence info words -> the lexer of patterns.LEXER_RULES they use, other languages are escaped but not highlighted
+LANGUAGES = {
+    "python": "python", "py": "python",
+    "javascript": "javascript", "js": "javascript", "typescript": "javascript", "ts": "javascript",
+    "go": "go", "golang": "go",
+    "sh": "shell", "bash": "shell", "shell": "shell", "console": "shell",
+    "json": "json",
+}
+HIGHLIGHT_CACHE_ENTRIES = 1024
+
+# highlighted <code> nodes keyed by language and code digest. Nodes are immutable, so every block with the
+# same snippet shares one. Kept per process, a worker fills its own
+cache = blockcache.BlockCache(HIGHLIGHT_CACHE_ENTRIES)
+
+def tokens(code, lexer):
+    """yields (css class or None, text) pieces that together are code, lexer is a key of patterns.LEXER_RULES"""
+    rules = patterns.LEXER_RULES[lexer]
+    pattern = patterns.lexer(lexer)
+    pos = 0
+    while True:
+        match = pattern.search(code, pos)
+        if match is None:
+            break
+        if match.start() > pos:
+            yield None, code[pos:match.start()]
+        css_class, _, closer = rules[int(match.lastgroup[1:])]
+        end = match.end()
+        if closer is not None:
+            # a region runs to its closer, or to the end of the code when it never closes
+            end = code.find(closer, end)
+            end = len(code) if end == -1 else end + len(closer)
+        yield css_class, code[match.start():end]
+        pos = end
+    if pos < len(code):
+        yield None, code[pos:]
+
+def highlight(language, code):
+    """the children of a <code> element: escaped code, with the tokens of a known language in <span class> leaves"""
+    lexer = LANGUAGES.get(language.casefold())
+    if lexer is None:
+        return [leafnode.text_leaf(html.escape(code, quote=False))]
+    children = []
+    for css_class, text in tokens(code, lexer):
+        text = html.escape(text, quote=False)
+        children.append(leafnode.text_leaf(text) if css_class is None else leafnode.LeafNode("span", text, {"class": css_class}))
+    return children
+
+def code_node(language, code):
+    """the <code> node of a fenced block, highlighted once per distinct (language, code)"""
+    key = f"{language}:{blockcache.block_key(code)}"
+    node = cache.get(key)
+    if node is None:
+        props = {"class": f"language-{html.escape(language)}"} if language else None
+        node = parentnode.ParentNode("code", highlight(language, code), props)
+        cache.put(key, node)
+    return node
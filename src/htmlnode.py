@@ -1,15 +1,33 @@
 
 
 class HTMLNode:
+    """immutable html node, __slots__ keeps every node free of a per-instance __dict__"""
+
+    __slots__ = ("tag", "value", "children", "props")
 
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
-        self.value = value
-        self.children = children
-        self.props = props # dictionary of html attributes
+        object.__setattr__(self, "tag", tag)
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "children", children)
+        object.__setattr__(self, "props", props) # dictionary of html attributes
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable, cannot set {name}")
+
+    def __reduce__(self):
+        return (HTMLNode, (self.tag, self.value, self.children, self.props))
     
     def to_html(self):
         raise NotImplementedError()
+
+    def iter_html(self):
+        """yields the html in fragments, subclasses with children stream them instead of building one string"""
+        yield self.to_html()
+
+    def write_html(self, stream):
+        """writes the html fragment by fragment into a file like object"""
+        for fragment in self.iter_html():
+            stream.write(fragment)
     
     def props_to_html(self):
         propStr = ""
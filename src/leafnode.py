@@ -1,10 +1,16 @@
+import functools
 from htmlnode import HTMLNode
 
 class LeafNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
 
         super().__init__(tag, value, props=props)
+
+    def __reduce__(self):
+        return (LeafNode, (self.tag, self.value, self.props))
     
     def to_html(self):
         if self.value is None:
@@ -17,3 +23,17 @@ class LeafNode(HTMLNode):
             return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
         
         return f"<{self.tag}>{self.value}</{self.tag}>"
+
+
+# plain text longer than this is unlikely to repeat, sharing it would only pin big strings in the cache
+SHARED_TEXT_MAX = 64
+
+@functools.lru_cache(maxsize=8192)
+def _shared_text_leaf(value):
+    return LeafNode(None, value)
+
+def text_leaf(value):
+    """returns an untagged leaf for plain text, short text shares one node since leaves are immutable"""
+    if len(value) > SHARED_TEXT_MAX:
+        return LeafNode(None, value)
+    return _shared_text_leaf(value)
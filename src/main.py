@@ -1,20 +1,386 @@
-import textnode
-import utils
-import re
+import argparse
+import os
 import sys
 
-def main():
-    # get the second arguement passed by the CLI
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+# everything else is imported where it is used, so `--help`, `--only` and short CI runs
+# never load the manifest, site index, profilers or process pools they do not need
+
+# build record kept outside docs/ so it is never published with the site
+MANIFEST_PATH = ".ssg-cache/manifest.json"
+BLOCK_CACHE_PATH = ".ssg-cache/blocks.json"
+SITE_INDEX_PATH = ".ssg-cache/index.json"
+ASSETS_CACHE_PATH = ".ssg-cache/assets.json"
+IMAGES_INDEX_PATH = ".ssg-cache/images.json"
+SEARCH_INDEX_PATH = ".ssg-cache/search.json"
+COLLECTIONS_PATH = ".ssg-cache/collections.json"
+# the fingerprinted, minified and precompressed copy of docs/ that --assets writes for a CDN
+DIST_PATH = "dist"
+
+def build(basepath, clean=False, jobs=1, link_static=False, assets=False, image_widths=None, search=False, collections=None, site_url="", feed_author=""):
+    """
+    runs one build of content/ and static/ into docs/, raises utils.PageBuildError after a partial build.
+    With image_widths every png gets derivatives of those widths and pages get responsive img tags.
+    With search the words of every page go into a search index in docs/search/.
+    With collections, folder names under content/, each gets listing pages, tag pages and a feed, whose
+    urls start with site_url and whose author is feed_author unless a post names its own.
+    With assets the finished docs/ also goes through the asset pipeline into dist/.
+    Returns the (source, kind, url) links and images of the site that point at nothing
+    """
+    import contextlib
+    import manifest
+    import profiler
+    import siteindex
+    import utils
+
+    # load the record of the previous build so unchanged pages and assets are skipped
+    if clean:
+        build_manifest = manifest.Manifest(MANIFEST_PATH)
+        site_index = siteindex.SiteIndex(SITE_INDEX_PATH)
     else:
-        basepath = "/"
-    
+        build_manifest = manifest.Manifest.load(MANIFEST_PATH)
+        site_index = siteindex.SiteIndex.load(SITE_INDEX_PATH)
+    search_index = None
+    if search:
+        import searchindex
+        search_index = searchindex.SearchIndex(SEARCH_INDEX_PATH) if clean else searchindex.SearchIndex.load(SEARCH_INDEX_PATH)
+        utils.search_terms = True
+    elif os.path.isfile(SEARCH_INDEX_PATH):
+        # the last build had --search, its index would go stale in docs/
+        import searchindex
+        searchindex.SearchIndex.load(SEARCH_INDEX_PATH).remove("docs")
+    post_collections = None
+    if collections:
+        import collectionpages
+        if clean:
+            post_collections = collectionpages.Collections(COLLECTIONS_PATH, "content", collections)
+        else:
+            post_collections = collectionpages.Collections.load(COLLECTIONS_PATH, "content", collections)
+    elif os.path.isfile(COLLECTIONS_PATH):
+        # the last build had --collections, its listings and feeds would stay in docs/
+        import collectionpages
+        collectionpages.Collections.load(COLLECTIONS_PATH, "content", []).remove()
+
+    profile = profiler.active
     # creates a dest folder and also places any Non-Markdown content into the folder such as images and .css files from a static/ folder
-    utils.create_public_dir("docs")
+    with profile.phase("static") if profile else contextlib.nullcontext():
+        utils.create_public_dir("docs", build_manifest, hardlink=link_static)
+    if image_widths is not None:
+        with profile.phase("images") if profile else contextlib.nullcontext():
+            build_images(basepath, image_widths, build_manifest, jobs)
+    elif os.path.isfile(IMAGES_INDEX_PATH):
+        # the last build had --images, its derivatives would stay in docs/ with no page using them
+        import responsiveimages
+        responsiveimages.ResponsiveImages.load(IMAGES_INDEX_PATH).remove()
     # converts all Md content into html files and places them at the dest path (make sure only md files are present in the source folder)
-    utils.generate_pages_recursive(f"content", f"template.html", f"docs", basepath)
+    try:
+        with profile.phase("pages") if profile else contextlib.nullcontext():
+            utils.generate_pages_recursive(f"content", f"template.html", f"docs", basepath, build_manifest, jobs, site_index, search_index=search_index, collections=post_collections)
+    finally:
+        # pages that did build are still recorded, only the failed ones are retried next time
+        build_manifest.save()
+        site_index.save()
+        if search_index is not None:
+            # written even after a partial build, the changed terms are only known until the index is saved
+            with profile.phase("search") if profile else contextlib.nullcontext():
+                search_index.write("docs")
+            search_index.save()
+        if post_collections is not None:
+            # the posts that did render are listed, a failed one drops out until it builds again
+            with profile.phase("collections") if profile else contextlib.nullcontext():
+                rendered = post_collections.write("docs", "template.html", basepath, site_url, feed_author)
+            post_collections.save()
+            utils.logger.info(f"Collections: {rendered} listing pages and feeds rendered")
+
+    # every link and image of the site is in the index, checking them needs no pass over docs/
+    with profile.phase("links") if profile else contextlib.nullcontext():
+        broken = report_broken(site_index)
+    if assets:
+        with profile.phase("assets") if profile else contextlib.nullcontext():
+            build_assets(basepath, jobs)
+    return broken
+
+def report_broken(site_index):
+    """logs every link and image of the site in docs/ that points at nothing and returns them"""
+    import utils
+
+    broken = site_index.broken_references("docs")
+    for src, kind, url in broken:
+        utils.logger.warning(f"{src}: {'broken link' if kind == 'link' else 'missing image'} {url}")
+    return broken
+
+def build_images(basepath, widths=(), build_manifest=None, jobs=1):
+    """reads the size of every image in static/, puts its derivatives into docs/ and turns on responsive img tags"""
+    import responsiveimages
+    import utils
+
+    images = responsiveimages.ResponsiveImages.load(IMAGES_INDEX_PATH)
+    widths = widths or responsiveimages.DEFAULT_WIDTHS
+    encoded = images.update("static", "docs", basepath, widths, build_manifest, workers=jobs if jobs > 1 else None)
+    images.save()
+    utils.responsive_images = images
+    utils.logger.info(f"Images: {len(images.images)} found, {encoded} encoded, {len(images.outputs)} derivatives in docs/")
+
+def build_assets(basepath, jobs=1):
+    """runs the asset pipeline over docs/ into dist/, only files that changed since the last run are redone"""
+    import assetpipeline
+    import utils
+
+    pipeline = assetpipeline.AssetPipeline("docs", DIST_PATH, basepath, ASSETS_CACHE_PATH, threads=max(jobs, 4))
+    stats = pipeline.run()
+    utils.logger.info(f"Assets: {stats['processed']} processed, {stats['cached']} unchanged, {stats['removed']} removed in {DIST_PATH}/")
+
+def build_shard(basepath, shard, clean=False, jobs=1):
+    """
+    renders slice i of N of the pages into shards/<i>-of-<N>, with its own manifest so reruns stay incremental.
+    Static assets and the link check are left to the merge
+    """
+    import manifest
+    import shards
+    import siteindex
+    import utils
+
+    shard_dir = f"{shards.SHARDS_PATH}/{shards.shard_name(shard)}"
+    manifest_path = f".ssg-cache/manifest-{shards.shard_name(shard)}.json"
+    if clean:
+        build_manifest = manifest.Manifest(manifest_path)
+        site_index = siteindex.SiteIndex(shards.index_path(shard_dir))
+    else:
+        build_manifest = manifest.Manifest.load(manifest_path)
+        site_index = siteindex.SiteIndex.load(shards.index_path(shard_dir))
+
+    os.makedirs(shard_dir, exist_ok=True)
+    try:
+        utils.generate_pages_recursive("content", "template.html", shard_dir, basepath, build_manifest, jobs, site_index, shard)
+    finally:
+        build_manifest.save()
+        site_index.save()
+        # merge copies exactly the pages listed here, failed ones are left out
+        shards.write_shard_info(shard_dir, shard, [page["output"] for page in site_index.pages.values()])
+
+def render_only(paths, basepath, images=False):
+    """
+    renders just the named markdown files under content/ into docs/ through generate_page.
+    Nothing else is walked, copied or recorded, raises utils.PageBuildError when a page failed.
+    With images the img tags use what the last build recorded about the images, nothing is encoded
+    """
+    import utils
+
+    if images:
+        import responsiveimages
+        utils.responsive_images = responsiveimages.ResponsiveImages.load(IMAGES_INDEX_PATH)
+
+    errors = []
+    for path in paths:
+        if os.path.relpath(path, "content").startswith(".."):
+            errors.append((path, "not a markdown file under content/"))
+            continue
+        try:
+            utils.generate_page(path, "template.html", utils.page_dest_path(path, "content", "docs"), basepath)
+        except Exception as e:
+            errors.append((path, f"{type(e).__name__}: {e}"))
+    if errors:
+        raise utils.PageBuildError(errors)
+
+def merge_main(argv):
+    import logging
+    import manifest
+    import shards
+    import siteindex
+    import utils
+
+    parser = argparse.ArgumentParser(prog="main.py merge", description="Combine the outputs of --shard builds and static/ into docs/")
+    parser.add_argument("shard_dirs", nargs="*", metavar="SHARD_DIR", help=f"shard output folders (default: every folder in {shards.SHARDS_PATH}/)")
+    parser.add_argument("--link-static", action="store_true", help="hardlink static assets into docs/ instead of copying them")
+    parser.add_argument("--assets", action="store_true", help=f"then write a fingerprinted, minified and precompressed copy of docs/ into {DIST_PATH}/")
+    parser.add_argument("--basepath", default="/", help="base path the shards were rendered with, used by --assets (default: /)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log problems")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    utils.logger.setLevel(logging.WARNING if args.quiet else logging.INFO)
+
+    shard_dirs = args.shard_dirs
+    if not shard_dirs and os.path.isdir(shards.SHARDS_PATH):
+        shard_dirs = [f"{shards.SHARDS_PATH}/{name}" for name in sorted(os.listdir(shards.SHARDS_PATH))]
+    if not shard_dirs:
+        print(f"no shard outputs to merge in {shards.SHARDS_PATH}/", file=sys.stderr)
+        sys.exit(1)
+
+    build_manifest = manifest.Manifest.load(MANIFEST_PATH)
+    try:
+        merged = shards.merge_shards(shard_dirs, "static", "docs", build_manifest, args.link_static)
+    except (shards.ShardMergeError, OSError, ValueError, KeyError) as e:
+        print(f"merge failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    build_manifest.save()
+    # the merge removed every file of docs/ that no shard or static/ made, with them the search index, image
+    # derivatives and collection pages of an earlier full build. Their records go too, so the next build
+    # with those stages writes them again instead of trusting outputs that are gone
+    for path in (SEARCH_INDEX_PATH, IMAGES_INDEX_PATH, COLLECTIONS_PATH):
+        if os.path.isfile(path):
+            os.remove(path)
+    site_index = siteindex.SiteIndex(SITE_INDEX_PATH, merged.pages)
+    site_index.save()
+    utils.logger.info(f"Merged {len(shard_dirs)} shard(s), {len(merged.pages)} pages into docs/")
+    report_broken(site_index)
+    if args.assets:
+        build_assets(args.basepath)
+
+def collections_arg(text):
+    names = [name.strip("/") for name in text.split(",") if name.strip("/")]
+    for name in names:
+        if not os.path.isdir(f"content/{name}"):
+            raise argparse.ArgumentTypeError(f"no folder content/{name}")
+        if os.path.isfile(f"content/{name}/index.md"):
+            # its page and the newest listing page would both be docs/<name>/index.html
+            raise argparse.ArgumentTypeError(f"content/{name}/index.md would replace the listing of {name}")
+    if not names:
+        raise argparse.ArgumentTypeError(f"collections are written NAME,NAME,..., got {text!r}")
+    return names
+
+def site_url_arg(text):
+    import urllib.parse
+
+    url = urllib.parse.urlsplit(text)
+    if url.scheme not in ("http", "https") or not url.hostname:
+        raise argparse.ArgumentTypeError(f"the site url is written https://host, got {text!r}")
+    return text
+
+def image_widths_arg(text):
+    try:
+        widths = tuple(sorted({int(width) for width in text.split(",")}))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"widths are written W,W,..., got {text!r}")
+    if not widths or widths[0] < 1:
+        raise argparse.ArgumentTypeError(f"widths must be positive, got {text!r}")
+    return widths
+
+def shard_arg(text):
+    import shards
+
+    try:
+        return shards.parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def serve_main(argv):
+    import logging
+    import devserver
+    import utils
+
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Build the site and serve docs/ over http")
+    parser.add_argument("basepath", nargs="?", default="/", help="path the site is served under (default: /)")
+    parser.add_argument("--port", type=int, default=8888, help="http port (default: 8888)")
+    parser.add_argument("--watch", action="store_true", help="poll content/, static/ and template.html and rebuild what changed")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls (default: 0.5)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not log every generated page")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    utils.logger.setLevel(logging.WARNING if args.quiet else logging.INFO)
+    devserver.serve(args.basepath, args.port, args.watch, args.interval)
+
+def main():
+    # `main.py serve ...` runs the dev server, `main.py merge ...` combines shard builds, anything else is a build
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        return serve_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "merge":
+        return merge_main(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description="Generate the static site from content/ into docs/")
+    # the base path is the first positional argument passed by the CLI
+    parser.add_argument("basepath", nargs="?", default="/", help="path the site is served under (default: /)")
+    parser.add_argument("--clean", action="store_true", help="ignore the build manifest and re-render every page")
+    parser.add_argument("--shard", type=shard_arg, metavar="i/N", help="render only slice i of N of the pages into shards/<i>-of-<N>, combine the slices with `main.py merge`")
+    parser.add_argument("--only", nargs="+", metavar="PATH", help="render just these markdown files, without touching the rest of the site (give the base path before --only)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes rendering pages, 0 uses every core (default: 1)")
+    parser.add_argument("--link-static", action="store_true", help="hardlink static assets into docs/ instead of copying them")
+    parser.add_argument("--images", action="store_true", help="write downscaled copies of the pngs in static/ and give img tags their size, srcset and lazy loading")
+    parser.add_argument("--image-widths", type=image_widths_arg, default=None, metavar="W,W", help="widths of the downscaled copies, implies --images (default: 480,960)")
+    parser.add_argument("--search", action="store_true", help="write a sharded search index of every page's words into docs/search/")
+    parser.add_argument("--collections", type=collections_arg, metavar="NAME,NAME", help="give these folders of content/ (e.g. blog) paginated listings, tag pages and an Atom feed built from the posts' front matter")
+    parser.add_argument("--site-url", type=site_url_arg, metavar="URL", help="scheme and host the feed urls start with, e.g. https://example.org, required by --collections")
+    parser.add_argument("--feed-author", default="", metavar="NAME", help="author of the feeds, for posts without an author in their front matter (default: the host of --site-url)")
+    parser.add_argument("--assets", action="store_true", help=f"after the build, write a fingerprinted, minified and precompressed copy of docs/ into {DIST_PATH}/")
+    parser.add_argument("--block-cache", type=int, default=4096, metavar="N", help="keep the html of the N most recent distinct blocks, 0 disables (default: 4096)")
+    parser.add_argument("--persist-block-cache", action="store_true", help=f"load and save the block cache in {BLOCK_CACHE_PATH}")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not log every generated page")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log debug output")
+    parser.add_argument("--profile", action="store_true", help="time every build phase and page stage and print a summary")
+    parser.add_argument("--profile-json", metavar="PATH", help="also write the profile as JSON to PATH (implies --profile)")
+    parser.add_argument("--cprofile", metavar="PATH", help="dump cProfile stats of the main process to PATH, read them with pstats")
+    args = parser.parse_args()
+    if args.collections and not args.site_url:
+        # the ids and links of an Atom feed are absolute urls
+        parser.error("--collections requires --site-url")
+    if args.shard and args.only:
+        parser.error("--shard and --only cannot be combined")
+    partial = "--shard" if args.shard else "--only" if args.only else None
+    if partial:
+        # these stages run over the whole site, a shard or a few pages would silently go without them
+        whole_site = {"--search": args.search, "--collections": args.collections, "--assets": args.assets}
+        if args.shard:
+            # --only renders with the image sizes the last build recorded, a shard has none
+            whole_site["--images"] = args.images or args.image_widths is not None
+        rejected = [flag for flag, given in whole_site.items() if given]
+        if rejected:
+            parser.error(f"{', '.join(rejected)} cannot be combined with {partial}")
+    basepath = args.basepath
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    images = args.images or args.image_widths is not None
+    # an empty tuple keeps the default widths of responsiveimages
+    image_widths = (args.image_widths or ()) if images else None
+
+    import logging
+    import utils
+
+    level = logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    utils.logger.setLevel(level)
+
+    # a handful of pages gains nothing from a block cache that only pays off across pages
+    cache_path = BLOCK_CACHE_PATH if args.persist_block_cache else None
+    block_cache = utils.enable_block_cache(args.block_cache, cache_path) if args.block_cache > 0 and not args.only else None
+
+    profile = None
+    if args.profile or args.profile_json:
+        import profiler
+        profile = profiler.enable()
+    cprofile = None
+    if args.cprofile:
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+
+    failed = None
+    try:
+        if args.only:
+            render_only(args.only, basepath, images)
+        elif args.shard:
+            build_shard(basepath, args.shard, args.clean, jobs)
+        else:
+            build(basepath, args.clean, jobs, args.link_static, args.assets, image_widths, args.search, args.collections, args.site_url, args.feed_author)
+    except utils.PageBuildError as e:
+        failed = e
+    finally:
+        if cprofile:
+            cprofile.disable()
+            cprofile.dump_stats(args.cprofile)
+        if block_cache is not None and cache_path is not None:
+            block_cache.save(cache_path)
+
+    if block_cache is not None:
+        stats = block_cache.stats()
+        utils.logger.debug(f"block cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, {stats['entries']} entries")
+
+    if profile:
+        print(profile.summary(), file=sys.stderr)
+        if args.profile_json:
+            profile.write_json(args.profile_json)
+    if failed:
+        print(failed, file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+def file_hash(path):
+    """returns the sha256 hex digest of the bytes of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fd:
+        # read in chunks so big static assets are never fully held in memory
+        for chunk in iter(lambda: fd.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def remove_output(path):
+    """deletes a generated file and any parent folders it leaves empty"""
+    if os.path.isfile(path):
+        os.remove(path)
+    parent = os.path.dirname(path)
+    # walk up removing empty folders, stop at the first one that still has content
+    while parent:
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
+
+
+class Manifest:
+    """
+    persistent record of the last build: source path -> hashes and output path.
+    pages and static assets are kept apart so each can be reconciled on its own
+    """
+
+    def __init__(self, path, pages=None, static=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        self.static = static if static is not None else {}
+        # sources touched during the current build, anything else is stale
+        self.seen_pages = set()
+        self.seen_static = set()
+
+    @classmethod
+    def load(cls, path):
+        """reads a manifest from disk, a missing or unreadable one starts an empty build record"""
+        if not os.path.isfile(path):
+            return cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("pages", {}), data.get("static", {}))
+
+    def save(self):
+        """writes the manifest through a temp file so a crashed build never leaves half a manifest"""
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            json.dump({"version": MANIFEST_VERSION, "pages": self.pages, "static": self.static}, fd, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def page_is_current(self, src, content_hash, template_hash, base_path, dest):
+        """True when the page was built from the same markdown, template and base path and its output still exists"""
+        self.seen_pages.add(src)
+        entry = self.pages.get(src)
+        if entry is None or not os.path.isfile(dest):
+            return False
+        return entry == {"hash": content_hash, "template": template_hash, "base_path": base_path, "output": dest}
+
+    def record_page(self, src, content_hash, template_hash, base_path, dest):
+        self.seen_pages.add(src)
+        old = self.pages.get(src)
+        # the source now renders somewhere else, drop the old output
+        if old is not None and old["output"] != dest:
+            remove_output(old["output"])
+        self.pages[src] = {"hash": content_hash, "template": template_hash, "base_path": base_path, "output": dest}
+
+    def static_unchanged(self, src, size, mtime, dest):
+        """True when the asset has the size and mtime it had when it was copied and its copy still exists with that size"""
+        self.seen_static.add(src)
+        entry = self.static.get(src)
+        if entry is None or entry["output"] != dest or entry.get("size") != size or entry.get("mtime") != mtime:
+            return False
+        try:
+            return os.path.getsize(dest) == size
+        except OSError:
+            return False
+
+    def static_hash(self, src):
+        """hash of the asset when it was last copied, or None"""
+        entry = self.static.get(src)
+        return entry["hash"] if entry is not None else None
+
+    def record_static(self, src, content_hash, dest, size=None, mtime=None):
+        self.seen_static.add(src)
+        old = self.static.get(src)
+        if old is not None and old["output"] != dest:
+            remove_output(old["output"])
+        self.static[src] = {"hash": content_hash, "output": dest, "size": size, "mtime": mtime}
+
+    def forget_page(self, src):
+        """removes the output of one deleted page source"""
+        entry = self.pages.pop(src, None)
+        if entry is not None:
+            remove_output(entry["output"])
+
+    def forget_static(self, src):
+        """removes the copy of one deleted static asset"""
+        entry = self.static.pop(src, None)
+        if entry is not None:
+            remove_output(entry["output"])
+
+    def prune_pages(self):
+        """removes outputs of pages whose markdown source is gone and returns their output paths"""
+        return self._prune(self.pages, self.seen_pages)
+
+    def prune_static(self):
+        """removes copies of static assets whose source is gone and returns their output paths"""
+        return self._prune(self.static, self.seen_static)
+
+    def _prune(self, entries, seen):
+        removed = []
+        for src in sorted(set(entries) - seen):
+            output = entries.pop(src)["output"]
+            remove_output(output)
+            removed.append(output)
+        return removed
@@ -0,0 +1,83 @@
+import functools
+import html
+import os
+
+# the title slot takes plain text and escapes it, wherever the title came from (an H1, front matter or a
+# listing's name), the content slot takes html as it is
+TITLE_SLOT = "{{ Title }}"
+CONTENT_SLOT = "{{ Content }}"
+
+def rewrite_base_path(html, base_path):
+    """points root relative href and src attributes at the base path"""
+    if base_path == "/":
+        return html
+    # replace instances with base_path
+    html = html.replace("href=\"/", f"href=\"{base_path}")
+    return html.replace("src=\"/", f"src=\"{base_path}")
+
+
+class PageTemplate:
+    """
+    a template split once into literal pieces and the Title/Content slots between them.
+    The literals are base path rewritten at compile time, so a page only fills the two slots
+    """
+
+    def __init__(self, template_text, base_path="/"):
+        self.base_path = base_path
+        self.pieces = []
+        self.title_index = None
+        self.content_index = None
+
+        # like str.replace(slot, value, 1) only the first occurrence of each slot is filled
+        slots = sorted((template_text.find(slot), slot) for slot in (TITLE_SLOT, CONTENT_SLOT) if slot in template_text)
+        start = 0
+        for pos, slot in slots:
+            self.pieces.append(rewrite_base_path(template_text[start:pos], base_path))
+            if slot == TITLE_SLOT:
+                self.title_index = len(self.pieces)
+            else:
+                self.content_index = len(self.pieces)
+            self.pieces.append("")
+            start = pos + len(slot)
+        self.pieces.append(rewrite_base_path(template_text[start:], base_path))
+
+    def render(self, title, content):
+        """returns the full page as one join of the precomputed pieces"""
+        pieces = list(self.pieces)
+        if self.title_index is not None:
+            pieces[self.title_index] = html.escape(title, quote=False)
+        if self.content_index is not None:
+            pieces[self.content_index] = rewrite_base_path(content, self.base_path)
+        return "".join(pieces)
+
+    def write(self, stream, title, fragments):
+        """writes the page into stream, the content is an iterable of html fragments streamed into its slot"""
+        for i, piece in enumerate(self.pieces):
+            if i == self.title_index:
+                stream.write(html.escape(title, quote=False))
+            elif i == self.content_index:
+                # fragments end on tag boundaries so rewriting each one equals rewriting the whole
+                for fragment in fragments:
+                    stream.write(rewrite_base_path(fragment, self.base_path))
+            else:
+                stream.write(piece)
+
+
+@functools.lru_cache(maxsize=16)
+def compile_template(template_text, base_path="/"):
+    """returns the compiled template for this text and base path, compiled only once"""
+    return PageTemplate(template_text, base_path)
+
+# template path -> ((mtime, size), template text)
+_loaded_templates = {}
+
+def load_template(template_path, base_path="/"):
+    """reads and compiles a template file, it is only read again after it changed on disk"""
+    stat = os.stat(template_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    loaded = _loaded_templates.get(template_path)
+    if loaded is None or loaded[0] != version:
+        with open(template_path, "r", encoding="utf-8") as fd:
+            loaded = (version, fd.read())
+        _loaded_templates[template_path] = loaded
+    return compile_template(loaded[1], base_path)
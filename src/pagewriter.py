@@ -0,0 +1,80 @@
+import os
+import threading
+
+def write_if_changed(dest_path, text):
+    """
+    writes text (or bytes) to dest_path through a temp file and a rename, unless the file already holds exactly that.
+    Returns True when the file was written
+    """
+    data = text.encode("utf-8") if isinstance(text, str) else text
+    # a temp file per thread, two writers handed the same page never rename each other's file away
+    tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        # only a file of the same size can hold the same bytes, anything else is written without reading it
+        if os.path.getsize(dest_path) == len(data):
+            with open(dest_path, "rb") as fd:
+                if fd.read() == data:
+                    return False
+    except OSError:
+        pass
+    try:
+        try:
+            fd = open(tmp_path, "wb")
+        except FileNotFoundError:
+            # the folder is only created when a write finds it missing, never checked up front
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            fd = open(tmp_path, "wb")
+        with fd:
+            fd.write(data)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+class PageWriter:
+    """
+    writes rendered pages on background threads so the next page renders while the last one is written.
+    At most max_pending pages wait in memory, unchanged files are not touched
+    """
+
+    def __init__(self, threads=4, max_pending=64):
+        import concurrent.futures
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=threads, thread_name_prefix="page-writer")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.futures = []
+        self.written = 0
+        self.unchanged = 0
+
+    def submit(self, dest_path, text, key=None):
+        """queues a page, blocks while max_pending pages are already waiting. key names the page in errors"""
+        self.slots.acquire()
+        try:
+            future = self.pool.submit(self._write, dest_path, text)
+        except BaseException:
+            self.slots.release()
+            raise
+        self.futures.append((dest_path if key is None else key, future))
+
+    def _write(self, dest_path, text):
+        try:
+            return write_if_changed(dest_path, text)
+        finally:
+            self.slots.release()
+
+    def close(self):
+        """waits for every queued page and returns the (key, error) pairs of the writes that failed"""
+        errors = []
+        for key, future in self.futures:
+            try:
+                if future.result():
+                    self.written += 1
+                else:
+                    self.unchanged += 1
+            except Exception as e:
+                errors.append((key, f"{type(e).__name__}: {e}"))
+        self.futures = []
+        self.pool.shutdown()
+        return errors
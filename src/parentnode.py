@@ -3,16 +3,44 @@ from leafnode import LeafNode
 
 class ParentNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, value=None, children=children, props=props)
+
+    def __reduce__(self):
+        return (ParentNode, (self.tag, self.children, self.props))
     
-    def to_html(self):
+    def _check(self):
         if not isinstance(self.tag, str):
             raise ValueError(f"All parent nodes must have a tag. Current tag: {self.tag}")
         if not isinstance(self.children, list):
             raise ValueError(f"All parent nodes must have children. Current Children: {self.children}")
-        
+
+    def to_html(self):
+        self._check()
         children_html = "".join(child.to_html() for child in self.children) # recursively call to_html for each child
         if isinstance(self.props, dict):
             return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
         return f"<{self.tag}>{children_html}</{self.tag}>"
+
+    def iter_html(self):
+        """yields the open tag, every child's html and the close tag without building the subtree string"""
+        self._check()
+        if isinstance(self.props, dict):
+            yield f"<{self.tag}{self.props_to_html()}>"
+        else:
+            yield f"<{self.tag}>"
+        # runs of leaf children are small, join them into one fragment instead of yielding each
+        leaves = []
+        for child in self.children:
+            if isinstance(child, LeafNode):
+                leaves.append(child.to_html())
+                continue
+            if leaves:
+                yield "".join(leaves)
+                leaves = []
+            yield from child.iter_html()
+        if leaves:
+            yield "".join(leaves)
+        yield f"</{self.tag}>"
@@ -0,0 +1,133 @@
+import functools
+import re
+
+# Every regular expression the generator runs, compiled once at import (code lexers on first use of their language).
+# Each one is audited against catastrophic backtracking: no pattern nests quantifiers or lets two
+# quantifiers compete for the same characters, so a failed match attempt costs at most one scan to the
+# next delimiter the repeated class excludes and a whole document is matched in near linear time.
+# test_patterns.py checks them against their original raw string forms and times every one on hostile input,
+# the inline markers and closers through the strict text_to_textnodes scan that drives them.
+
+# markdown images and links, group 1 is the alt/link text and group 2 the url.
+# The bracket and paren classes exclude their own delimiters, an attempt stops at the next [ ] ( or )
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+# inline scanner patterns, fixed width alternatives only
+INLINE_DELIMITERS = re.compile(r"\*\*|[*`_]") # "**" wins over "*" the same way str.split("**") does
+INLINE_MARKERS = re.compile(r"\*\*|[*`_]|!?\[")
+# a single "*" only closes on a star that is not part of "**"
+INLINE_CLOSERS = {"**": re.compile(r"\*\*"), "*": re.compile(r"(?<!\*)\*(?!\*)"), "`": re.compile(r"`"), "_": re.compile(r"_")}
+
+# an inline code span, links and images inside one are code. The class excludes the backtick, an attempt
+# stops at the next one and only the last, unclosed backtick of a block can fail
+CODE_SPAN = re.compile(r"`[^`]*`")
+
+# a blank line between two blocks, in text and in raw bytes with any newline convention
+BLANK_LINE = re.compile(r"\n[ \t]*\n")
+BLANK_LINE_BYTES = re.compile(rb"(?:\r\n|\r(?!\n)|\n)[ \t]*(?:\r\n|\r(?!\n)|\n)")
+
+# the first bytes of a block decide its type: 1 heading, 2 code fence, 3 quote, 4 unordered, 5 ordered.
+# Only ever used with match(), so it is anchored at the block start
+BLOCK_START = re.compile(r"(#{1,6}) |(```)|(>)|([*-] )|(1\. )")
+# what a quote line loses before its text: one > and up to 4 spaces or tabs, used with match()
+QUOTE_PREFIX = re.compile(r">?[ \t]{0,4}")
+
+# the first "# " of a doc starts its title, a search stops there instead of collecting every match
+TITLE_PATTERN = re.compile(r"# (.*)")
+TITLE_BYTES = re.compile(rb"# ([^\r\n]*)")
+
+# front matter: a first line of ---, key: value lines and a closing --- line, group 1 is the lines between.
+# Only used with match(). The lazy body only ever tries a fixed "\n---" after each character, so a doc whose
+# front matter never closes costs one scan to its end
+FRONT_MATTER = re.compile(r"---[ \t]*\r?\n(.*?\n)?---[ \t]*\r?(?:\n|\Z)", re.DOTALL)
+FRONT_MATTER_BYTES = re.compile(rb"---[ \t]*\r?\n(.*?\n)?---[ \t]*\r?(?:\n|\Z)", re.DOTALL)
+
+# what a tag loses on its way into a url, runs of anything but word characters
+TAG_SLUG = re.compile(r"[^\w]+")
+
+# the extension a content file name loses when it renders to .html
+FILE_EXTENSION = re.compile(r"\.[a-zA-Z]{1,16}$")
+
+# a word of the search index, a single quantified class
+SEARCH_WORD = re.compile(r"\w+")
+
+# asset pipeline. Regions (pre blocks, comments, css strings) are found by their opener here and closed with
+# str.find by the caller, a lazy .*? body would rescan to the end for every unclosed opener
+# html tags whose whitespace is content, group 1 is the tag name
+HTML_PRESERVED_OPEN = re.compile(r"<(pre|code|textarea|script|style)\b", re.IGNORECASE)
+HTML_PRESERVED_CLOSE = {tag: re.compile(rf"</{tag}\s*>", re.IGNORECASE) for tag in ["pre", "code", "textarea", "script", "style"]}
+# an attribute holding a url (a comma separated list of "url width" for srcset), group 2 is the value
+HTML_URL_ATTRIBUTE = re.compile(r"(\s(?:href|src|srcset)=\")([^\"]*)(\")")
+WHITESPACE = re.compile(r"\s+")
+# what starts a css region that minification must not touch: a string or a comment
+CSS_REGION_OPEN = re.compile(r"[\"']|/\*")
+# space css never needs around these characters, and after a colon. Runs on css whose whitespace is already
+# collapsed to single spaces, a \s* here would rescan every long run of spaces from each of its positions
+CSS_PUNCTUATION_SPACE = re.compile(r" ?([{};,>]) ?|: ")
+# url(...) with an optional quote, group 2 is the url. The url class stops at quotes, parens and spaces,
+# so a failed attempt never runs past the next url(
+CSS_URL = re.compile(r"url\( ?(['\"]?)([^'\"()\s]*)\1 ?\)")
+
+# code block lexers. A rule is (css class, pattern, closer): a rule with a closer matches only the opener of a
+# region (block comment, triple quoted or template string) and the highlighter finds its end with str.find,
+# so an unclosed one costs a single scan. Strings end at the line end when their quote never comes, and
+# escapes are single pairs, a failed attempt never rescans a line. Classes are the short pygments ones
+_DOUBLE_QUOTED = r'"(?:[^"\\\n]|\\.)*"?'
+_SINGLE_QUOTED = r"'(?:[^'\\\n]|\\.)*'?"
+_NUMBER = r"\b(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)"
+
+def _keywords(words):
+    return rf"\b(?:{'|'.join(words.split())})\b"
+
+LEXER_RULES = {
+    "python": [
+        ("s", '"""', '"""'),
+        ("s", "'''", "'''"),
+        ("c", r"#[^\n]*", None),
+        ("s", _DOUBLE_QUOTED, None),
+        ("s", _SINGLE_QUOTED, None),
+        ("k", _keywords("False None True and as assert async await break class continue def del elif else except finally for from "
+                        "global if import in is lambda nonlocal not or pass raise return try while with yield"), None),
+        ("m", _NUMBER, None),
+    ],
+    "javascript": [
+        ("c", r"/\*", "*/"),
+        ("c", r"//[^\n]*", None),
+        ("s", "`", "`"),
+        ("s", _DOUBLE_QUOTED, None),
+        ("s", _SINGLE_QUOTED, None),
+        ("k", _keywords("async await break case catch class const continue debugger default delete do else export extends false "
+                        "finally for function if import in instanceof let new null of return super switch this throw true try "
+                        "typeof undefined var void while with yield"), None),
+        ("m", _NUMBER, None),
+    ],
+    "go": [
+        ("c", r"/\*", "*/"),
+        ("c", r"//[^\n]*", None),
+        ("s", "`", "`"),
+        ("s", _DOUBLE_QUOTED, None),
+        ("s", _SINGLE_QUOTED, None),
+        ("k", _keywords("break case chan const continue default defer else fallthrough false for func go goto if import interface "
+                        "map nil package range return select struct switch true type var"), None),
+        ("m", _NUMBER, None),
+    ],
+    "shell": [
+        # a # inside a word or after $ is not a comment
+        ("c", r"(?<![\w$])#[^\n]*", None),
+        ("s", _DOUBLE_QUOTED, None),
+        ("s", _SINGLE_QUOTED, None),
+        ("nv", r"\$(?:\w+|\{[^}\n]*\}?)", None),
+        ("k", _keywords("case do done elif else esac export fi for function if in local return then until while"), None),
+    ],
+    "json": [
+        ("s", _DOUBLE_QUOTED, None),
+        ("k", _keywords("true false null"), None),
+        ("m", r"-?" + _NUMBER, None),
+    ],
+}
+
+@functools.lru_cache(maxsize=None)
+def lexer(language):
+    """the alternation of a language's LEXER_RULES, group t<i> is rule i. Compiled the first time a block needs it"""
+    return re.compile("|".join(f"(?P<t{i}>{pattern})" for i, (_, pattern, _) in enumerate(LEXER_RULES[language])))
@@ -0,0 +1,84 @@
+import contextlib
+import time
+
+# stages generate_page records for every page when a profile is active
+PAGE_STAGES = ["read", "parse", "inline", "title", "serialize", "template", "write"]
+
+# the profile of the running build, None keeps every hook a single attribute check
+active = None
+
+
+class BuildProfile:
+    """wall times of a build, per build phase and per page stage"""
+
+    def __init__(self):
+        self.phases = {}
+        self.pages = {}
+        # text_to_textnodes time, generate_page moves it into the page it belongs to
+        self.inline_seconds = 0.0
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """times a whole build phase such as copying static assets"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def add_page(self, page, stages):
+        self.pages[page] = stages
+
+    def stage_totals(self):
+        totals = {stage: 0.0 for stage in PAGE_STAGES}
+        for stages in self.pages.values():
+            for stage, seconds in stages.items():
+                totals[stage] += seconds
+        return totals
+
+    def slowest(self, count=10):
+        """the count slowest pages as (page, total seconds, stages) tuples"""
+        ranked = sorted(self.pages.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return [(page, sum(stages.values()), stages) for page, stages in ranked[:count]]
+
+    def to_dict(self, count=10):
+        return {
+            "phases": self.phases,
+            "stages": self.stage_totals(),
+            "slowest": [{"page": page, "seconds": seconds, "stages": stages} for page, seconds, stages in self.slowest(count)],
+            "pages": self.pages,
+        }
+
+    def write_json(self, path, count=10):
+        import json
+        with open(path, "w", encoding="utf-8") as fd:
+            json.dump(self.to_dict(count), fd, indent=1)
+
+    def summary(self, count=10):
+        """human readable report: build phases, per-stage breakdown and the slowest pages"""
+        lines = ["build phases:"]
+        for name, seconds in self.phases.items():
+            lines.append(f"  {name:<12} {seconds:9.4f}s")
+
+        totals = self.stage_totals()
+        page_total = sum(totals.values()) or 1.0
+        lines.append(f"page stages ({len(self.pages)} pages rendered):")
+        for stage in PAGE_STAGES:
+            lines.append(f"  {stage:<12} {totals[stage]:9.4f}s {100 * totals[stage] / page_total:5.1f}%")
+
+        lines.append(f"slowest pages:")
+        for page, seconds, stages in self.slowest(count):
+            worst = max(stages, key=stages.get)
+            lines.append(f"  {seconds:9.4f}s  {page}  (mostly {worst})")
+        return "\n".join(lines)
+
+
+def enable():
+    """starts recording into a fresh profile and returns it"""
+    global active
+    active = BuildProfile()
+    return active
+
+def disable():
+    global active
+    active = None
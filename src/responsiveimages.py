@@ -0,0 +1,334 @@
+import hashlib
+import itertools
+import json
+import logging
+import operator
+import os
+import zlib
+
+import assetsync
+import manifest
+import pagewriter
+
+# encoded derivatives, named by the source hash and width so an unchanged image is never encoded twice
+IMAGES_CACHE_PATH = ".ssg-cache/images"
+IMAGES_INDEX_VERSION = 1
+DEFAULT_WIDTHS = (480, 960)
+IMAGE_TYPES = {".png", ".gif", ".jpg", ".jpeg", ".webp"}
+
+logger = logging.getLogger("ssg")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# png color type -> channels, only 8 bit gray, rgb, gray+alpha and rgba are decoded
+PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+PNG_COLOR_TYPES = {channels: color for color, channels in PNG_CHANNELS.items()}
+
+def _jpeg_size(fd):
+    fd.seek(2)
+    while True:
+        marker = fd.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        kind = marker[1]
+        if kind == 0xFF:
+            # fill byte, the marker starts one byte later
+            fd.seek(-1, 1)
+            continue
+        if kind == 0x01 or 0xD0 <= kind <= 0xD8:
+            continue
+        length = int.from_bytes(fd.read(2), "big")
+        # every start of frame marker except DHT, JPG and DAC holds the size
+        if 0xC0 <= kind <= 0xCF and kind not in (0xC4, 0xC8, 0xCC):
+            frame = fd.read(5)
+            return int.from_bytes(frame[3:5], "big"), int.from_bytes(frame[1:3], "big")
+        fd.seek(length - 2, 1)
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        return int.from_bytes(head[26:28], "little") & 0x3FFF, int.from_bytes(head[28:30], "little") & 0x3FFF
+    if chunk == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+def image_size(path):
+    """(width, height) read from the header of a png, gif, jpeg or webp file, None for anything else"""
+    with open(path, "rb") as fd:
+        head = fd.read(32)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return int.from_bytes(head[16:20], "big"), int.from_bytes(head[20:24], "big")
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return int.from_bytes(head[6:8], "little"), int.from_bytes(head[8:10], "little")
+        if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+            return _webp_size(head)
+        if head.startswith(b"\xff\xd8"):
+            return _jpeg_size(fd)
+    return None
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+def _unfilter(kind, row, prev, channels):
+    if kind == 1:
+        # each byte adds the one a pixel to its left, a running sum per channel does the whole row
+        for c in range(channels):
+            row[c::channels] = bytes(total & 255 for total in itertools.accumulate(row[c::channels]))
+    elif kind == 2:
+        row[:] = bytes((a + b) & 255 for a, b in zip(row, prev))
+    elif kind == 3:
+        for i in range(len(row)):
+            left = row[i - channels] if i >= channels else 0
+            row[i] = (row[i] + ((left + prev[i]) >> 1)) & 255
+    elif kind == 4:
+        for i in range(len(row)):
+            if i >= channels:
+                row[i] = (row[i] + _paeth(row[i - channels], prev[i], prev[i - channels])) & 255
+            else:
+                row[i] = (row[i] + prev[i]) & 255
+    elif kind != 0:
+        raise ValueError(f"unknown png filter {kind}")
+
+def read_png(path):
+    """decodes an 8 bit, non interlaced png to (width, height, channels, rows), None for any other kind of image"""
+    with open(path, "rb") as fd:
+        data = fd.read()
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    pos = len(PNG_SIGNATURE)
+    header = None
+    idat = []
+    while pos + 8 <= len(data):
+        length = int.from_bytes(data[pos:pos + 4], "big")
+        kind = data[pos + 4:pos + 8]
+        if kind == b"IHDR":
+            header = data[pos + 8:pos + 8 + length]
+        elif kind == b"IDAT":
+            idat.append(data[pos + 8:pos + 8 + length])
+        elif kind == b"IEND":
+            break
+        pos += length + 12
+    if header is None:
+        return None
+    width, height = int.from_bytes(header[0:4], "big"), int.from_bytes(header[4:8], "big")
+    depth, color, interlace = header[8], header[9], header[12]
+    channels = PNG_CHANNELS.get(color)
+    if depth != 8 or channels is None or interlace:
+        return None
+    raw = zlib.decompress(b"".join(idat))
+    stride = width * channels
+    if len(raw) < height * (stride + 1):
+        raise ValueError("png data ends before its last row")
+    rows = []
+    prev = bytes(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        row = bytearray(raw[start + 1:start + 1 + stride])
+        _unfilter(raw[start], row, prev, channels)
+        rows.append(row)
+        prev = row
+    return width, height, channels, rows
+
+def downscale(rows, width, height, channels, new_width):
+    """box filters the rows down to new_width, keeping the aspect ratio. Returns (new_height, rows)"""
+    new_height = max(1, round(height * new_width / width))
+    xs = [x * width // new_width for x in range(new_width + 1)]
+    ys = [y * height // new_height for y in range(new_height + 1)]
+    # (first byte, end, columns) of every output value within a row
+    spans = [(xs[x] * channels + c, xs[x + 1] * channels, xs[x + 1] - xs[x]) for x in range(new_width) for c in range(channels)]
+    out = []
+    for y in range(new_height):
+        # sum the source rows first, the elementwise add runs in C, then every output value sums its columns
+        band = rows[ys[y]:ys[y + 1]]
+        total = list(band[0])
+        for row in band[1:]:
+            total = list(map(operator.add, total, row))
+        count = len(band)
+        out.append(bytes(sum(total[start:end:channels]) // (columns * count) for start, end, columns in spans))
+    return new_height, out
+
+def _png_chunk(kind, body):
+    return len(body).to_bytes(4, "big") + kind + body + zlib.crc32(kind + body).to_bytes(4, "big")
+
+def encode_png(rows, width, height, channels):
+    """png bytes of 8 bit rows, every row is up filtered which suits downscaled photos well"""
+    header = width.to_bytes(4, "big") + height.to_bytes(4, "big") + bytes([8, PNG_COLOR_TYPES[channels], 0, 0, 0])
+    raw = bytearray()
+    prev = bytes(width * channels)
+    for row in rows:
+        raw.append(2)
+        raw += bytes((a - b) & 255 for a, b in zip(row, prev))
+        prev = row
+    return PNG_SIGNATURE + _png_chunk(b"IHDR", header) + _png_chunk(b"IDAT", zlib.compress(bytes(raw), 9)) + _png_chunk(b"IEND", b"")
+
+def cache_file(cache_path, content_hash, width):
+    return f"{cache_path}/{content_hash[:24]}-{width}.png"
+
+def encode_derivatives(src, cache_files):
+    """
+    decodes src once and writes one derivative per (width, cache file). Runs in a worker process.
+    Returns False for a png it can not decode, a truncated or corrupt one is logged
+    """
+    try:
+        image = read_png(src)
+    except (zlib.error, ValueError, IndexError) as e:
+        logger.warning(f"{src}: not resized, {e}")
+        return False
+    if image is None:
+        return False
+    width, height, channels, rows = image
+    for new_width, path in cache_files:
+        new_height, new_rows = downscale(rows, width, height, channels, new_width)
+        pagewriter.write_if_changed(path, encode_png(new_rows, new_width, new_height, channels))
+    return True
+
+def derivative_name(rel_path, width):
+    """images/tom.png -> images/tom-480w.png"""
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}-{width}w{ext}"
+
+
+class ResponsiveImages:
+    """
+    the size and derivatives of every image of the site, keyed by the root relative url a page links it with.
+    Pages read it while rendering, the image stage fills it and keeps it in path between builds
+    """
+
+    def __init__(self, path, images=None, outputs=None):
+        self.path = path
+        # url -> {"width", "height", "srcset"}
+        self.images = images if images is not None else {}
+        # derivative files written into the site by the last run, pruned when no image needs them any more
+        self.outputs = outputs if outputs is not None else []
+        self.digest = self.compute_digest()
+
+    @classmethod
+    def load(cls, path):
+        if path is None or not os.path.isfile(path):
+            return cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != IMAGES_INDEX_VERSION:
+            return cls(path)
+        return cls(path, data.get("images", {}), data.get("outputs", []))
+
+    def save(self):
+        if self.path is None:
+            return
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            json.dump({"version": IMAGES_INDEX_VERSION, "images": self.images, "outputs": self.outputs}, fd, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def compute_digest(self):
+        """names the img attributes pages get, a page or cached block rendered with another digest is stale"""
+        return hashlib.blake2b(json.dumps(self.images, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+
+    def img_props(self, url, alt):
+        """the attributes of an img tag, with size, srcset and lazy loading when the image is known"""
+        props = {"src": url, "alt": alt}
+        image = self.images.get(url)
+        if image is None:
+            return props
+        props["width"] = str(image["width"])
+        props["height"] = str(image["height"])
+        if image["srcset"]:
+            props["srcset"] = image["srcset"]
+        props["loading"] = "lazy"
+        return props
+
+    def update(self, static_path, dest_path, base_path="/", widths=DEFAULT_WIDTHS, build_manifest=None, cache_path=IMAGES_CACHE_PATH, workers=None):
+        """
+        reads the size of every image under static_path and puts its derivatives next to its copy in dest_path.
+        Derivatives missing from cache_path are encoded in a process pool, cached ones are only linked.
+        Returns the number of images encoded
+        """
+        images = {}
+        outputs = []
+        used = set()
+        pending = []
+        links = []
+        for dir_path, dir_names, file_names in os.walk(static_path):
+            dir_names.sort()
+            for name in sorted(file_names):
+                if os.path.splitext(name)[1].lower() not in IMAGE_TYPES:
+                    continue
+                src = f"{dir_path}/{name}"
+                rel_path = os.path.relpath(src, static_path).replace(os.sep, "/")
+                size = image_size(src)
+                if size is None:
+                    continue
+                width, height = size
+                srcset = []
+                # the sync that copied static/ already hashed it
+                content_hash = build_manifest.static_hash(src) if build_manifest is not None else None
+                if content_hash is None:
+                    content_hash = manifest.file_hash(src)
+                missing = []
+                if name.lower().endswith(".png"):
+                    for new_width in sorted(w for w in widths if w < width):
+                        cached = cache_file(cache_path, content_hash, new_width)
+                        used.add(cached)
+                        if not os.path.isfile(cached):
+                            missing.append((new_width, cached))
+                        links.append((src, cached, rel_path, new_width))
+                if missing:
+                    pending.append((src, missing))
+                images[f"/{rel_path}"] = {"width": width, "height": height, "srcset": srcset}
+
+        # pngs the decoder does not handle (palette, 16 bit, interlaced, corrupt) keep their size and lazy loading only
+        encoded = self.encode(pending, workers)
+        failed = {src for (src, _), ok in zip(pending, encoded) if not ok}
+        for src, cached, rel_path, new_width in links:
+            if src in failed:
+                continue
+            name = derivative_name(rel_path, new_width)
+            dest = f"{dest_path}/{name}"
+            if not (os.path.isfile(dest) and os.path.samefile(cached, dest)):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                assetsync.copy_file(cached, dest, hardlink=True)
+            outputs.append(dest)
+            images[f"/{rel_path}"]["srcset"].append(f"{base_path}{name} {new_width}w")
+        for url, image in images.items():
+            if image["srcset"]:
+                # the original closes the list as the widest candidate
+                image["srcset"].append(f"{base_path}{url[1:]} {image['width']}w")
+            image["srcset"] = ", ".join(image["srcset"])
+
+        for path in set(self.outputs) - set(outputs):
+            manifest.remove_output(path)
+        if os.path.isdir(cache_path):
+            for name in os.listdir(cache_path):
+                if f"{cache_path}/{name}" not in used:
+                    os.remove(f"{cache_path}/{name}")
+        self.images = images
+        self.outputs = outputs
+        self.digest = self.compute_digest()
+        return len(pending) - len(failed)
+
+    def remove(self):
+        """deletes the derivatives of the last run and the saved index, the encoded cache is kept"""
+        for path in self.outputs:
+            manifest.remove_output(path)
+        if self.path is not None and os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def encode(self, pending, workers=None):
+        if len(pending) <= 1:
+            return [encode_derivatives(src, missing) for src, missing in pending]
+        # decoding and scaling are pure python, only separate processes run them side by side
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(encode_derivatives, *zip(*pending)))
@@ -0,0 +1,215 @@
+import bisect
+import hashlib
+import heapq
+import json
+import os
+
+import manifest
+import pagewriter
+
+SEARCH_VERSION = 1
+# a shard file grows past this many bytes only when it holds a single term
+SHARD_BYTES = 64 << 10
+
+# what a browser downloads, all of it in dest_path/search/:
+#   index.json   {"version": 1, "pages": "pages.json", "shards": [[first term, file], ...]} sorted by first term
+#   pages.json   [[url, title], ...] indexed by page id, null where a deleted page's id is free
+#   <file>.json  {term: [[page id, position, position, ...], ...]} for the terms from its first term up to the next shard's
+# a term is a casefolded \w+ run of the page text, a position counts the words of the page before it.
+# A client casefolds and splits the query the same way, bisects the first terms and fetches only the shards it needs
+
+def shard_file(first_term):
+    # named by its first term so a split only adds files, every other shard keeps its name
+    return f"{hashlib.blake2b(first_term.encode('utf-8'), digest_size=6).hexdigest()}.json"
+
+
+def published_files(folder):
+    """the files the public index in folder lists, none when it is missing or unreadable"""
+    try:
+        with open(f"{folder}/index.json", "r", encoding="utf-8") as fd:
+            meta = json.load(fd)
+        return {"index.json", meta["pages"], *(file for _, file in meta["shards"])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+
+
+class SearchIndex:
+    """
+    inverted index of the site's words. Pages are recorded as they render, only their own terms change,
+    and write() only rewrites the shards holding a changed term
+    """
+
+    def __init__(self, path, pages=None, postings=None, shards=None):
+        self.path = path
+        # source -> {"id": int, "url": str, "title": str, "digest": digest of its positions, "terms": [term]}
+        self.pages = pages if pages is not None else {}
+        # term -> [[page id, position, ...], ...] sorted by page id
+        self.postings = postings if postings is not None else {}
+        # first term of every shard, sorted, the first is always ""
+        self.shards = shards if shards is not None else [""]
+        # terms whose postings changed since the last write
+        self.dirty = set()
+        # ids of deleted pages, a heap built on first use
+        self.free_ids = None
+        self.next_id = 0
+
+    @classmethod
+    def load(cls, path):
+        """reads an index from disk, a missing, unreadable or outdated one starts empty"""
+        if not os.path.isfile(path):
+            return cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != SEARCH_VERSION:
+            return cls(path)
+        return cls(path, data["pages"], data["postings"], data["shards"])
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        # dumps runs the C encoder, dump into a file would encode in python
+        text = json.dumps({"version": SEARCH_VERSION, "pages": self.pages, "postings": self.postings, "shards": self.shards}, ensure_ascii=False, separators=(",", ":"))
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            fd.write(text)
+        os.replace(tmp_path, self.path)
+
+    def has(self, src):
+        return src in self.pages
+
+    def drop_postings(self, page):
+        for term in page["terms"]:
+            postings = self.postings[term]
+            # postings are sorted by page id, [id] sorts right before the page's own [id, position, ...]
+            del postings[bisect.bisect_left(postings, [page["id"]])]
+            if not postings:
+                del self.postings[term]
+            self.dirty.add(term)
+
+    def forget(self, src):
+        page = self.pages.pop(src, None)
+        if page is not None:
+            self.drop_postings(page)
+            if self.free_ids is not None:
+                heapq.heappush(self.free_ids, page["id"])
+
+    def record(self, src, url, title, positions):
+        """replaces what the index holds of a page with positions, its {term: [position]} from page_info"""
+        # positions are listed in first seen order, so the same words always give the same repr
+        digest = hashlib.blake2b(repr(positions).encode("utf-8"), digest_size=16).hexdigest()
+        old = self.pages.get(src)
+        if old is not None:
+            if old["digest"] == digest and old["url"] == url and old["title"] == title:
+                # re-rendered (a template change) but the words are the same, no shard changes
+                return
+            # a page keeps its id while it exists, so the postings of other pages never move
+            self.drop_postings(old)
+            page_id = old["id"]
+        else:
+            page_id = self.new_id()
+        self.pages[src] = {"id": page_id, "url": url, "title": title, "digest": digest, "terms": sorted(positions)}
+        for term, term_positions in positions.items():
+            bisect.insort(self.postings.setdefault(term, []), [page_id, *term_positions])
+            self.dirty.add(term)
+
+    def new_id(self):
+        """the lowest id no page holds, so pages.json stays dense"""
+        if self.free_ids is None:
+            used = {page["id"] for page in self.pages.values()}
+            self.next_id = max(used, default=-1) + 1
+            self.free_ids = [page_id for page_id in range(self.next_id) if page_id not in used]
+        if self.free_ids:
+            return heapq.heappop(self.free_ids)
+        self.next_id += 1
+        return self.next_id - 1
+
+    def retain(self, sources):
+        """drops every page whose source is not in sources"""
+        sources = set(sources)
+        for src in [src for src in self.pages if src not in sources]:
+            self.forget(src)
+
+    def shard_terms(self):
+        """the sorted terms of every shard"""
+        grouped = [[] for _ in self.shards]
+        for term in sorted(self.postings):
+            grouped[bisect.bisect_right(self.shards, term) - 1].append(term)
+        return grouped
+
+    def encode_term(self, term):
+        """the "term":[postings] member of a shard, shards are joined from these so no term is encoded twice"""
+        return f"{json.dumps(term, ensure_ascii=False)}:{json.dumps(self.postings[term], separators=(',', ':'))}".encode("utf-8")
+
+    def write(self, dest_path, shard_bytes=SHARD_BYTES):
+        """
+        writes the public index into dest_path/search/. Shards with no changed term are not encoded again,
+        a shard grown past shard_bytes is split in two and an emptied one is merged into the shard before it.
+        Returns the number of shard files written
+        """
+        folder = f"{dest_path}/search"
+        # pages and static files can live in the folder too, only files the index wrote are ever removed
+        old_files = published_files(folder) | {shard_file(first) for first in self.shards}
+        grouped = self.shard_terms()
+        # emptied shards go first, their terms range falls to the shard before them
+        self.shards = [first for first, terms in zip(self.shards, grouped) if terms or first == ""]
+        grouped = self.shard_terms()
+        # a shard changed when a changed term falls in its range, also one whose postings are all gone now
+        changed = {self.shards[bisect.bisect_right(self.shards, term) - 1] for term in self.dirty}
+        encoded = {}
+        members = {}
+        index = 0
+        while index < len(self.shards):
+            terms = grouped[index]
+            first = self.shards[index]
+            if first not in changed and os.path.isfile(f"{folder}/{shard_file(first)}"):
+                index += 1
+                continue
+            for term in terms:
+                if term not in members:
+                    members[term] = self.encode_term(term)
+            # each member takes its bytes and a comma, the braces take the last comma's place
+            sizes = [len(members[term]) + 1 for term in terms]
+            if sum(sizes) + 1 > shard_bytes and len(terms) > 1:
+                # split where half the bytes are on each side, both halves are looked at again
+                half, total, cut = sum(sizes) / 2, 0, 1
+                for cut, size in enumerate(sizes[:-1], 1):
+                    total += size
+                    if total >= half:
+                        break
+                self.shards.insert(index + 1, terms[cut])
+                grouped[index:index + 1] = [terms[:cut], terms[cut:]]
+                # the first half keeps the file name, but neither half is on disk yet
+                changed.add(terms[cut])
+                continue
+            encoded[first] = b"{" + b",".join(members[term] for term in terms) + b"}"
+            index += 1
+
+        written = 0
+        for first, text in encoded.items():
+            if pagewriter.write_if_changed(f"{folder}/{shard_file(first)}", text):
+                written += 1
+        pages = [None] * (max((page["id"] for page in self.pages.values()), default=-1) + 1)
+        for page in self.pages.values():
+            pages[page["id"]] = [page["url"], page["title"]]
+        pagewriter.write_if_changed(f"{folder}/pages.json", json.dumps(pages, ensure_ascii=False, separators=(",", ":")))
+        meta = {"version": SEARCH_VERSION, "pages": "pages.json", "shards": [[first, shard_file(first)] for first in self.shards]}
+        pagewriter.write_if_changed(f"{folder}/index.json", json.dumps(meta, ensure_ascii=False, separators=(",", ":")))
+
+        # shard files of merged shards
+        keep = {"index.json", "pages.json"} | {shard_file(first) for first in self.shards}
+        for name in old_files - keep:
+            manifest.remove_output(f"{folder}/{name}")
+        self.dirty.clear()
+        return written
+
+    def remove(self, dest_path):
+        """deletes the public index and the saved one, for a build that no longer makes a search index"""
+        folder = f"{dest_path}/search"
+        for name in published_files(folder) | {"index.json", "pages.json"} | {shard_file(first) for first in self.shards}:
+            manifest.remove_output(f"{folder}/{name}")
+        if os.path.isfile(self.path):
+            os.remove(self.path)
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+
+import assetsync
+import manifest
+import pagewriter
+import siteindex
+
+# shard outputs live in SHARDS_PATH/<i>-of-<N>, what merge needs to know about a shard is kept beside the pages
+SHARDS_PATH = "shards"
+SHARD_META = ".ssg-shard"
+
+def parse_shard(text):
+    """reads "i/N" into (i, N), shards are numbered 1 to N"""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"a shard is written i/N, got {text!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard {text} is not between 1/{count} and {count}/{count}")
+    return index, count
+
+def shard_name(shard):
+    index, count = shard
+    return f"{index}-of-{count}"
+
+def page_shard(rel_path, count):
+    """the shard 1..count a page belongs to, from a hash of its path under content/ so every machine agrees"""
+    digest = hashlib.blake2b(rel_path.replace(os.sep, "/").encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+def in_shard(src, content_path, shard):
+    return page_shard(os.path.relpath(src, content_path), shard[1]) == shard[0]
+
+def index_path(shard_dir):
+    return f"{shard_dir}/{SHARD_META}/index.json"
+
+def write_shard_info(shard_dir, shard, outputs):
+    """records which shard a directory holds and the pages it rendered, merge checks both"""
+    os.makedirs(f"{shard_dir}/{SHARD_META}", exist_ok=True)
+    rel_outputs = sorted(os.path.relpath(output, shard_dir) for output in outputs)
+    with open(f"{shard_dir}/{SHARD_META}/shard.json", "w", encoding="utf-8") as fd:
+        json.dump({"shard": list(shard), "outputs": rel_outputs}, fd, separators=(",", ":"))
+
+def read_shard_info(shard_dir):
+    with open(f"{shard_dir}/{SHARD_META}/shard.json", "r", encoding="utf-8") as fd:
+        data = json.load(fd)
+    return tuple(data["shard"]), data["outputs"]
+
+
+class ShardMergeError(Exception):
+    """raised when shard outputs cannot be combined: a shard is missing or two sources claim one output"""
+
+
+def merge_shards(shard_dirs, static_path, dest_path, build_manifest, hardlink=False):
+    """
+    combines the pages of every shard directory and the static assets into dest_path.
+    Raises ShardMergeError before writing anything when the shards do not cover 1..N exactly or when a path
+    is produced twice. Unchanged files are left alone and files no source produces any more are removed.
+    Returns a SiteIndex of the merged site, with outputs under dest_path
+    """
+    shards = {}
+    for shard_dir in shard_dirs:
+        shard, outputs = read_shard_info(shard_dir)
+        if shard in shards:
+            raise ShardMergeError(f"shard {shard_name(shard)} found twice: {shards[shard][0]} and {shard_dir}")
+        shards[shard] = (shard_dir, outputs)
+    counts = {count for _, count in shards}
+    if len(counts) != 1:
+        raise ShardMergeError(f"shards of different partitions cannot be merged: {sorted(shard_name(s) for s in shards)}")
+    count = counts.pop()
+    missing = [index for index in range(1, count + 1) if (index, count) not in shards]
+    if missing:
+        raise ShardMergeError(f"missing shard(s) {', '.join(f'{index}/{count}' for index in missing)}")
+
+    # every output path must come from exactly one place
+    owners = {}
+    for dir_path, _, file_names in os.walk(static_path):
+        for name in file_names:
+            owners[os.path.relpath(f"{dir_path}/{name}", static_path)] = f"{dir_path}/{name}"
+    collisions = []
+    for shard in sorted(shards):
+        shard_dir, outputs = shards[shard]
+        for rel_path in outputs:
+            src = f"{shard_dir}/{rel_path}"
+            if rel_path in owners:
+                collisions.append(f"{rel_path}: {owners[rel_path]} and {src}")
+            else:
+                owners[rel_path] = src
+    if collisions:
+        raise ShardMergeError(f"{len(collisions)} output(s) produced twice:\n" + "\n".join(collisions))
+
+    assetsync.sync_static(static_path, dest_path, build_manifest, hardlink=hardlink)
+    merged_index = siteindex.SiteIndex(None)
+    for shard in sorted(shards):
+        shard_dir, outputs = shards[shard]
+        for rel_path in outputs:
+            with open(f"{shard_dir}/{rel_path}", "r", encoding="utf-8") as fd:
+                pagewriter.write_if_changed(f"{dest_path}/{rel_path}", fd.read())
+        shard_index = siteindex.SiteIndex.load(index_path(shard_dir))
+        for src, page in shard_index.pages.items():
+            page = dict(page, output=f"{dest_path}/{os.path.relpath(page['output'], shard_dir)}")
+            merged_index.pages[src] = page
+
+    # pages of an earlier build or merge that no shard rendered any more
+    for dir_path, _, file_names in os.walk(dest_path):
+        for name in file_names:
+            path = f"{dir_path}/{name}"
+            if os.path.relpath(path, dest_path) not in owners:
+                manifest.remove_output(path)
+    # the pages in dest_path now come from the shards, the next full build re-renders them all to be sure
+    build_manifest.pages.clear()
+    return merged_index
@@ -0,0 +1,100 @@
+import json
+import os
+import urllib.parse
+
+INDEX_VERSION = 1
+
+
+class SiteIndex:
+    """
+    what every page of the site holds: source path -> title, output path and the urls of its links and images.
+    Filled during the render pass, so checking links never reads the generated html back
+    """
+
+    def __init__(self, path, pages=None):
+        self.path = path
+        # source -> {"title": str, "output": str, "links": [url], "images": [url]}
+        self.pages = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """reads an index from disk, a missing, unreadable or outdated one starts empty"""
+        if not os.path.isfile(path):
+            return cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return cls(path)
+        # rows are stored as [title, output, links, images] to keep the file small
+        pages = {src: {"title": row[0], "output": row[1], "links": row[2], "images": row[3]} for src, row in data.get("pages", {}).items()}
+        return cls(path, pages)
+
+    def save(self):
+        """writes the index through a temp file as compact json"""
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        rows = {src: [page["title"], page["output"], page["links"], page["images"]] for src, page in sorted(self.pages.items())}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            json.dump({"version": INDEX_VERSION, "pages": rows}, fd, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def has(self, src, output):
+        entry = self.pages.get(src)
+        return entry is not None and entry["output"] == output
+
+    def record(self, src, output, info):
+        """stores what generate_page returned for a page: its title, links and images"""
+        self.pages[src] = {"title": info["title"], "output": output, "links": info["links"], "images": info["images"]}
+
+    def forget(self, src):
+        self.pages.pop(src, None)
+
+    def retain(self, sources):
+        """drops every page whose source is not in sources"""
+        sources = set(sources)
+        for src in [src for src in self.pages if src not in sources]:
+            del self.pages[src]
+
+    def broken_references(self, dest_path):
+        """
+        returns (source, "link" or "image", url) for every internal url of a page that points at nothing
+        in dest_path. Urls with a scheme or host and bare #anchors are not checked
+        """
+        outputs = {os.path.normpath(page["output"]) for page in self.pages.values()}
+        found = {}
+
+        def exists(target):
+            if target not in found:
+                found[target] = (
+                    target in outputs
+                    or os.path.normpath(f"{target}/index.html") in outputs
+                    or os.path.isfile(target)
+                    or os.path.isfile(f"{target}/index.html")
+                )
+            return found[target]
+
+        broken = []
+        for src, page in sorted(self.pages.items()):
+            for kind, urls in (("link", page["links"]), ("image", page["images"])):
+                for url in urls:
+                    target = target_path(url, page["output"], dest_path)
+                    if target is not None and not exists(target):
+                        broken.append((src, kind, url))
+        return broken
+
+
+def target_path(url, page_output, dest_path):
+    """the file path an internal url of a page points at, or None for external urls and bare #anchors"""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = urllib.parse.unquote(parts.path)
+    if path.startswith("/"):
+        # root relative urls are written against the site root, before the base path is applied
+        return os.path.normpath(f"{dest_path}/{path}")
+    return os.path.normpath(os.path.join(os.path.dirname(page_output), path))
@@ -0,0 +1,83 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+import assetpipeline
+import pagewriter
+
+
+class TestMinify(unittest.TestCase):
+    def test_minify_css(self):
+        css = '/* theme */\nbody {\n  color : red ;\n  font-family: "A  B", serif;\n}\n/*! license */\na > b, i { margin: 0 }\n'
+        self.assertEqual(assetpipeline.minify_css(css), 'body{color :red;font-family:"A  B",serif}/*! license */ a>b,i{margin:0}')
+        # an escaped quote does not end a string, unclosed regions run to the end
+        self.assertEqual(assetpipeline.minify_css('a{content:"x\\"  ;"}  /* open'), 'a{content:"x\\"  ;"}')
+
+    def test_minify_html(self):
+        html = "<p>a   b\n\n  c</p><!-- note --><pre>  x\n  y</pre> <PRE>keep  this</Pre>  <!--[if IE]>ie<![endif]--><code>  z"
+        self.assertEqual(assetpipeline.minify_html(html), "<p>a b\nc</p><pre>  x\n  y</pre> <PRE>keep  this</Pre> <!--[if IE]>ie<![endif]--><code>  z")
+
+
+class TestRewrite(unittest.TestCase):
+    names = {"index.css": "index.00aa.css", "images/a.png": "images/a.11bb.png"}
+
+    def test_html_urls(self):
+        html = '<link href="/site/index.css" /><img src="../images/a.png?v=1" /><a href="https://x.org/index.css"></a><img src="/site/images/b.png" />'
+        self.assertEqual(assetpipeline.rewrite_html_urls(html, "blog/index.html", "/site/", self.names),
+                         '<link href="/site/index.00aa.css" /><img src="../images/a.11bb.png?v=1" /><a href="https://x.org/index.css"></a><img src="/site/images/b.png" />')
+
+    def test_srcset(self):
+        html = '<img srcset="/site/images/a.png 480w, /site/images/b.png 960w">'
+        self.assertEqual(assetpipeline.rewrite_html_urls(html, "index.html", "/site/", self.names),
+                         '<img srcset="/site/images/a.11bb.png 480w, /site/images/b.png 960w">')
+
+    def test_css_urls(self):
+        css = "a{background:url('images/a.png')} b{background:url(/images/a.png#x)}"
+        self.assertEqual(assetpipeline.rewrite_css_urls(css, "index.css", "/", self.names),
+                         "a{background:url('images/a.11bb.png')} b{background:url(/images/a.11bb.png#x)}")
+
+
+class TestAssetPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = f"{self.tmp.name}/docs"
+        self.dest = f"{self.tmp.name}/dist"
+        self.cache = f"{self.tmp.name}/assets.json"
+        self.write("index.css", "body {\n  background: url(images/a.png);\n}\n" * 20)
+        self.write("images/a.png", "not really a png")
+        self.write("index.html", '<html>\n\n  <link href="/index.css" rel="stylesheet" />\n' + "<p>text   text</p>\n" * 50 + "</html>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        # replaced like a build replaces it, dist/ may hold a hardlink of the old file
+        pagewriter.write_if_changed(f"{self.src}/{rel_path}", text)
+
+    def read(self, rel_path):
+        with open(f"{self.dest}/{rel_path}", "rb") as fd:
+            return fd.read()
+
+    def run_pipeline(self):
+        return assetpipeline.AssetPipeline(self.src, self.dest, "/", self.cache, threads=2).run()
+
+    def test_outputs_and_cache(self):
+        self.assertEqual(self.run_pipeline(), {"processed": 3, "cached": 0, "removed": 0})
+        outputs = sorted(os.path.relpath(f"{d}/{n}", self.dest) for d, _, names in os.walk(self.dest) for n in names)
+        png = [name for name in outputs if name.startswith("images/a.") and name != "images/a.png"][0]
+        css = [name for name in outputs if name.startswith("index.") and name.endswith(".css") and name != "index.css"][0]
+        self.assertEqual(outputs, sorted(["index.html", "index.html.gz", "index.css", "index.css.gz", css, f"{css}.gz", "images/a.png", png]))
+        self.assertIn(f'href="/{css}"'.encode(), self.read("index.html"))
+        self.assertIn(f"url({png})".encode(), self.read(css))
+        self.assertEqual(gzip.decompress(self.read("index.html.gz")), self.read("index.html"))
+
+        self.assertEqual(self.run_pipeline(), {"processed": 0, "cached": 3, "removed": 0})
+        # a changed image gets a new name, the css and html pointing at it are redone and the old copy removed
+        self.write("images/a.png", "another png")
+        self.assertEqual(self.run_pipeline(), {"processed": 3, "cached": 0, "removed": 3})
+        self.assertFalse(os.path.exists(f"{self.dest}/{png}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+import assetsync
+import manifest
+
+
+class TestAssetSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(f"{self.root}/static/images")
+        self.write("static/index.css", "body {}")
+        self.write("static/images/a.png", "png bytes")
+        self.build_manifest = manifest.Manifest(f"{self.root}/manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        with open(f"{self.root}/{rel_path}", "w", encoding="utf-8") as fd:
+            fd.write(text)
+
+    def read(self, rel_path):
+        with open(f"{self.root}/{rel_path}", "r", encoding="utf-8") as fd:
+            return fd.read()
+
+    def sync(self, hardlink=False):
+        return assetsync.sync_static(f"{self.root}/static", f"{self.root}/docs", self.build_manifest, hardlink=hardlink)
+
+    def test_first_sync_copies_everything(self):
+        self.assertEqual(len(self.sync()), 2)
+        self.assertEqual(self.read("docs/images/a.png"), "png bytes")
+
+    def test_unchanged_assets_are_skipped(self):
+        self.sync()
+        self.assertEqual(self.sync(), [])
+
+    def test_touched_asset_is_not_copied(self):
+        self.sync()
+        os.utime(f"{self.root}/static/index.css", ns=(0, 0))
+        self.assertEqual(self.sync(), [])
+
+    def test_changed_asset_is_copied(self):
+        self.sync()
+        self.write("static/index.css", "body { color: red }")
+        self.assertEqual(self.sync(), [f"{self.root}/static/index.css"])
+        self.assertEqual(self.read("docs/index.css"), "body { color: red }")
+
+    def test_removed_asset_is_pruned(self):
+        self.sync()
+        os.remove(f"{self.root}/static/images/a.png")
+        self.sync()
+        self.assertFalse(os.path.exists(f"{self.root}/docs/images"))
+        self.assertTrue(os.path.exists(f"{self.root}/docs/index.css"))
+
+    def test_hardlink(self):
+        self.sync(hardlink=True)
+        self.assertTrue(os.path.samefile(f"{self.root}/static/index.css", f"{self.root}/docs/index.css"))
+
+    def test_copy_file_keeps_mode(self):
+        os.chmod(f"{self.root}/static/index.css", 0o640)
+        os.makedirs(f"{self.root}/out")
+        assetsync.copy_file(f"{self.root}/static/index.css", f"{self.root}/out/index.css")
+        self.assertEqual(os.stat(f"{self.root}/out/index.css").st_mode & 0o777, 0o640)
+        self.assertFalse(os.path.exists(f"{self.root}/out/index.css.tmp"))
+
+
+if __name__ == "__main__":
+    unittest.main()
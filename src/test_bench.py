@@ -0,0 +1,31 @@
+import unittest
+
+import bench
+
+
+class TestBench(unittest.TestCase):
+    def test_report_has_every_stage(self):
+        report = bench.run(["small", "lists"], 3, 10, 0)
+        for name in ["small", "lists"]:
+            corpus = report["corpora"][name]
+            self.assertEqual(sorted(corpus["stages"]), sorted(bench.STAGES))
+            self.assertGreater(corpus["peak_memory_bytes"], 0)
+
+    def test_corpora_are_valid_markdown(self):
+        for name, make in bench.CORPORA.items():
+            for markdown in make(bench.random.Random(1), 5, 50):
+                self.assertIsNotNone(bench.utils.markdown_to_html_node(markdown).to_html(), name)
+
+    def test_import_time(self):
+        result = bench.import_time("utils")
+        self.assertGreater(result["microseconds"], 0)
+        self.assertNotIn("utils", [item["module"] for item in result["heaviest"]])
+
+    def test_compare(self):
+        report = bench.run(["small"], 2, 10, 0)
+        # one line per stage plus one per measured import
+        self.assertEqual(len(bench.compare(report, report)), len(bench.STAGES) + len(report["import_time"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
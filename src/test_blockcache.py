@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+import blockcache
+import utils
+
+
+class TestBlockCache(unittest.TestCase):
+    def tearDown(self):
+        utils.disable_block_cache()
+
+    def test_lru_eviction(self):
+        cache = blockcache.BlockCache(max_entries=2)
+        cache.put("a", "<p>a</p>")
+        cache.put("b", "<p>b</p>")
+        cache.get("a")
+        cache.put("c", "<p>c</p>")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_persisted_cache_version(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = f"{root}/blocks.json"
+            cache = blockcache.BlockCache(version=1)
+            cache.put("a", "<p>a</p>")
+            cache.save(path)
+            self.assertEqual(blockcache.BlockCache.load(path, version=1).get("a"), "<p>a</p>")
+            self.assertIsNone(blockcache.BlockCache.load(path, version=2).get("a"))
+
+    def test_drain_and_merge(self):
+        worker = blockcache.BlockCache(version=1)
+        worker.put("old", "<p>old</p>")
+        worker.track_new()
+        worker.get("old")
+        worker.get("a")
+        worker.put("a", "<p>a</p>")
+        build = blockcache.BlockCache(version=1)
+        build.merge(*worker.drain())
+        self.assertEqual(list(build.entries), ["a"])
+        self.assertEqual((build.hits, build.misses), (1, 1))
+        # a second drain only hands back what came after the first
+        self.assertEqual(worker.drain(), ([], 0, 0))
+
+    def test_parallel_build_fills_the_saved_cache(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(f"{root}/content")
+            for name in ["a", "b", "c"]:
+                with open(f"{root}/content/{name}.md", "w", encoding="utf-8") as fd:
+                    fd.write(f"# {name}\n\nshared **text**\n\nonly {name}")
+            with open(f"{root}/template.html", "w", encoding="utf-8") as fd:
+                fd.write("{{ Title }}{{ Content }}")
+            cache = utils.enable_block_cache(64, f"{root}/blocks.json")
+            utils.generate_pages_recursive(f"{root}/content", f"{root}/template.html", f"{root}/docs", "/", jobs=2)
+            # 3 titles, the shared paragraph and 3 others, each page is its own worker task
+            self.assertEqual(len(cache.entries), 7)
+            self.assertEqual(cache.hits + cache.misses, 9)
+
+    def test_cached_render_is_identical(self):
+        markdown = "# Title\n\nsome **bold** text\n\n- a\n- b\n\nsome **bold** text\n\n> quote"
+        plain = utils.markdown_to_html_node(markdown).to_html()
+        cache = utils.enable_block_cache()
+        self.assertEqual(utils.markdown_to_html_node(markdown).to_html(), plain)
+        self.assertEqual(utils.markdown_to_html_node(markdown).to_html(), plain)
+        stats = cache.stats()
+        self.assertEqual(stats["misses"], 4)
+        self.assertEqual(stats["hits"], 6)
+
+    def test_invalid_block_is_not_cached(self):
+        cache = utils.enable_block_cache()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                utils.markdown_to_html_node("> quote\nnot quote")
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
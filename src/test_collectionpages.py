@@ -0,0 +1,112 @@
+import os
+import unittest
+
+import collectionpages
+import manifest
+import testhelpers
+import utils
+
+
+class TestListings(unittest.TestCase):
+    def test_paginate_from_the_oldest(self):
+        self.assertEqual(collectionpages.paginate(list(range(25)), 10), [list(range(10)), list(range(10, 25))])
+        self.assertEqual(collectionpages.paginate(list(range(3)), 10), [[0, 1, 2]])
+        self.assertEqual(collectionpages.paginate([], 10), [[]])
+
+    def test_feed_authors(self):
+        entries = [("/blog/a/", "A", "2024-01-02", (), "", "Bilbo"), ("/blog/b/", "B", "", (), "", "")]
+        feed = collectionpages.feed_xml("Blog", "https://example.org/site/", "/blog/", entries, collectionpages.feed_author("https://example.org"))
+        # the feed has an author, so the entry without one is valid Atom too
+        self.assertIn("<updated>2024-01-02T00:00:00Z</updated>\n<author><name>example.org</name></author>", feed)
+        self.assertIn("<id>https://example.org/site/blog/a/</id>\n<updated>2024-01-02T00:00:00Z</updated>\n<author><name>Bilbo</name></author>", feed)
+        self.assertEqual(feed.count("<author>"), 2)
+        self.assertEqual(collectionpages.feed_author("https://example.org", "Frodo"), "Frodo")
+
+    def test_dates_and_slugs(self):
+        self.assertEqual(collectionpages.parse_date("2024-03-01T10:00:00Z"), "2024-03-01")
+        self.assertEqual(collectionpages.parse_date("March"), "")
+        self.assertEqual(collectionpages.tag_slug("Middle Earth!"), "middle-earth")
+
+    def test_listing_html(self):
+        entries = [("/blog/a/", "A & B", "2024-01-02", ("Elves",), "short", "")]
+        self.assertEqual(collectionpages.listing_html("blog", entries, None, "/blog/page/1/"),
+                         '<div><ul><li><a href="/blog/a/">A &amp; B</a> <time datetime="2024-01-02">2024-01-02</time>'
+                         ' <a href="/blog/tags/elves/" rel="tag">Elves</a><p>short</p></li></ul>'
+                         '<nav><a href="/blog/page/1/" rel="next">Older posts</a></nav></div>')
+
+
+class TestCollections(testhelpers.TempSiteMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("content/index.md", "# Home")
+        for day in range(1, 26):
+            self.post(day)
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.path = f"{self.root}/collections.json"
+        self.manifest_path = f"{self.root}/manifest.json"
+
+    def read(self, rel_path):
+        return super().read(f"docs/{rel_path}")
+
+    def post(self, day):
+        tags = "odd" if day % 2 else "even"
+        self.write(f"content/blog/p{day}/index.md", f"---\ndate: 2024-01-{day:02}\ntags: [{tags}]\n---\n# Post {day}\n\nbody")
+
+    def build(self):
+        build_manifest = manifest.Manifest.load(self.manifest_path)
+        collections = collectionpages.Collections.load(self.path, f"{self.root}/content", ["blog"])
+        before = {src: entry["hash"] for src, entry in build_manifest.pages.items()}
+        utils.generate_pages_recursive(f"{self.root}/content", f"{self.root}/template.html", f"{self.root}/docs", "/site/", build_manifest, collections=collections)
+        rendered = collections.write(f"{self.root}/docs", f"{self.root}/template.html", "/site/", "https://example.org")
+        build_manifest.save()
+        collections.save()
+        pages = sorted(src for src, entry in build_manifest.pages.items() if before.get(src) != entry["hash"])
+        return collections, rendered, pages
+
+    def test_listings_tags_and_feed(self):
+        collections, rendered, _ = self.build()
+        # 2 blog pages, a page for each tag and the feed
+        self.assertEqual(rendered, 5)
+        newest = self.read("blog/index.html")
+        self.assertTrue(newest.startswith("<title>Blog</title><div><ul><li><a href=\"/site/blog/p25/\">Post 25</a>"))
+        self.assertIn('<a href="/site/blog/page/1/" rel="next">Older posts</a>', newest)
+        self.assertEqual(newest.count("<li>"), 15)
+        self.assertIn('<a href="/site/blog/" rel="prev">Newer posts</a>', self.read("blog/page/1/index.html"))
+        self.assertEqual(self.read("blog/tags/odd/index.html").count("<li>"), 13)
+        feed = self.read("blog/feed.xml")
+        self.assertIn("<id>https://example.org/site/blog/p25/</id>", feed)
+        self.assertEqual(feed.count("<entry>"), collectionpages.FEED_ENTRIES)
+        # the front matter is not part of a post
+        self.assertEqual(self.read("blog/p1/index.html"), "<title>Post 1</title><div><h1>Post 1</h1><p>body</p></div>")
+
+    def test_titles_are_escaped_once(self):
+        self.write("content/blog/p1/index.md", "---\ndate: 2024-01-01\ntitle: Tom & Jerry\ntags: [R&D]\n---\n# Post 1")
+        self.build()
+        # a front matter title and a listing title take the same path into {{ Title }}
+        self.assertTrue(self.read("blog/p1/index.html").startswith("<title>Tom &amp; Jerry</title>"))
+        self.assertTrue(self.read("blog/tags/r-d/index.html").startswith("<title>Blog tagged R&amp;D</title>"))
+
+    def test_new_post_renders_its_pages_only(self):
+        self.build()
+        _, rendered, pages = self.build()
+        self.assertEqual((rendered, pages), (0, []))
+        self.post(26)
+        collections, rendered, pages = self.build()
+        # the newest blog page, the newest "even" page and the feed
+        self.assertEqual(rendered, 3)
+        self.assertEqual(pages, [f"{self.root}/content/blog/p26/index.md"])
+        self.assertIn("Post 26", self.read("blog/index.html"))
+
+    def test_deleted_posts_drop_their_pages(self):
+        self.build()
+        for day in range(1, 26, 2):
+            os.remove(f"{self.root}/content/blog/p{day}/index.md")
+        collections, _, _ = self.build()
+        self.assertEqual(len(collections.posts), 12)
+        self.assertFalse(os.path.exists(f"{self.root}/docs/blog/tags/odd"))
+        self.assertFalse(os.path.exists(f"{self.root}/docs/blog/page/1"))
+        self.assertEqual(self.read("blog/index.html").count("<li>"), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import unittest
+
+import devserver
+import testhelpers
+import utils
+
+
+class TestSiteWatcher(testhelpers.TempSiteMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("content/index.md", "# Home\n\nhello")
+        self.write("content/blog/index.md", "# Blog\n\nposts")
+        self.write("static/index.css", "body {}")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.watcher = devserver.SiteWatcher("/", f"{self.root}/content", f"{self.root}/static", f"{self.root}/template.html", f"{self.root}/docs", f"{self.root}/manifest.json")
+        self.watcher.build()
+
+    def write(self, rel_path, text):
+        super().write(rel_path, text)
+        # a distinct mtime per write so a poll never misses a change made within the same clock tick
+        path = f"{self.root}/{rel_path}"
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_markdown_change_renders_only_its_page(self):
+        self.write("docs/blog/index.html", "untouched")
+        self.write("content/index.md", "# Home\n\nbye")
+        self.assertEqual(self.watcher.poll(), [f"{self.root}/content/index.md"])
+        self.assertIn("bye", self.read("docs/index.html"))
+        self.assertEqual(self.read("docs/blog/index.html"), "untouched")
+
+    def test_template_change_renders_every_page(self):
+        self.write("template.html", "<h0>{{ Title }}</h0>{{ Content }}")
+        self.watcher.poll()
+        self.assertTrue(self.read("docs/index.html").startswith("<h0>Home"))
+        self.assertTrue(self.read("docs/blog/index.html").startswith("<h0>Blog"))
+
+    def test_static_change_and_removal(self):
+        self.write("static/images/a.png", "png")
+        self.write("static/index.css", "body { color: red }")
+        self.watcher.poll()
+        self.assertEqual(self.read("docs/images/a.png"), "png")
+        self.assertEqual(self.read("docs/index.css"), "body { color: red }")
+        os.remove(f"{self.root}/static/images/a.png")
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(f"{self.root}/docs/images"))
+
+    def test_vanished_static_file_is_skipped(self):
+        self.write("static/gone.css", "x")
+        os.remove(f"{self.root}/static/gone.css")
+        self.watcher.copy_static(f"{self.root}/static/gone.css")
+        self.assertNotIn(f"{self.root}/static/gone.css", self.watcher.build_manifest.static)
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_pages_are_recorded_with_the_build_key(self):
+        self.write("content/index.md", "# Home\n\nbye")
+        self.watcher.poll()
+        entry = self.watcher.build_manifest.pages[f"{self.root}/content/index.md"]
+        self.assertEqual(entry["template"], utils.page_template_key(f"{self.root}/template.html"))
+
+    def test_new_and_deleted_pages(self):
+        self.write("content/new/index.md", "# New")
+        self.watcher.poll()
+        self.assertTrue(os.path.isfile(f"{self.root}/docs/new/index.html"))
+        os.remove(f"{self.root}/content/blog/index.md")
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(f"{self.root}/docs/blog/index.html"))
+
+    def test_broken_page_keeps_watching(self):
+        self.write("content/index.md", "no title")
+        with self.assertLogs(utils.logger, "ERROR") as logs:
+            self.watcher.poll()
+        self.assertEqual(logs.output, [f"ERROR:ssg:{self.root}/content/index.md: Exception: No H1 header was found in the markdown"])
+        self.write("content/index.md", "# Fixed")
+        self.watcher.poll()
+        self.assertIn("Fixed", self.read("docs/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
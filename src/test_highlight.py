@@ -0,0 +1,39 @@
+import unittest
+
+import highlight
+import utils
+
+
+class TestHighlight(unittest.TestCase):
+    def test_code_block_html(self):
+        markdown = '```python\ndef f(x):\n    return "<b>" + x  # *not* _inline_\n```'
+        self.assertEqual(utils.markdown_to_html_node(markdown).to_html(),
+                         '<div><pre><code class="language-python"><span class="k">def</span> f(x):\n'
+                         '    <span class="k">return</span> <span class="s">"&lt;b&gt;"</span> + x  <span class="c"># *not* _inline_</span>'
+                         '</code></pre></div>')
+
+    def test_no_language(self):
+        self.assertEqual(utils.markdown_to_html_node("```\na *b* _c_ `d` & e\n```").to_html(), "<div><pre><code>a *b* _c_ `d` &amp; e</code></pre></div>")
+        self.assertEqual(utils.markdown_to_html_node("```cobol\nDISPLAY 'x'.\n```").to_html(), "<div><pre><code class=\"language-cobol\">DISPLAY 'x'.</code></pre></div>")
+        self.assertEqual(utils.split_code_block("```one line```"), ("", "one line"))
+
+    def test_regions(self):
+        code = 'let s = `a\n${b}` /* open'
+        self.assertEqual(list(highlight.tokens(code, "javascript")),
+                         [("k", "let"), (None, " s = "), ("s", "`a\n${b}`"), (None, " "), ("c", "/* open")])
+        # an unclosed string ends with its line
+        self.assertEqual(list(highlight.tokens('echo "a\n$HOME', "shell")), [(None, "echo "), ("s", '"a'), (None, "\n"), ("nv", "$HOME")])
+
+    def test_cache(self):
+        first = highlight.code_node("py", "x = 1")
+        hits = highlight.cache.hits
+        self.assertIs(highlight.code_node("py", "x = 1"), first)
+        self.assertEqual(highlight.cache.hits, hits + 1)
+        self.assertIsNot(highlight.code_node("python", "x = 1"), first)
+
+    def test_words_are_the_code(self):
+        self.assertEqual(utils.block_words('```python\nprint("a < b")\n```'), ("print", "a", "b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
+import pickle
 import unittest
 
-from leafnode import LeafNode
+from leafnode import LeafNode, text_leaf
 
 class TestLeafNode(unittest.TestCase):
     def test_eq(self):
@@ -24,5 +25,18 @@ class TestLeafNode(unittest.TestCase):
         node = LeafNode("a", "google.com", props={"href": "https://www.google.com","target": "_blank",})
         self.assertEqual(node.to_html(), "<a href=\"https://www.google.com\" target=\"_blank\">google.com</a>")
 
+    def test_immutable(self):
+        node = LeafNode("b", "bold")
+        with self.assertRaises(AttributeError):
+            node.value = "changed"
+
+    def test_text_leaf_is_shared(self):
+        self.assertIs(text_leaf("plain"), text_leaf("plain"))
+        self.assertEqual(text_leaf("plain").to_html(), "plain")
+
+    def test_pickle(self):
+        node = LeafNode("a", "google.com", props={"href": "https://www.google.com"})
+        self.assertEqual(pickle.loads(pickle.dumps(node)).to_html(), node.to_html())
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import main
+import testhelpers
+import utils
+
+
+class TestMain(testhelpers.TempSiteMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("content/index.md", "# Home\n\nhello")
+        self.write("content/blog/post.md", "# Post\n\n[home](/)")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.cwd = os.getcwd()
+        os.chdir(self.root)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_render_only(self):
+        main.render_only(["content/blog/post.md"], "/site/")
+        self.assertTrue(os.path.isfile("docs/blog/post.html"))
+        # nothing else is rendered, copied or recorded
+        self.assertFalse(os.path.exists("docs/index.html"))
+        self.assertFalse(os.path.exists(".ssg-cache"))
+
+    def test_render_only_rejects_outside_paths(self):
+        with self.assertRaises(utils.PageBuildError) as ctx:
+            main.render_only(["template.html", "content/index.md"], "/")
+        self.assertEqual([src for src, _ in ctx.exception.errors], ["template.html"])
+        self.assertTrue(os.path.isfile("docs/index.html"))
+
+    def test_collections_require_a_site_url(self):
+        script = os.path.abspath(main.__file__)
+        for args in (["--collections", "blog"], ["--collections", "blog", "--site-url", "example.org"]):
+            result = subprocess.run([sys.executable, script, *args], capture_output=True, text=True)
+            self.assertEqual(result.returncode, 2, args)
+            self.assertIn("site-url", result.stderr)
+        self.assertFalse(os.path.exists("docs"))
+
+    def test_imports_stay_lazy(self):
+        code = "import sys, main; print(sorted({'utils', 'manifest', 'siteindex', 'profiler', 'cProfile'} & set(sys.modules)))"
+        src_dir = os.path.dirname(os.path.abspath(main.__file__))
+        output = subprocess.run([sys.executable, "-c", code], cwd=src_dir, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import unittest
+
+import manifest
+import testhelpers
+import utils
+
+
+class TestManifest(testhelpers.TempSiteMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("content/index.md", "# Home\n\nhello")
+        self.write("content/blog/index.md", "# Blog\n\nposts")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.manifest_path = f"{self.root}/manifest.json"
+
+    def build(self, base_path="/"):
+        build_manifest = manifest.Manifest.load(self.manifest_path)
+        utils.generate_pages_recursive(f"{self.root}/content", f"{self.root}/template.html", f"{self.root}/docs", base_path, build_manifest)
+        build_manifest.save()
+
+    def test_unchanged_page_is_skipped(self):
+        self.build()
+        self.write("docs/index.html", "stale marker")
+        self.build()
+        self.assertEqual(self.read("docs/index.html"), "stale marker")
+
+    def test_changed_markdown_is_rendered(self):
+        self.build()
+        self.write("content/index.md", "# Home\n\nbye")
+        self.build()
+        self.assertIn("<p>bye</p>", self.read("docs/index.html"))
+
+    def test_changed_template_renders_every_page(self):
+        self.build()
+        self.write("template.html", "<h0>{{ Title }}</h0>{{ Content }}")
+        self.build()
+        self.assertTrue(self.read("docs/index.html").startswith("<h0>Home</h0>"))
+        self.assertTrue(self.read("docs/blog/index.html").startswith("<h0>Blog</h0>"))
+
+    def test_changed_base_path_is_rendered(self):
+        self.build()
+        self.write("content/index.md", "# Home\n\n[x](/blog)")
+        self.build("/site/")
+        self.assertIn('href="/site/blog"', self.read("docs/index.html"))
+
+    def test_deleted_source_is_pruned(self):
+        self.build()
+        os.remove(f"{self.root}/content/blog/index.md")
+        self.build()
+        self.assertFalse(os.path.exists(f"{self.root}/docs/blog"))
+        self.assertTrue(os.path.exists(f"{self.root}/docs/index.html"))
+
+    def test_corrupt_manifest_starts_empty(self):
+        self.write("manifest.json", "{not json")
+        build_manifest = manifest.Manifest.load(self.manifest_path)
+        self.assertEqual(build_manifest.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
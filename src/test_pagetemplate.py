@@ -0,0 +1,59 @@
+import io
+import os
+import tempfile
+import unittest
+
+import pagetemplate
+
+
+def replace_render(template_text, title, content, base_path):
+    """the str.replace chain generate_page used before templates were compiled"""
+    page = template_text.replace("{{ Title }}", title, 1).replace("{{ Content }}", content, 1)
+    page = page.replace("href=\"/", f"href=\"{base_path}")
+    return page.replace("src=\"/", f"src=\"{base_path}")
+
+
+class TestPageTemplate(unittest.TestCase):
+    TEMPLATE = '<title>{{ Title }}</title><link href="/index.css"><article>{{ Content }}</article><img src="/logo.png">'
+
+    def test_render_matches_replace(self):
+        page_template = pagetemplate.PageTemplate(self.TEMPLATE, "/site/")
+        content = '<p><a href="/blog">blog</a><img src="/a.png" alt="a"></p>'
+        self.assertEqual(page_template.render("Home", content), replace_render(self.TEMPLATE, "Home", content, "/site/"))
+
+    def test_write_streams_fragments(self):
+        page_template = pagetemplate.PageTemplate(self.TEMPLATE, "/site/")
+        stream = io.StringIO()
+        page_template.write(stream, "Home", ["<p>", '<a href="/x">x</a>', "</p>"])
+        self.assertEqual(stream.getvalue(), replace_render(self.TEMPLATE, "Home", '<p><a href="/x">x</a></p>', "/site/"))
+
+    def test_only_first_slot_is_filled(self):
+        text = "{{ Content }}|{{ Title }}|{{ Title }}"
+        page_template = pagetemplate.PageTemplate(text)
+        self.assertEqual(page_template.render("T", "C"), replace_render(text, "T", "C", "/"))
+
+    def test_title_is_escaped_text(self):
+        page_template = pagetemplate.PageTemplate(self.TEMPLATE, "/site/")
+        self.assertTrue(page_template.render('Tom & "Jerry" <3', "").startswith('<title>Tom &amp; "Jerry" &lt;3</title>'))
+        stream = io.StringIO()
+        page_template.write(stream, "a & b", [])
+        self.assertTrue(stream.getvalue().startswith("<title>a &amp; b</title>"))
+
+    def test_missing_content_slot(self):
+        page_template = pagetemplate.PageTemplate("<title>{{ Title }}</title>")
+        self.assertEqual(page_template.render("T", "ignored"), "<title>T</title>")
+
+    def test_load_template_rereads_changed_file(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = f"{root}/template.html"
+            with open(path, "w", encoding="utf-8") as fd:
+                fd.write("a {{ Content }}")
+            self.assertIs(pagetemplate.load_template(path), pagetemplate.load_template(path))
+            with open(path, "w", encoding="utf-8") as fd:
+                fd.write("bb {{ Content }}")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(pagetemplate.load_template(path).render("", "x"), "bb x")
+
+
+if __name__ == "__main__":
+    unittest.main()
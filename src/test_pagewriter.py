@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+import pagewriter
+
+
+class TestPageWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, path):
+        with open(path, "r", encoding="utf-8") as fd:
+            return fd.read()
+
+    def test_unchanged_file_is_not_rewritten(self):
+        path = f"{self.root}/page.html"
+        self.assertTrue(pagewriter.write_if_changed(path, "<p>one</p>"))
+        os.utime(path, ns=(0, 0))
+        self.assertFalse(pagewriter.write_if_changed(path, "<p>one</p>"))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        # same size, other bytes
+        self.assertTrue(pagewriter.write_if_changed(path, "<p>two</p>"))
+        self.assertEqual(self.read(path), "<p>two</p>")
+        self.assertEqual(os.listdir(self.root), ["page.html"])
+
+    def test_missing_folder_is_created(self):
+        path = f"{self.root}/a/b/index.html"
+        pagewriter.write_if_changed(path, "x")
+        self.assertEqual(self.read(path), "x")
+
+    def test_background_writes(self):
+        writer = pagewriter.PageWriter(threads=2, max_pending=2)
+        for i in range(20):
+            writer.submit(f"{self.root}/p{i % 10}/index.html", f"page {i % 10}", f"src{i}")
+        # a folder that is a file cannot hold a page
+        with open(f"{self.root}/blocked", "w") as fd:
+            fd.write("file")
+        writer.submit(f"{self.root}/blocked/index.html", "x", "bad.md")
+        errors = writer.close()
+        self.assertEqual([key for key, _ in errors], ["bad.md"])
+        self.assertEqual((writer.written, writer.unchanged), (10, 10))
+        self.assertEqual(self.read(f"{self.root}/p3/index.html"), "page 3")
+
+
+if __name__ == "__main__":
+    unittest.main()
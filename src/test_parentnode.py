@@ -0,0 +1,33 @@
+import io
+import unittest
+
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+
+class TestParentNode(unittest.TestCase):
+    def tree(self):
+        items = ParentNode("ul", [ParentNode("li", [LeafNode("b", "one")]), ParentNode("li", [LeafNode(None, "two")])])
+        return ParentNode("div", [ParentNode("p", [LeafNode(None, "hi "), LeafNode("a", "link", {"href": "/x"})]), items], {"class": "page"})
+
+    def test_to_html(self):
+        node = ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")])
+        self.assertEqual(node.to_html(), "<p><b>Bold</b> text</p>")
+
+    def test_iter_html_matches_to_html(self):
+        node = self.tree()
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+
+    def test_write_html(self):
+        node = self.tree()
+        stream = io.StringIO()
+        node.write_html(stream)
+        self.assertEqual(stream.getvalue(), node.to_html())
+
+    def test_missing_children(self):
+        node = ParentNode("div", None)
+        with self.assertRaises(ValueError):
+            list(node.iter_html())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import gc
+import random
+import statistics
+import time
+import unittest
+
+import bench_patterns
+import highlight
+import patterns
+import utils
+
+
+class TestPatterns(unittest.TestCase):
+    def test_same_matches_as_original(self):
+        rnd = random.Random(7)
+        for _ in range(3000):
+            text = bench_patterns.random_text(rnd, rnd.randint(0, 120))
+            for name in bench_patterns.ORIGINALS:
+                self.assertEqual(bench_patterns.compiled_result(name, text), bench_patterns.original_result(name, text), (name, text))
+
+    def test_file_names(self):
+        self.assertEqual(utils.page_file_name("index.md"), "index.html")
+        self.assertEqual(utils.page_file_name("notes.v2.markdown"), "notes.v2.html")
+        self.assertEqual(utils.page_file_name("README"), "README")
+
+    def assertLinear(self, run, make_text, size):
+        """
+        times run on make_text(size) and make_text(2 * size). Linear work doubles, a quadratic pattern
+        quadruples, so the ratio tells them apart on any machine where a fixed limit would not. The runs take
+        a few milliseconds, so the two sizes take turns with the garbage collector off and the median of five
+        is kept, a pause or a busy moment then slows both sizes and one odd run in either direction is ignored
+        """
+        texts = [make_text(size), make_text(2 * size)]
+        times = [[], []]
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(5):
+                for text, text_times in zip(texts, times):
+                    start = time.perf_counter()
+                    run(text)
+                    text_times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+
+        small, large = statistics.median(times[0]), statistics.median(times[1])
+        # about 2 for linear work (measured up to 3 with timer noise), 4 for quadratic
+        self.assertLess(large / small, 3.5, make_text(4)[:20])
+
+    def test_hostile_input_is_linear(self):
+        hostile = [lambda n: "[" * n, lambda n: "![a" * n, lambda n: "[a](" * n, lambda n: "[a](" + "x" * n, lambda n: "!" * n + "[",
+                   lambda n: "a" * n, lambda n: "#" * n, lambda n: "\n \t" * n, lambda n: "`" + "a" * n]
+
+        def run(text):
+            for name in ["IMAGE_PATTERN", "LINK_PATTERN", "TITLE_PATTERN", "BLANK_LINE", "FILE_EXTENSION", "CODE_SPAN"]:
+                getattr(patterns, name).findall(text)
+            patterns.BLANK_LINE_BYTES.findall(text.encode())
+
+        for make_text in hostile:
+            self.assertLinear(run, make_text, 50000)
+
+    def test_hostile_assets_are_linear(self):
+        hostile = ["<code", "<!--", "\"", "/*", "url(", "url( '", ' href="', " ;", "</pre "]
+
+        def run(text):
+            for name in ["HTML_PRESERVED_OPEN", "HTML_URL_ATTRIBUTE", "WHITESPACE", "CSS_REGION_OPEN", "CSS_PUNCTUATION_SPACE", "CSS_URL"]:
+                getattr(patterns, name).findall(text)
+            patterns.HTML_PRESERVED_CLOSE["pre"].findall(text)
+
+        for piece in hostile:
+            self.assertLinear(run, lambda n: piece * n, 20000)
+        self.assertLinear(run, lambda n: " " * n + "x", 20000)
+
+    def test_hostile_front_matter_is_linear(self):
+        hostile = [lambda n: "---\n" + "\n---  x" * n, lambda n: "---\n" + "a" * n, lambda n: "---\n" + "\n" * n, lambda n: "-" * n, lambda n: "---" + " " * n]
+
+        def run(text):
+            patterns.FRONT_MATTER.match(text)
+            patterns.FRONT_MATTER_BYTES.match(text.encode())
+            patterns.TAG_SLUG.findall(text)
+
+        for make_text in hostile:
+            self.assertLinear(run, make_text, 50000)
+
+    def test_hostile_code_is_linear(self):
+        hostile = [lambda n: "/*" * n, lambda n: '"\\' * n, lambda n: "'''" + '"""' * n, lambda n: "`" + "\\`" * n, lambda n: "#" * n,
+                   lambda n: "${" * n, lambda n: "-0" * n, lambda n: "1." * n, lambda n: "\\" * n]
+
+        def run(text):
+            for language in patterns.LEXER_RULES:
+                list(highlight.tokens(text, language))
+
+        for make_text in hostile:
+            self.assertLinear(run, make_text, 5000)
+
+    def test_hostile_strict_inline_is_linear(self):
+        # an unmatched "*" in front of runs of "**" used to rescan the rest of the text for every "*"
+        hostile = [lambda n: "*a**" * n, lambda n: "*" + "a**" * n, lambda n: "_a__" * n]
+
+        for make_text in hostile:
+            self.assertLinear(lambda text: utils.text_to_textnodes(text, compat=False), make_text, 5000)
+
+    def test_hostile_markdown_renders(self):
+        hostile = [lambda n: "*_`[]()!" * n, lambda n: "[a](" * n, lambda n: "> " * n, lambda n: "- [" * n,
+                   lambda n: "*" * n, lambda n: "**a" * n, lambda n: "`a" * n, lambda n: "_" + "a_" * n, lambda n: "*a***" * n]
+
+        def run(text):
+            try:
+                utils.markdown_to_html_node(text).to_html()
+            except ValueError:
+                pass
+            # the strict scanner runs INLINE_MARKERS and INLINE_CLOSERS
+            utils.text_to_textnodes(text, compat=False)
+
+        for make_text in hostile:
+            self.assertLinear(run, make_text, 5000)
+
+if __name__ == "__main__":
+    unittest.main()
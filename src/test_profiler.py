@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+import profiler
+import utils
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(f"{self.root}/content/blog")
+        for path, text in [("content/index.md", "# Home\n\n**hi** [x](/x)"), ("content/blog/index.md", "# Blog\n\n- a\n- b"), ("template.html", "{{ Title }}{{ Content }}")]:
+            with open(f"{self.root}/{path}", "w", encoding="utf-8") as fd:
+                fd.write(text)
+
+    def tearDown(self):
+        profiler.disable()
+        self.tmp.cleanup()
+
+    def build(self, dest, jobs=1):
+        utils.generate_pages_recursive(f"{self.root}/content", f"{self.root}/template.html", f"{self.root}/{dest}", "/", jobs=jobs)
+
+    def test_pages_record_every_stage(self):
+        profile = profiler.enable()
+        self.build("docs")
+        self.assertEqual(len(profile.pages), 2)
+        for stages in profile.pages.values():
+            self.assertEqual(sorted(stages), sorted(profiler.PAGE_STAGES))
+        self.assertIn("slowest pages:", profile.summary())
+
+    def test_worker_stages_are_merged(self):
+        profile = profiler.enable()
+        self.build("docs", jobs=2)
+        self.assertEqual(len(profile.pages), 2)
+
+    def test_profiled_output_is_identical(self):
+        self.build("plain")
+        profiler.enable()
+        self.build("profiled")
+        for page in ["index.html", "blog/index.html"]:
+            with open(f"{self.root}/plain/{page}", encoding="utf-8") as a, open(f"{self.root}/profiled/{page}", encoding="utf-8") as b:
+                self.assertEqual(a.read(), b.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+
+import responsiveimages
+import textnode
+import utils
+
+
+def gradient(width, height, channels):
+    return [bytes((x * 7 + y * 3 + c * 50) % 256 for x in range(width) for c in range(channels)) for y in range(height)]
+
+
+class TestPng(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = f"{self.tmp.name}/{name}"
+        with open(path, "wb") as fd:
+            fd.write(data)
+        return path
+
+    def test_round_trip(self):
+        for channels in (1, 2, 3, 4):
+            rows = gradient(13, 5, channels)
+            path = self.write("a.png", responsiveimages.encode_png(rows, 13, 5, channels))
+            self.assertEqual(responsiveimages.image_size(path), (13, 5))
+            self.assertEqual(responsiveimages.read_png(path), (13, 5, channels, rows))
+
+    def test_short_rows_are_an_error(self):
+        # a header for 5 rows in front of the data of 4
+        data = responsiveimages.encode_png(gradient(13, 4, 3), 13, 4, 3)
+        path = self.write("a.png", data[:20] + (5).to_bytes(4, "big") + data[24:])
+        with self.assertRaises(ValueError):
+            responsiveimages.read_png(path)
+
+    def test_every_filter(self):
+        rows = gradient(6, 5, 3)
+        prev = bytes(18)
+        filtered = [
+            bytes(rows[0]),
+            bytes((rows[1][i] - (rows[1][i - 3] if i >= 3 else 0)) % 256 for i in range(18)),
+            bytes((a - b) % 256 for a, b in zip(rows[2], rows[1])),
+            bytes((rows[3][i] - (((rows[3][i - 3] if i >= 3 else 0) + rows[2][i]) >> 1)) % 256 for i in range(18)),
+            bytes((rows[4][i] - responsiveimages._paeth(rows[4][i - 3] if i >= 3 else 0, rows[3][i], rows[3][i - 3] if i >= 3 else 0)) % 256 for i in range(18)),
+        ]
+        for kind, row in enumerate(filtered):
+            row = bytearray(row)
+            responsiveimages._unfilter(kind, row, prev, 3)
+            self.assertEqual(row, rows[kind], kind)
+            prev = row
+
+    def test_downscale_averages(self):
+        rows = [bytes([0, 10, 20, 30]), bytes([40, 50, 60, 70])]
+        self.assertEqual(responsiveimages.downscale(rows, 4, 2, 1, 2), (1, [bytes([25, 45])]))
+
+    def test_other_sizes(self):
+        gif = self.write("a.gif", b"GIF89a" + (300).to_bytes(2, "little") + (200).to_bytes(2, "little") + bytes(20))
+        jpeg = self.write("a.jpg", b"\xff\xd8\xff\xe0\x00\x04ab\xff\xc0\x00\x11\x08" + (200).to_bytes(2, "big") + (300).to_bytes(2, "big") + bytes(10))
+        webp = self.write("a.webp", b"RIFF\x00\x00\x00\x00WEBPVP8X" + bytes(8) + (299).to_bytes(3, "little") + (199).to_bytes(3, "little"))
+        for path in (gif, jpeg, webp):
+            self.assertEqual(responsiveimages.image_size(path), (300, 200), path)
+        self.assertIsNone(responsiveimages.image_size(self.write("a.txt", b"text")))
+
+
+class TestResponsiveImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = f"{self.tmp.name}/static"
+        self.dest = f"{self.tmp.name}/docs"
+        self.cache = f"{self.tmp.name}/cache"
+        os.makedirs(f"{self.static}/images")
+        with open(f"{self.static}/images/a.png", "wb") as fd:
+            fd.write(responsiveimages.encode_png(gradient(40, 20, 3), 40, 20, 3))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        utils.responsive_images = None
+
+    def update(self, images, widths):
+        return images.update(self.static, self.dest, "/site/", widths, cache_path=self.cache)
+
+    def test_derivatives_and_cache(self):
+        images = responsiveimages.ResponsiveImages(f"{self.tmp.name}/images.json")
+        self.assertEqual(self.update(images, (10, 20, 80)), 1)
+        self.assertEqual(images.images, {"/images/a.png": {"width": 40, "height": 20, "srcset": "/site/images/a-10w.png 10w, /site/images/a-20w.png 20w, /site/images/a.png 40w"}})
+        self.assertEqual(responsiveimages.image_size(f"{self.dest}/images/a-10w.png"), (10, 5))
+        images.save()
+
+        # a new run finds every derivative in the cache, a width no longer asked for is removed
+        images = responsiveimages.ResponsiveImages.load(f"{self.tmp.name}/images.json")
+        self.assertEqual(self.update(images, (20,)), 0)
+        self.assertEqual(sorted(os.listdir(f"{self.dest}/images")), ["a-20w.png"])
+        self.assertEqual(len(os.listdir(self.cache)), 1)
+
+    def test_truncated_png_keeps_its_size(self):
+        data = responsiveimages.encode_png(gradient(40, 20, 3), 40, 20, 3)
+        # cut inside the compressed rows, the header still gives the size
+        with open(f"{self.static}/images/a.png", "wb") as fd:
+            fd.write(data[:80] + data[-12:])
+        images = responsiveimages.ResponsiveImages(None)
+        with self.assertLogs(responsiveimages.logger, "WARNING") as logs:
+            self.assertEqual(self.update(images, (20,)), 0)
+        self.assertIn("a.png: not resized", logs.output[0])
+        self.assertEqual(images.images, {"/images/a.png": {"width": 40, "height": 20, "srcset": ""}})
+        self.assertFalse(os.path.exists(f"{self.dest}/images"))
+
+    def test_img_tag(self):
+        images = responsiveimages.ResponsiveImages(None)
+        self.update(images, (20,))
+        utils.responsive_images = images
+        node = utils.text_node_to_html_node(textnode.TextNode("a", textnode.TextType.IMAGES, "/images/a.png"))
+        self.assertEqual(node.to_html(), '<img src="/images/a.png" alt="a" width="40" height="20" srcset="/site/images/a-20w.png 20w, /site/images/a.png 40w" loading="lazy">')
+        node = utils.text_node_to_html_node(textnode.TextNode("b", textnode.TextType.IMAGES, "/images/b.png"))
+        self.assertEqual(node.to_html(), '<img src="/images/b.png" alt="b">')
+
+
+if __name__ == "__main__":
+    unittest.main()
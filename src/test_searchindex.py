@@ -0,0 +1,106 @@
+import json
+import os
+import unittest
+
+import manifest
+import searchindex
+import testhelpers
+import utils
+
+
+class TestSearchIndex(testhelpers.TempSiteMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("content/index.md", "# Home Page\n\nThe **ring** goes [to Mordor](/blog) ![a ring](/images/ring.png)\n\n- the ring")
+        self.write("content/blog/index.md", "# Blog\n\nNo rings here")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.index_path = f"{self.root}/search.json"
+        self.manifest_path = f"{self.root}/manifest.json"
+        utils.search_terms = True
+
+    def tearDown(self):
+        utils.search_terms = False
+
+    def build(self):
+        build_manifest = manifest.Manifest.load(self.manifest_path)
+        search_index = searchindex.SearchIndex.load(self.index_path)
+        utils.generate_pages_recursive(f"{self.root}/content", f"{self.root}/template.html", f"{self.root}/docs", "/site/", build_manifest, search_index=search_index)
+        written = search_index.write(f"{self.root}/docs")
+        build_manifest.save()
+        search_index.save()
+        return search_index, written
+
+    def read_json(self, name):
+        with open(f"{self.root}/docs/search/{name}", "r", encoding="utf-8") as fd:
+            return json.load(fd)
+
+    def lookup(self, term):
+        meta = self.read_json("index.json")
+        file = [file for first, file in meta["shards"] if first <= term][-1]
+        return self.read_json(file).get(term)
+
+    def test_words_come_from_the_text_nodes(self):
+        self.assertEqual(utils.block_words("The **ring** goes [to Mordor](/blog) ![a ring](/images/ring.png)"), ("the", "ring", "goes", "to", "mordor", "a", "ring"))
+        self.assertEqual(utils.page_info("t", [], [], ["a", "b", "a"])["terms"], {"a": [0, 2], "b": [1]})
+
+    def test_index_files(self):
+        search_index, _ = self.build()
+        home = search_index.pages[f"{self.root}/content/index.md"]
+        self.assertEqual((home["url"], home["title"]), ("/site/", "Home Page"))
+        pages = self.read_json("pages.json")
+        # the title block is part of the page, the list item the last words
+        self.assertEqual(self.lookup("ring"), [[home["id"], 3, 8, 10]])
+        self.assertEqual(pages[home["id"]], ["/site/", "Home Page"])
+        # link urls are not text
+        self.assertIsNone(self.lookup("images"))
+
+    def test_incremental_updates(self):
+        search_index, written = self.build()
+        self.assertEqual(written, 1)
+        # a rebuild with nothing changed writes no shard
+        self.assertEqual(self.build()[1], 0)
+        self.write("content/blog/index.md", "# Blog\n\nShire")
+        search_index, written = self.build()
+        self.assertEqual(written, 1)
+        blog = search_index.pages[f"{self.root}/content/blog/index.md"]
+        self.assertEqual(self.lookup("shire"), [[blog["id"], 1]])
+        self.assertIsNone(self.lookup("rings"))
+        # a deleted page frees its id and drops its postings
+        os.remove(f"{self.root}/content/blog/index.md")
+        search_index, _ = self.build()
+        self.assertIsNone(self.lookup("shire"))
+        self.assertNotIn(["/site/blog/", "Blog"], self.read_json("pages.json"))
+
+    def test_shards_are_bounded(self):
+        search_index = searchindex.SearchIndex(None)
+        for page in range(30):
+            search_index.record(f"p{page}", f"/p{page}/", f"page {page}", {f"term{page}x{i}": [i] for i in range(20)})
+        search_index.write(f"{self.root}/docs", shard_bytes=2000)
+        meta = self.read_json("index.json")
+        self.assertGreater(len(meta["shards"]), 5)
+        for first, file in meta["shards"]:
+            self.assertLessEqual(os.path.getsize(f"{self.root}/docs/search/{file}"), 2000)
+        # changing one page rewrites only the shards its old and new terms fall in
+        search_index.record("p3", "/p3/", "page 3", {"term3x0": [5]})
+        self.assertLessEqual(search_index.write(f"{self.root}/docs", shard_bytes=2000), 2)
+        self.assertEqual(self.lookup("term3x0"), [[search_index.pages["p3"]["id"], 5]])
+        self.assertIsNone(self.lookup("term3x1"))
+
+    def test_other_files_in_the_folder_are_kept(self):
+        self.write("content/search/index.md", "# Search\n\nfind a page")
+        self.write("docs/search/search.js", "search()")
+        search_index, _ = self.build()
+        self.assertIn("Search", self.read("docs/search/index.html"))
+        # a shard emptied by a page change is merged away, its file goes and nothing else does
+        search_index.record("extra", "/extra/", "Extra", {"zzz": [0]})
+        search_index.shards.append("zzz")
+        search_index.write(f"{self.root}/docs")
+        search_index.forget("extra")
+        search_index.write(f"{self.root}/docs")
+        self.assertEqual(sorted(os.listdir(f"{self.root}/docs/search")), sorted(["index.html", "search.js", "index.json", "pages.json", searchindex.shard_file("")]))
+        search_index.remove(f"{self.root}/docs")
+        self.assertEqual(sorted(os.listdir(f"{self.root}/docs/search")), ["index.html", "search.js"])
+
+
+if __name__ == "__main__":
+    unittest.main()
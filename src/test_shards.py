@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import manifest
+import shards
+import testhelpers
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+class TestShards(testhelpers.TempSiteMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(12):
+            self.write(f"content/blog/post{i}/index.md", f"# Post {i}\n\n[home](/) ![img](/images/a.png)")
+        self.write("content/index.md", "# Home\n\n[first](/blog/post0)")
+        self.write("static/images/a.png", "png")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+
+    def tree(self, rel_dir):
+        """every file under a folder mapped to its text"""
+        files = {}
+        for dir_path, _, file_names in os.walk(f"{self.root}/{rel_dir}"):
+            for name in file_names:
+                with open(f"{dir_path}/{name}", "r", encoding="utf-8") as fd:
+                    files[os.path.relpath(f"{dir_path}/{name}", f"{self.root}/{rel_dir}")] = fd.read()
+        return files
+
+    def run_main(self, *args):
+        return subprocess.run([sys.executable, MAIN, *args], cwd=self.root, capture_output=True, text=True)
+
+    def test_partition_is_disjoint_and_complete(self):
+        paths = [f"blog/post{i}/index.md" for i in range(200)]
+        owners = [shards.page_shard(path, 4) for path in paths]
+        self.assertEqual(set(owners), {1, 2, 3, 4})
+        self.assertEqual(owners, [shards.page_shard(path, 4) for path in paths])
+
+    def test_parse_shard(self):
+        self.assertEqual(shards.parse_shard("2/5"), (2, 5))
+        for text in ["0/3", "4/3", "1", "a/b", "1/0"]:
+            with self.assertRaises(ValueError):
+                shards.parse_shard(text)
+
+    def test_shard_processes_merge_into_the_full_site(self):
+        self.assertEqual(self.run_main("/site/", "-q").returncode, 0)
+        os.rename(f"{self.root}/docs", f"{self.root}/full")
+        processes = [subprocess.Popen([sys.executable, MAIN, "/site/", "-q", "--shard", f"{i}/3"], cwd=self.root) for i in range(1, 4)]
+        self.assertEqual([process.wait() for process in processes], [0, 0, 0])
+        self.assertEqual(self.run_main("merge", "-q").returncode, 0)
+        self.assertEqual(self.tree("docs"), self.tree("full"))
+
+    def test_missing_shard_and_collisions_fail(self):
+        for i in (1, 2):
+            self.assertEqual(self.run_main("-q", "--shard", f"{i}/2").returncode, 0)
+        self.assertEqual(self.run_main("merge", "-q", "shards/1-of-2").returncode, 1)
+        # a static file in the place of a rendered page
+        self.write("static/index.html", "static page")
+        with self.assertRaises(shards.ShardMergeError) as ctx:
+            shards.merge_shards([f"{self.root}/shards/1-of-2", f"{self.root}/shards/2-of-2"], f"{self.root}/static", f"{self.root}/docs", manifest.Manifest(None))
+        self.assertIn("index.html", str(ctx.exception))
+        self.assertFalse(os.path.exists(f"{self.root}/docs"))
+
+    def test_whole_site_stages_are_rejected(self):
+        for args in (["--shard", "1/2", "--search"], ["--shard", "1/2", "--images"], ["--only", "content/index.md", "--assets"], ["--shard", "1/2", "--only", "content/index.md"]):
+            result = self.run_main("-q", *args)
+            self.assertEqual(result.returncode, 2, args)
+            self.assertIn("cannot be combined", result.stderr)
+        self.assertFalse(os.path.exists(f"{self.root}/shards"))
+
+    def test_merge_drops_the_records_of_removed_stages(self):
+        self.assertEqual(self.run_main("-q", "--search").returncode, 0)
+        self.assertTrue(os.path.isfile(f"{self.root}/.ssg-cache/search.json"))
+        for i in (1, 2):
+            self.assertEqual(self.run_main("-q", "--shard", f"{i}/2").returncode, 0)
+        self.assertEqual(self.run_main("merge", "-q").returncode, 0)
+        self.assertFalse(os.path.exists(f"{self.root}/docs/search"))
+        self.assertFalse(os.path.exists(f"{self.root}/.ssg-cache/search.json"))
+        # the next build with --search writes the whole index again
+        self.assertEqual(self.run_main("-q", "--search").returncode, 0)
+        self.assertTrue(os.path.isdir(f"{self.root}/docs/search"))
+
+
+if __name__ == "__main__":
+    unittest.main()
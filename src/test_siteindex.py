@@ -0,0 +1,68 @@
+import os
+import unittest
+
+import manifest
+import siteindex
+import testhelpers
+import utils
+
+
+class TestSiteIndex(testhelpers.TempSiteMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("content/index.md", "# Home\n\n[blog](/blog) [gone](/missing) [out](https://example.com) [top](#top)\n\n![a](/images/a.png)")
+        self.write("content/blog/index.md", "# Blog\n\n[home](../) ![b](b.png)\n\n```\n[not a link](/nowhere)\n```\n\nUse `[text](/nowhere)` or `![alt](/none.png)`")
+        self.write("docs/images/a.png", "png")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.index_path = f"{self.root}/index.json"
+        self.manifest_path = f"{self.root}/manifest.json"
+
+    def build(self):
+        build_manifest = manifest.Manifest.load(self.manifest_path)
+        site_index = siteindex.SiteIndex.load(self.index_path)
+        utils.generate_pages_recursive(f"{self.root}/content", f"{self.root}/template.html", f"{self.root}/docs", "/", build_manifest, site_index=site_index)
+        build_manifest.save()
+        site_index.save()
+        return site_index
+
+    def test_pages_are_indexed(self):
+        site_index = self.build()
+        home = site_index.pages[f"{self.root}/content/index.md"]
+        self.assertEqual(home["title"], "Home")
+        self.assertEqual(home["output"], f"{self.root}/docs/index.html")
+        self.assertEqual(home["links"], ["/blog", "/missing", "https://example.com", "#top"])
+        self.assertEqual(home["images"], ["/images/a.png"])
+        # links inside code blocks and code spans are not part of the page
+        self.assertEqual(site_index.pages[f"{self.root}/content/blog/index.md"]["links"], ["../"])
+
+    def test_broken_references(self):
+        site_index = self.build()
+        broken = site_index.broken_references(f"{self.root}/docs")
+        self.assertEqual(broken, [
+            (f"{self.root}/content/blog/index.md", "image", "b.png"),
+            (f"{self.root}/content/index.md", "link", "/missing"),
+        ])
+
+    def test_round_trip(self):
+        site_index = self.build()
+        self.assertEqual(siteindex.SiteIndex.load(self.index_path).pages, site_index.pages)
+
+    def test_incremental_builds_keep_the_index(self):
+        self.build()
+        # pages skipped by the manifest keep their entry, a lost index is rebuilt without rendering
+        os.remove(self.index_path)
+        self.write("docs/index.html", "stale marker")
+        site_index = self.build()
+        self.assertEqual(site_index.pages[f"{self.root}/content/index.md"]["title"], "Home")
+        os.remove(f"{self.root}/content/blog/index.md")
+        site_index = self.build()
+        self.assertEqual(list(site_index.pages), [f"{self.root}/content/index.md"])
+
+    def test_target_path(self):
+        self.assertIsNone(siteindex.target_path("mailto:a@b.c", "docs/index.html", "docs"))
+        self.assertEqual(siteindex.target_path("/a%20b?q=1#x", "docs/x/index.html", "docs"), "docs/a b")
+        self.assertEqual(siteindex.target_path("../y", "docs/x/z/index.html", "docs"), "docs/x/y")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import pickle
 import unittest
 
 from textnode import TextNode, TextType
@@ -22,6 +23,19 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("This is a text node", TextType.CODE, "boot.dev")
         self.assertIsInstance(node.text_type, TextType)
 
+    def test_immutable(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        with self.assertRaises(AttributeError):
+            node.text = "changed"
+
+    def test_no_dict(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_pickle(self):
+        node = TextNode("This is a text node", TextType.LINKS, "boot.dev")
+        self.assertEqual(pickle.loads(pickle.dumps(node)), node)
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,241 @@
+import io
+import os
+import random
+import unittest
+
+import bench_inline
+import testhelpers
+import textnode
+import utils
+
+
+class TestTextToTextNodes(unittest.TestCase):
+    def test_compat_matches_chained_passes(self):
+        rnd = random.Random(7)
+        pieces = ["a", "b", " ", "*", "**", "_", "`", "!", "[", "]", "(", ")", "![x](y)", "[l](u)"]
+        for _ in range(5000):
+            text = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 25)))
+            self.assertEqual(utils.text_to_textnodes(text), bench_inline.chained_text_to_textnodes(text), text)
+
+    def test_mixed_inline(self):
+        text = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
+        expected = [
+            textnode.TextNode("This is ", textnode.TextType.NORMAL),
+            textnode.TextNode("text", textnode.TextType.BOLD),
+            textnode.TextNode(" with an ", textnode.TextType.NORMAL),
+            textnode.TextNode("italic", textnode.TextType.ITALIC),
+            textnode.TextNode(" word and a ", textnode.TextType.NORMAL),
+            textnode.TextNode("code block", textnode.TextType.CODE),
+            textnode.TextNode(" and an ", textnode.TextType.NORMAL),
+            textnode.TextNode("obi wan image", textnode.TextType.IMAGES, "https://i.imgur.com/fJRm4Vk.jpeg"),
+            textnode.TextNode(" and a ", textnode.TextType.NORMAL),
+            textnode.TextNode("link", textnode.TextType.LINKS, "https://boot.dev"),
+        ]
+        self.assertEqual(utils.text_to_textnodes(text), expected)
+        self.assertEqual(utils.text_to_textnodes(text, compat=False), expected)
+
+    def test_strict_keeps_code_and_links_whole(self):
+        nodes = utils.text_to_textnodes("`a*b*c` [x](/a_b_c)", compat=False)
+        self.assertEqual(nodes, [
+            textnode.TextNode("a*b*c", textnode.TextType.CODE),
+            textnode.TextNode(" ", textnode.TextType.NORMAL),
+            textnode.TextNode("x", textnode.TextType.LINKS, "/a_b_c"),
+        ])
+
+    def test_strict_unmatched_delimiter_is_literal(self):
+        nodes = utils.text_to_textnodes("2 * 3 and **bold**", compat=False)
+        self.assertEqual(nodes, [
+            textnode.TextNode("2 * 3 and ", textnode.TextType.NORMAL),
+            textnode.TextNode("bold", textnode.TextType.BOLD),
+        ])
+
+
+
+class TestSplitImagesAndLinks(unittest.TestCase):
+    def test_repeated_links(self):
+        node = textnode.TextNode("[a](/x) and [a](/x)[b](/y)", textnode.TextType.NORMAL)
+        self.assertEqual(utils.splite_node_links([node]), [
+            textnode.TextNode("a", textnode.TextType.LINKS, "/x"),
+            textnode.TextNode(" and ", textnode.TextType.NORMAL),
+            textnode.TextNode("a", textnode.TextType.LINKS, "/x"),
+            textnode.TextNode("b", textnode.TextType.LINKS, "/y"),
+        ])
+
+    def test_images_leave_links_alone(self):
+        node = textnode.TextNode("![alt](/a.png) then [link](/b)", textnode.TextType.NORMAL)
+        self.assertEqual(utils.splite_node_images([node]), [
+            textnode.TextNode("alt", textnode.TextType.IMAGES, "/a.png"),
+            textnode.TextNode(" then [link](/b)", textnode.TextType.NORMAL),
+        ])
+
+    def test_many_links(self):
+        text = " ".join(f"[l{i}](/p/{i})" for i in range(2000))
+        nodes = utils.splite_node_links([textnode.TextNode(text, textnode.TextType.NORMAL)])
+        self.assertEqual(len(nodes), 3999)
+        self.assertEqual(nodes[-1], textnode.TextNode("l1999", textnode.TextType.LINKS, "/p/1999"))
+
+
+class TestClassifyBlock(unittest.TestCase):
+    def test_types(self):
+        cases = {
+            "### title": utils.BlockType.HEADING,
+            "```\ncode\n```": utils.BlockType.CODE,
+            "```\nnot closed": utils.BlockType.PARAGRAPH,
+            "> a\n>b": utils.BlockType.QUOTE,
+            "* a\n- b": utils.BlockType.UNORDERED,
+            "1. a\n2. b": utils.BlockType.ORDERED,
+            "####### seven": utils.BlockType.PARAGRAPH,
+            "plain *text*": utils.BlockType.PARAGRAPH,
+        }
+        for block, expected in cases.items():
+            self.assertEqual(utils.block_to_block_type(block), expected, block)
+
+    def test_lines_are_handed_to_the_builder(self):
+        block_type, lines = utils.classify_block("- a\n- b")
+        self.assertEqual(lines, ["- a", "- b"])
+        node = utils.block_to_html_parent_node("- a\n- b", block_type, lines)
+        self.assertEqual(node.to_html(), "<ul><li>a</li><li>b</li></ul>")
+
+    def test_invalid_blocks(self):
+        for block in ["> a\nb", "* a\nb", "1. a\n3. b"]:
+            with self.assertRaises(ValueError):
+                utils.classify_block(block)
+
+    def test_long_ordered_list(self):
+        block = "\n".join(f"{i}. item {i}" for i in range(1, 13))
+        node = utils.block_to_html_parent_node(block, *utils.classify_block(block))
+        self.assertEqual(node.to_html().count("<li>"), 12)
+        self.assertIn("<li>item 12</li>", node.to_html())
+
+
+class TestIterMarkdownBlocks(unittest.TestCase):
+    def test_matches_markdown_to_blocks(self):
+        markdown = "\n  \n# Title\n\npara one\nstill one \n\t\n- a\n- b\n\n\n> q  \n"
+        self.assertEqual(list(utils.iter_markdown_blocks(io.StringIO(markdown))), utils.markdown_to_blocks(markdown))
+
+    def test_fence_keeps_blank_lines(self):
+        markdown = "intro\n\n```\nfirst\n\n  second\n```\n\nafter"
+        blocks = list(utils.iter_markdown_blocks(io.StringIO(markdown)))
+        self.assertEqual(blocks, ["intro", "```\nfirst\n\n  second\n```", "after"])
+        self.assertEqual(utils.markdown_to_blocks(markdown), blocks)
+
+    def test_unclosed_fence_splits_on_blank_lines(self):
+        markdown = "```\nopen\n\nrest"
+        self.assertEqual(list(utils.iter_markdown_blocks(io.StringIO(markdown))), ["```\nopen", "rest"])
+
+    def test_streamed_html_matches(self):
+        markdown = "# T\n\n```\na\n\nb\n```\n\n- **x**\n- y\n\n1. one\n2. [l](/u)"
+        html = "".join(utils.iter_markdown_html(utils.iter_markdown_blocks(io.StringIO(markdown))))
+        self.assertEqual(html, utils.markdown_to_html_node(markdown).to_html())
+
+
+class TestMappedBlocks(unittest.TestCase):
+    def test_matches_line_reader(self):
+        markdown = "# T\n\n```\na\n \nb\n```\n\n  \n\npara\nline\n\n```\nopen\n\nrest"
+        self.assertEqual(list(utils.iter_mapped_blocks(markdown.encode())), list(utils.iter_markdown_blocks(io.StringIO(markdown))))
+
+    def test_crlf_newlines(self):
+        raw = "# Caf\u00e9\r\n\r\nline one\r\nline two\r\n \r\n- a\r\n".encode()
+        self.assertEqual(list(utils.iter_mapped_blocks(raw)), ["# Caf\u00e9", "line one\nline two", "- a"])
+        self.assertEqual(utils.mapped_title(raw), "Caf\u00e9")
+
+    def test_front_matter(self):
+        markdown = "---\r\ntitle: 'A: B'\r\ntags: [x, \"y\"]\r\n---\r\n# T\r\n\r\nbody"
+        meta, start = utils.mapped_front_matter(markdown.encode())
+        self.assertEqual(meta, {"title": "A: B", "tags": ["x", "y"]})
+        self.assertEqual(list(utils.iter_mapped_blocks(markdown.encode(), start)), ["# T", "body"])
+        self.assertEqual(utils.split_front_matter(markdown.replace("\r", "")), (meta, "# T\n\nbody"))
+        # unclosed front matter is part of the doc
+        self.assertEqual(utils.split_front_matter("---\na: b\n# T"), ({}, "---\na: b\n# T"))
+        self.assertEqual(utils.split_front_matter("---\n---\n# T"), ({}, "# T"))
+
+    def test_title_is_first_match(self):
+        markdown = "intro\n## Sub\n# Main"
+        self.assertEqual(utils.mapped_title(markdown.encode()), utils.extract_title(markdown))
+        with self.assertRaises(Exception):
+            utils.mapped_title(b"no title")
+
+
+class TestGeneratePages(testhelpers.TempSiteMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("content/index.md", "# Home\n\n[post](/blog/post) and **bold**")
+        self.write("content/blog/post/index.md", "# Post\n\n- one\n- two\n\n![img](/images/a.png)")
+        self.write("content/blog/dated.md", "---\ntitle: Dated post\ndate: 2024-01-01\n---\n\n# Heading\n\ntext")
+        self.write("template.html", '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+
+    def build(self, dest, jobs):
+        utils.generate_pages_recursive(f"{self.root}/content", f"{self.root}/template.html", f"{self.root}/{dest}", "/site/", jobs=jobs)
+
+    def test_parallel_matches_serial(self):
+        self.build("serial", 1)
+        self.build("parallel", 2)
+        for page in ["index.html", "blog/post/index.html"]:
+            self.assertEqual(self.read(f"serial/{page}"), self.read(f"parallel/{page}"))
+
+    def test_streamed_page_matches(self):
+        self.build("whole", 1)
+        old_limit = utils.STREAM_PAGE_BYTES
+        utils.STREAM_PAGE_BYTES = 0
+        try:
+            self.build("streamed", 1)
+        finally:
+            utils.STREAM_PAGE_BYTES = old_limit
+        for page in ["index.html", "blog/post/index.html", "blog/dated.html"]:
+            self.assertEqual(self.read(f"whole/{page}"), self.read(f"streamed/{page}"))
+        self.assertEqual(self.read("whole/blog/dated.html"), '<title>Dated post</title><link href="/site/index.css"><div><h1>Heading</h1><p>text</p></div>')
+
+    def test_unchanged_streamed_page_is_not_rewritten(self):
+        page, dest = f"{self.root}/content/index.md", f"{self.root}/docs/index.html"
+        old_limit = utils.STREAM_PAGE_BYTES
+        utils.STREAM_PAGE_BYTES = 0
+        try:
+            utils.generate_page(page, f"{self.root}/template.html", dest, "/")
+            os.utime(dest, ns=(0, 0))
+            utils.generate_page(page, f"{self.root}/template.html", dest, "/")
+            self.assertEqual(os.stat(dest).st_mtime_ns, 0)
+            self.write("content/index.md", "# Home\n\nchanged")
+            utils.generate_page(page, f"{self.root}/template.html", dest, "/")
+        finally:
+            utils.STREAM_PAGE_BYTES = old_limit
+        self.assertNotEqual(os.stat(dest).st_mtime_ns, 0)
+        self.assertIn("changed", self.read("docs/index.html"))
+        self.assertEqual(os.listdir(f"{self.root}/docs"), ["index.html"])
+
+    def test_streamed_page_memory_is_bounded(self):
+        import tracemalloc
+        text = "# Big\n\n" + "\n\n".join(f"para {i} with **bold** and `code`" for i in range(1500))
+        self.write("content/big.md", text)
+
+        def peak(limit):
+            old_limit = utils.STREAM_PAGE_BYTES
+            utils.STREAM_PAGE_BYTES = limit
+            tracemalloc.start()
+            try:
+                utils.generate_page(f"{self.root}/content/big.md", f"{self.root}/template.html", f"{self.root}/big.html", "/")
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                utils.STREAM_PAGE_BYTES = old_limit
+
+        # the first run fills the bounded leaf and pattern caches, the second one only holds the block being rendered
+        peak(0)
+        streamed = peak(0)
+        # a whole page holds its node tree, many times its markdown
+        whole = peak(len(text) + 1)
+        self.assertGreater(whole, len(text) * 4)
+        self.assertLess(streamed, whole // 8)
+
+    def test_errors_are_collected(self):
+        # a page without an H1 fails, but the other pages are still written
+        self.write("content/broken.md", "no title here")
+        self.write("content/blog/broken.md", "still no title")
+        with self.assertRaises(utils.PageBuildError) as ctx:
+            self.build("docs", 2)
+        self.assertEqual(len(ctx.exception.errors), 2)
+        self.assertTrue(os.path.isfile(f"{self.root}/docs/index.html"))
+        self.assertTrue(os.path.isfile(f"{self.root}/docs/blog/post/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
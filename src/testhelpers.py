@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+
+class TempSiteMixin:
+    """
+    for test cases that build a site in a temporary folder. setUp makes self.root, which is removed after
+    the test, write() and read() take paths relative to it. Listed before unittest.TestCase
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, rel_path, text):
+        """writes text to a file under self.root, creating its folder"""
+        path = f"{self.root}/{rel_path}"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fd:
+            fd.write(text)
+
+    def read(self, rel_path):
+        with open(f"{self.root}/{rel_path}", "r", encoding="utf-8") as fd:
+            return fd.read()
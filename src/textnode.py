@@ -10,11 +10,23 @@ class TextType(Enum):
 
 
 class TextNode:
+	"""immutable inline span, __slots__ keeps every node free of a per-instance __dict__"""
+
+	__slots__ = ("text", "text_type", "url")
 
 	def __init__(self, text, text_type, url=None):
-		self.text = text
-		self.text_type = text_type
-		self.url = url
+		object.__setattr__(self, "text", text)
+		object.__setattr__(self, "text_type", text_type)
+		object.__setattr__(self, "url", url)
+
+	def __setattr__(self, name, value):
+		raise AttributeError(f"TextNode is immutable, cannot set {name}")
+
+	def __hash__(self):
+		return hash((self.text, self.text_type, self.url))
+
+	def __reduce__(self):
+		return (TextNode, (self.text, self.text_type, self.url))
 	
 	def __eq__(self, other):
 		if self.text == other.text and self.text_type.value == other.text_type.value and self.url == other.url:
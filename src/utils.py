@@ -1,11 +1,44 @@
 import textnode
 import leafnode
 import parentnode
-import re
+import pagetemplate
+import pagewriter
+import patterns
+import profiler
 import os
-import shutil
+import time
+import logging
+import itertools
+import bisect
+import functools
+import hashlib
+import html
+import io
 from enum import Enum
 
+# manifest, assetsync, blockcache, highlight, shutil, mmap and concurrent.futures are imported by the functions that
+# need them, rendering a few pages never pays for hashing, asset syncing or process pools
+
+# bump whenever a change alters the html rendered for a block or page, persisted block caches are then
+# discarded and every page renders again
+RENDER_VERSION = 3
+
+# rendered html of recently seen blocks, None renders every block from scratch
+block_cache = None
+block_cache_path = None
+# size, srcset and lazy loading of the site's images (responsiveimages.ResponsiveImages), None renders plain img tags
+responsive_images = None
+# when True every page_info also holds the positions of the page's words, for searchindex
+search_terms = False
+# markdown files at least this big are memory mapped and rendered block by block instead of read whole.
+# A page rendered whole peaks at about 14 times its markdown size, mostly its node tree (3.5 MiB of
+# markdown: 47 MiB), a streamed one at the block being rendered plus the bounded leaf caches, under 2 MiB
+# at any size. Streaming is about 12% slower, so only pages past 1 MiB (14 MiB whole) take that path
+STREAM_PAGE_BYTES = 1 << 20
+
+# per page progress goes through this logger so it can be leveled or silenced
+logger = logging.getLogger("ssg")
+
 class BlockType(Enum):
 	PARAGRAPH = "paragraph"
 	HEADING = "heading"
@@ -21,7 +54,7 @@ def text_node_to_html_node(text_node):
         """
         match text_node.text_type:
             case textnode.TextType.NORMAL:
-                return leafnode.LeafNode(None,text_node.text)
+                return leafnode.text_leaf(text_node.text)
             case textnode.TextType.BOLD:
                 return leafnode.LeafNode('b',text_node.text)
             case textnode.TextType.ITALIC:
@@ -31,20 +64,23 @@ def text_node_to_html_node(text_node):
             case textnode.TextType.LINKS:
                 return leafnode.LeafNode('a',text_node.text,{"href": text_node.url, "target": "_self"})
             case textnode.TextType.IMAGES:
+                if responsive_images is not None:
+                    return leafnode.LeafNode("img","",responsive_images.img_props(text_node.url, text_node.text))
                 return leafnode.LeafNode("img","",{"src": text_node.url, "alt": text_node.text})
 
+
 def extract_markdown_images(text):
     """
     catches all markdown image urls and alt text and return a list of tuples
     """
-    matches = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    matches = patterns.IMAGE_PATTERN.findall(text)
     return matches
 
 def extract_markdown_links(text):
     """
     catches all markdown links urls and text and return a list of tuples
     """
-    matches = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    matches = patterns.LINK_PATTERN.findall(text)
     return matches
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
@@ -76,110 +112,186 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
     return new_nodes
 
+def _split_matches(text, pattern, text_type, nodes, append_text):
+    """
+    walks the matches of pattern by their offsets, emitting a text_type node per match and handing
+    the text between matches to append_text. The text is never re-split so cost is linear in matches
+    """
+    start = 0
+    for match in pattern.finditer(text):
+        if match.start() > start:
+            append_text(text[start:match.start()], nodes)
+        nodes.append(textnode.TextNode(match.group(1), text_type, match.group(2)))
+        start = match.end()
+    if start < len(text):
+        append_text(text[start:] if start else text, nodes)
+
+def _append_normal(text, nodes):
+    nodes.append(textnode.TextNode(text, textnode.TextType.NORMAL))
+
 def splite_node_images(old_nodes):
     new_nodes = []
 
     for node in old_nodes:
-        # If it's not a TEXT node, add it as-is
-        if node.text_type != textnode.TextType.NORMAL:
+        # If it's not a TEXT node, or holds no image, add it as-is
+        if node.text_type != textnode.TextType.NORMAL or "![" not in node.text:
             new_nodes.append(node)
             continue
+        _split_matches(node.text, patterns.IMAGE_PATTERN, textnode.TextType.IMAGES, new_nodes, _append_normal)
 
-        image_parts_list = extract_markdown_images(node.text)
-
-        # if no image is found in the text append the node as-is
-        if len(image_parts_list) == 0:
-            new_nodes.append(node)
-            continue
-
-        text = node.text
-        sections = []
-
-        # loop all images
-        for txt, url in image_parts_list:
-            sections = text.split(f"![{txt}]({url})", 1)
-            text = sections[1] if len(sections) > 0 else None
-
-            if sections[0] == "":
-                new_nodes.append(textnode.TextNode(txt, textnode.TextType.IMAGES, url))
-            else:
-                new_nodes.append(textnode.TextNode(sections.pop(0), textnode.TextType.NORMAL))
-                new_nodes.append(textnode.TextNode(txt, textnode.TextType.IMAGES, url))
-
-        # if all links have been extracted then append what is left from the text as a text node
-        for sec in sections:
-            if sec == "":
-                continue
-            else:
-                new_nodes.append(textnode.TextNode(sec, textnode.TextType.NORMAL))
-        
     return new_nodes
 
 def splite_node_links(old_nodes):
     new_nodes = []
 
     for node in old_nodes:
-        # If it's not a TEXT node, add it as-is
-        if node.text_type != textnode.TextType.NORMAL:
+        # If it's not a TEXT node, or holds no link, add it as-is
+        if node.text_type != textnode.TextType.NORMAL or "[" not in node.text:
             new_nodes.append(node)
             continue
+        _split_matches(node.text, patterns.LINK_PATTERN, textnode.TextType.LINKS, new_nodes, _append_normal)
 
-        links_parts_list = extract_markdown_links(node.text)
+    return new_nodes
 
-        # if no image is found in the text append the node as-is
-        if len(links_parts_list) == 0:
-            new_nodes.append(node)
-            continue
+# delimiters in the order the chained split passes applied them
+COMPAT_LEVELS = [("**", textnode.TextType.BOLD), ("*", textnode.TextType.ITALIC), ("`", textnode.TextType.CODE), ("_", textnode.TextType.ITALIC)]
+INLINE_TYPES = {"**": textnode.TextType.BOLD, "*": textnode.TextType.ITALIC, "`": textnode.TextType.CODE, "_": textnode.TextType.ITALIC}
 
-        text = node.text
-        sections = []
+def _append_images_and_links(text, nodes):
+    """appends the NORMAL text with its images and links split out, images first like splite_node_images"""
+    if "![" not in text:
+        _append_links(text, nodes)
+        return
+    _split_matches(text, patterns.IMAGE_PATTERN, textnode.TextType.IMAGES, nodes, _append_links)
 
-        # loop all images
-        for txt, url in links_parts_list:
-            sections = text.split(f"[{txt}]({url})", 1)
-            text = sections[1] if len(sections) > 0 else None
+def _append_links(text, nodes):
+    if "[" not in text:
+        _append_normal(text, nodes)
+        return
+    _split_matches(text, patterns.LINK_PATTERN, textnode.TextType.LINKS, nodes, _append_normal)
 
-            if sections[0] == "":
-                new_nodes.append(textnode.TextNode(txt, textnode.TextType.LINKS, url))
-            else:
-                new_nodes.append(textnode.TextNode(sections.pop(0), textnode.TextType.NORMAL))
-                new_nodes.append(textnode.TextNode(txt, textnode.TextType.LINKS, url))
+def _positions_between(positions, start, end):
+    """delimiter positions inside text[start:end], positions is sorted"""
+    return positions[bisect.bisect_left(positions, start):bisect.bisect_left(positions, end)]
 
-        # if all links have been extracted then append what is left from the text as a text node
-        for sec in sections:
-            if sec == "":
+def _compat_spans(start, end, positions, level, spans):
+    """
+    replays the chained split_nodes_delimiter passes on the delimiter positions of text[start:end]
+    instead of on the text itself, appending (start, end, text_type) spans in document order
+    """
+    while level < len(COMPAT_LEVELS):
+        delimiter, text_type = COMPAT_LEVELS[level]
+        cuts = _positions_between(positions[delimiter], start, end)
+        # a "**" left over by the bold pass counts as two "*" for the italic pass
+        if delimiter == "*":
+            doubles = _positions_between(positions["**"], start, end)
+            if doubles:
+                cuts = sorted(cuts + doubles + [pos + 1 for pos in doubles])
+
+        # no delimiter, or an odd number of them which is unmatched: the segment moves on untouched
+        if not cuts or len(cuts) % 2:
+            level += 1
+            continue
+
+        part_start = start
+        for i in range(len(cuts) + 1):
+            part_end = cuts[i] if i < len(cuts) else end
+            # only non-empty parts make a node
+            if part_end > part_start:
+                if i % 2:
+                    spans.append((part_start, part_end, text_type))
+                else:
+                    _compat_spans(part_start, part_end, positions, level + 1, spans)
+            part_start = part_end + len(delimiter)
+        return
+    if end > start:
+        spans.append((start, end, textnode.TextType.NORMAL))
+
+def _scan_inline_compat(text):
+    """one delimiter scan that reproduces the chained split passes exactly"""
+    positions = {"**": [], "*": [], "`": [], "_": []}
+    for match in patterns.INLINE_DELIMITERS.finditer(text):
+        positions[match.group()].append(match.start())
+    spans = []
+    _compat_spans(0, len(text), positions, 0, spans)
+
+    nodes = []
+    for start, end, text_type in spans:
+        if text_type == textnode.TextType.NORMAL:
+            _append_images_and_links(text[start:end], nodes)
+        else:
+            nodes.append(textnode.TextNode(text[start:end], text_type))
+    return nodes
+
+def _scan_inline(text):
+    """
+    single left-to-right scan: a delimiter is closed by the next identical one, links and images
+    are matched where they start, anything unmatched stays literal text
+    """
+    nodes = []
+    literal_start = 0
+    pos = 0
+    # where a closer search found nothing, per delimiter. A later search starting there or further on
+    # cannot find one either, so it is skipped instead of scanning the rest of the text again
+    no_closer_from = {}
+    while True:
+        match = patterns.INLINE_MARKERS.search(text, pos)
+        if match is None:
+            break
+        marker = match.group()
+        if marker[-1] == "[":
+            pattern = patterns.IMAGE_PATTERN if marker == "![" else patterns.LINK_PATTERN
+            found = pattern.match(text, match.start())
+            if found is None:
+                pos = match.end()
                 continue
-            else:
-                new_nodes.append(textnode.TextNode(sec, textnode.TextType.NORMAL))
-        
-    return new_nodes
+            if match.start() > literal_start:
+                nodes.append(textnode.TextNode(text[literal_start:match.start()], textnode.TextType.NORMAL))
+            text_type = textnode.TextType.IMAGES if marker == "![" else textnode.TextType.LINKS
+            nodes.append(textnode.TextNode(found.group(1), text_type, found.group(2)))
+            pos = literal_start = found.end()
+            continue
 
-def text_to_textnodes(text):
-    """returns a list of text nodes from the inline markdown"""
-    new_nodes = []
-    # make the raw string text into a text node
-    node = textnode.TextNode(text, textnode.TextType.NORMAL)
-    
-    # Process inline formatting (bold, italic, code)
-    new_nodes = split_nodes_delimiter([node], "**", textnode.TextType.BOLD)
-    new_nodes = split_nodes_delimiter(new_nodes, "*", textnode.TextType.ITALIC)
-    new_nodes = split_nodes_delimiter(new_nodes, "`", textnode.TextType.CODE)
-    new_nodes = split_nodes_delimiter(new_nodes, "_", textnode.TextType.ITALIC)
-
-    # finally take care of images and links text
-    new_nodes = splite_node_images(new_nodes)
-    new_nodes = splite_node_links(new_nodes)
+        if match.end() >= no_closer_from.get(marker, len(text) + 1):
+            pos = match.end()
+            continue
+        close = patterns.INLINE_CLOSERS[marker].search(text, match.end())
+        if close is None:
+            no_closer_from[marker] = match.end()
+        # unmatched or empty delimiters are kept as literal text
+        if close is None or close.start() == match.end():
+            pos = match.end()
+            continue
+        if match.start() > literal_start:
+            nodes.append(textnode.TextNode(text[literal_start:match.start()], textnode.TextType.NORMAL))
+        nodes.append(textnode.TextNode(text[match.end():close.start()], INLINE_TYPES[marker]))
+        pos = literal_start = close.end()
 
-    return new_nodes
+    if literal_start < len(text):
+        nodes.append(textnode.TextNode(text[literal_start:], textnode.TextType.NORMAL))
+    return nodes
+
+def text_to_textnodes(text, compat=True):
+    """
+    returns a list of text nodes from the inline markdown. compat=True gives exactly the output of the
+    old chained split passes (split_nodes_delimiter, splite_node_images, splite_node_links),
+    compat=False uses the stricter single scan where code and links are never broken up by delimiters
+    """
+    if compat:
+        return _scan_inline_compat(text)
+    return _scan_inline(text)
 
 def markdown_to_blocks(markdown):
     """Break down the string (full markdown Doc) into seperate blocks which are delimited by two \n\n (newlines)"""
+    # blank lines inside a code fence do not end the block, only fenced docs need the line by line reader
+    if "```" in markdown:
+        return list(iter_markdown_blocks(markdown.split("\n")))
 
     # strip any leading or trailing blank spaces
     new_markd = markdown.strip()
 
     # seperate the string based on two newlines which marks a block
-    lst_blocks = re.split(r'\n[ \t]*\n', new_markd)
+    lst_blocks = patterns.BLANK_LINE.split(new_markd)
     # strip each block encase of newlines or spaces leading or trainling each block
     lst_blocks = list(map(lambda x: x.strip(), lst_blocks))
     # filter that only non-empty blocks are in the list of blocks
@@ -187,184 +299,393 @@ def markdown_to_blocks(markdown):
 
     return lst_blocks
 
-def block_to_block_type(block_txt):
-    """Takes a single block of markdown text as input and returns a string representing the type of block it is. Assume all leading and trailing whitespace was already stripped"""
+def _join_block(lines):
+    """the stripped text of a block's lines, or None when they are all whitespace"""
+    block = "\n".join(lines).strip()
+    return block if block else None
 
-    # Headings start with 1-6 # characters, followed by a space and then the heading text.
-    if "# " in block_txt[0:2] or "## " in block_txt[0:3] or "### " in block_txt[0:4] or "#### " in block_txt[0:5] or "##### " in block_txt[0:6] or "###### " in block_txt[0:7]:
-        return BlockType.HEADING
-    # Code blocks must start with 3 backticks and end with 3 backticks.
-    elif "```" in block_txt[0:3] and "```" in block_txt[-3:]:
-        return BlockType.CODE
+def iter_markdown_blocks(file):
+    """
+    yields the blocks of a markdown doc as they complete while reading it line by line, file is an open file
+    or any iterable of lines. Blocks end at blank lines, except inside a code fence that opens a block.
+    Only the lines of the current block are held in memory
+    """
+    lines = []
+    in_fence = False
+    for line in file:
+        line = line.rstrip("\n")
+        stripped = line.strip()
+        if in_fence:
+            lines.append(line)
+            in_fence = not stripped.endswith("```")
+            continue
+        # a blank line is made of nothing but spaces and tabs
+        if not line.strip(" \t"):
+            block = _join_block(lines)
+            if block is not None:
+                yield block
+            lines = []
+            continue
+        if not lines and stripped.startswith("```"):
+            # the fence stays open until a line ends with ```, the opening line can close it itself
+            in_fence = len(stripped) < 6 or not stripped.endswith("```")
+        # leading whitespace only lines belong to no block yet
+        if lines or stripped:
+            lines.append(line)
+
+    if in_fence:
+        # a fence that never closes is not code, its blank lines split it like any other text
+        for is_blank, group in itertools.groupby(lines, lambda line: not line.strip(" \t")):
+            block = None if is_blank else _join_block(list(group))
+            if block is not None:
+                yield block
+        return
+    block = _join_block(lines)
+    if block is not None:
+        yield block
+
+# patterns.BLOCK_START group number -> block type
+BLOCK_KINDS = {1: BlockType.HEADING, 2: BlockType.CODE, 3: BlockType.QUOTE, 4: BlockType.UNORDERED, 5: BlockType.ORDERED}
+
+def classify_block(block_txt):
+    """
+    returns the block type and, for quotes and lists, the block's stripped lines so the builder does not split
+    the block again. Invalid quote and list blocks raise ValueError. Assumes the block was already stripped
+    """
+    match = patterns.BLOCK_START.match(block_txt)
+    if match is None:
+        return BlockType.PARAGRAPH, None
+    kind = BLOCK_KINDS[match.lastindex]
+    # a code fence only makes a code block when the block also ends with one
+    if kind == BlockType.CODE and not block_txt.endswith("```"):
+        return BlockType.PARAGRAPH, None
+    if kind in (BlockType.HEADING, BlockType.CODE):
+        return kind, None
+
+    lines = [line.strip() for line in block_txt.split("\n")]
     # Every line in a quote block must start with a > character
-    elif ">" in block_txt[0:1]:
-        # check every newline item has >
-        for line in block_txt.split("\n"):
-            line = line.strip()
-            if ">" not in line[0:1]:
+    if kind == BlockType.QUOTE:
+        for line in lines:
+            if not line.startswith(">"):
                 raise ValueError("You are missing a > in the front of each newline of text")
-        return BlockType.QUOTE
     # Every line in an unordered list block must start with a * or - character, followed by a space.
-    elif "* " in block_txt[0:2] or "- " in block_txt[0:2]:
-        # check every newline item has * or - 
-        for line in block_txt.split("\n"):
-            line = line.strip()
-            if "* " not in line[0:2] and "- " not in line[0:2]:
+    elif kind == BlockType.UNORDERED:
+        for line in lines:
+            if not line.startswith(("* ", "- ")):
                 raise ValueError("You are missing a * or - in the front of the unordered item (followed by a space)")
-        return BlockType.UNORDERED
-    # Every line in an ordered list block must start with a number followed by a . character and a space. The number must start at 1 and increment by 1 for each line.
-    elif "1. " in block_txt[0:3]:
-        count = 1
-        # check every newline item has * or - 
-        for line in block_txt.split("\n"):
-            line = line.strip()
-            if f"{count}. " not in line[0:3]:
+    # Every line in an ordered list block must start with a number followed by a . character and a space, counting up from 1.
+    else:
+        for count, line in enumerate(lines, 1):
+            if not line.startswith(f"{count}. "):
                 raise ValueError("You are missing a number , a dot(.) , or a space at the start of each ordered item")
-            count += 1
-        return BlockType.ORDERED
-    # If none of the above conditions are met, the block is a normal paragraph.
-    else: 
-        return BlockType.PARAGRAPH
+    return kind, lines
 
-def block_to_simple_text(text, type):
+def block_to_block_type(block_txt):
+    """Takes a single block of markdown text as input and returns a string representing the type of block it is. Assume all leading and trailing whitespace was already stripped"""
+    return classify_block(block_txt)[0]
+
+def _block_content(text, type, lines):
+    """the tag of a block and its inline text, or the list of its item texts for lists"""
     match type:
         case BlockType.HEADING:
-            matches = re.findall(r'^\#{1,6} ', text)  # Finds # symbols for tag
-            tag = f"h{len(matches[0]) - 1}"
-            matches = re.findall(r'^\#{1,6} (.*?)$', text) # get the text
-            heading_text = matches[0].strip() # strip the text of all spaces leading and ending
-            return tag, heading_text # return the tag and the text
+            level = text.index(" ")
+            if "\n" in text:
+                raise ValueError(f"A heading block must be a single line: {text}")
+            return f"h{level}", text[level + 1:].strip()
         case BlockType.QUOTE:
-            tag = "blockquote"
-            lst_newline_text = text.splitlines()
-            matches = []
-            for linetxt in lst_newline_text:
-                linetxt = linetxt.strip()
-                matches.extend(re.findall(r'^\>{0,1}[ \t]{0,4}(.*?)$', linetxt)) # get the text
-            quote_text = "\n".join(matches) # join the list of strings into a single string with newlines
-            return tag, quote_text # return the tag and the text
+            # get the text of each line without its > marker
+            return "blockquote", "\n".join(line[patterns.QUOTE_PREFIX.match(line).end():] for line in lines)
         case BlockType.CODE:
-            tag = "code"
-            matches = re.findall(r'\`{3}(.*?)\`{3}', text, re.DOTALL) # get the text
-            return tag, matches[0].strip() # return the tag and the text
+            return "pre", split_code_block(text)[1]
         case BlockType.UNORDERED:
-            tag = "ul"
-            matches = re.findall(r'[*-]\s{0,4}(.*)', text) # get the text
-            for i, txt in enumerate(matches):
-                matches[i] = txt.strip() # strip each unordered item of leading and ending spaces
-            return tag, "\n".join(matches)
+            # drop the * or - marker, strip each item of leading and ending spaces
+            return "ul", [line[1:].strip() for line in lines]
         case BlockType.ORDERED:
-            tag = "ol"
-            matches = re.findall(r'[\d+]\.\s{0,4}(.*)', text) # get the text
-            for i, txt in enumerate(matches):
-                matches[i] = txt.strip() # strip each ordered item of leading and ending spaces
-            return tag, "\n".join(matches)
+            # drop the number and dot, strip each item of leading and ending spaces
+            return "ol", [line[len(f"{count}."):].strip() for count, line in enumerate(lines, 1)]
 
+def split_code_block(text):
+    """
+    the (language, code) of a fenced code block. The language is the first word after the opening fence,
+    the code keeps its indentation and runs up to the first closing fence
+    """
+    end = text.find("```", 3)
+    if end == -1:
+        raise ValueError(f"A code block needs a closing ```: {text}")
+    info, newline, code = text[3:end].partition("\n")
+    if not newline:
+        # ```code``` on one line has no language
+        return "", info.strip()
+    language = info.split(maxsplit=1)[0] if info.strip() else ""
+    return language, code.rstrip().lstrip("\n")
 
-def block_to_html_parent_node(block, type):
-    """Returns the child (parent node in) for the main parent node"""
-    match type:
-        case BlockType.PARAGRAPH:
-            parent_tag = "p"
-            children = []
-            # get all different inline type text nodes
-            lst_text_nodes = text_to_textnodes(block)
-            # a paragraph parent node will only have inline markdown leafnodes
-            for node in lst_text_nodes:
-                children.append(text_node_to_html_node(node))
-            # return the parent node with its children nodes
-            return parentnode.ParentNode(parent_tag, children)
-        
-        case BlockType.HEADING:
-            children = []
-            parent_tag, block_text = block_to_simple_text(block, type)
-            # get all different inline type text nodes
-            lst_text_nodes = text_to_textnodes(block_text)
-            # a paragraph parent node will only have inline markdown leafnodes
-            for node in lst_text_nodes:
-                children.append(text_node_to_html_node(node))
-            # return the parent node with its children nodes
-            return parentnode.ParentNode(parent_tag, children)
+def block_to_simple_text(text, type):
+    """returns the tag and the text of a block, list items are joined with newlines"""
+    lines = None
+    if type in (BlockType.QUOTE, BlockType.UNORDERED, BlockType.ORDERED):
+        lines = [line.strip() for line in text.split("\n")]
+    tag, content = _block_content(text, type, lines)
+    if isinstance(content, list):
+        return tag, "\n".join(content)
+    return tag, content
+
+def text_to_children(text):
+    """returns the inline leafnodes of a piece of markdown text"""
+    if profiler.active is None:
+        return [text_node_to_html_node(node) for node in text_to_textnodes(text)]
+    # with a profile running the inline splitting time is recorded on its own
+    start = time.perf_counter()
+    lst_text_nodes = text_to_textnodes(text)
+    profiler.active.inline_seconds += time.perf_counter() - start
+    return [text_node_to_html_node(node) for node in lst_text_nodes]
+
+def block_to_html_parent_node(block, type, lines=None):
+    """Returns the child (parent node in) for the main parent node, lines are the block's lines from classify_block"""
+    if type == BlockType.PARAGRAPH:
+        # a paragraph parent node will only have inline markdown leafnodes
+        return parentnode.ParentNode("p", text_to_children(block))
+    if type == BlockType.CODE:
+        # code is escaped and highlighted, never read as inline markdown
+        import highlight
+        return parentnode.ParentNode("pre", [highlight.code_node(*split_code_block(block))])
+    if lines is None and type in (BlockType.QUOTE, BlockType.UNORDERED, BlockType.ORDERED):
+        lines = [line.strip() for line in block.split("\n")]
+
+    parent_tag, content = _block_content(block, type, lines)
+    if isinstance(content, list):
+        # for each list item get its inline children
+        return parentnode.ParentNode(parent_tag, [parentnode.ParentNode("li", text_to_children(item)) for item in content])
+    # return the parent node with its inline children nodes
+    return parentnode.ParentNode(parent_tag, text_to_children(content))
+
+def _decode_chunk(chunk):
+    """decodes mapped bytes the way a text mode read would, newlines included"""
+    text = chunk.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+def _fence_state(text, in_fence):
+    """whether a code fence is still open after the lines of text, in_fence tells if one was open before them"""
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if in_fence:
+            if stripped.endswith("```"):
+                return False
+        elif stripped:
+            # only the first line of a block can open a fence
+            if not stripped.startswith("```"):
+                return False
+            in_fence = len(stripped) < 6 or not stripped.endswith("```")
+            if not in_fence:
+                return False
+    return in_fence
 
-        case BlockType.QUOTE:
-            children = []
-            parent_tag, block_text = block_to_simple_text(block, type)
-            # get all different inline type text nodes
-            lst_text_nodes = text_to_textnodes(block_text)
-            # a paragraph parent node will only have inline markdown leafnodes
-            for node in lst_text_nodes:
-                children.append(text_node_to_html_node(node))
-            # return the parent node with its children nodes
-            return parentnode.ParentNode(parent_tag, children)
-        
-        case BlockType.CODE:
-            children = []
-            parent_tag, block_text = block_to_simple_text(block, type)
-            # get all different inline type text nodes
-            lst_text_nodes = text_to_textnodes(block_text)
-            # a paragraph parent node will only have inline markdown leafnodes
-            for node in lst_text_nodes:
-                children.append(text_node_to_html_node(node))
-            # return the parent node with its children nodes
-            return parentnode.ParentNode(parent_tag, children)
-        
-        case BlockType.UNORDERED:
-            children = []
-            parent_tag, block_text = block_to_simple_text(block, type)
-            # for each unordered item get its inline children
-            for item in block_text.splitlines():
-                childrens_children = []
-                # get all different inline type text nodes
-                lst_text_nodes = text_to_textnodes(item)
-                # a paragraph parent node will only have inline markdown leafnodes
-                for node in lst_text_nodes:
-                    childrens_children.append(text_node_to_html_node(node))
-                children.append(parentnode.ParentNode("li", childrens_children))
-            # return the parent node with its children nodes
-            return parentnode.ParentNode(parent_tag, children)
-        
-        case BlockType.ORDERED:
-            children = []
-            parent_tag, block_text = block_to_simple_text(block, type)
-            # for each unordered item get its inline children
-            for item in block_text.splitlines():
-                childrens_children = []
-                # get all different inline type text nodes
-                lst_text_nodes = text_to_textnodes(item)
-                # a paragraph parent node will only have inline markdown leafnodes
-                for node in lst_text_nodes:
-                    childrens_children.append(text_node_to_html_node(node))
-                children.append(parentnode.ParentNode("li", childrens_children))
-            # return the parent node with its children nodes
-            return parentnode.ParentNode(parent_tag, children)
+def iter_mapped_blocks(buffer, start=0):
+    """
+    yields the same blocks as iter_markdown_blocks from the raw utf-8 bytes of a doc, such as an mmap.
+    Block boundaries are found on the bytes, only the block being yielded is decoded. Reading starts at
+    start, past the front matter
+    """
+    block_start = start
+    # start of every blank line separated chunk of a fence that has not closed yet
+    fence_chunks = None
+    chunk_start = start
+    for separator in itertools.chain(patterns.BLANK_LINE_BYTES.finditer(buffer, start), [None]):
+        chunk_end = len(buffer) if separator is None else separator.start()
+        text = _decode_chunk(buffer[chunk_start:chunk_end])
+        if fence_chunks is None:
+            block = text.strip()
+            if block.startswith("```") and _fence_state(text, False):
+                block_start = chunk_start
+                fence_chunks = [(chunk_start, chunk_end)]
+            elif block:
+                yield block
+        else:
+            fence_chunks.append((chunk_start, chunk_end))
+            if not _fence_state(text, True):
+                # the fence closed in this chunk, the block is everything since it opened, blank lines included
+                yield _decode_chunk(buffer[block_start:chunk_end]).strip()
+                fence_chunks = None
+        if separator is not None:
+            chunk_start = separator.end()
+
+    if fence_chunks is not None:
+        # a fence that never closes is not code, its blank lines split it like any other text
+        for start, end in fence_chunks:
+            block = _decode_chunk(buffer[start:end]).strip()
+            if block:
+                yield block
+
+def mapped_title(buffer, start=0):
+    """extract_title for the raw utf-8 bytes of a doc, the search stops at the first H1 header"""
+    title = patterns.TITLE_BYTES.search(buffer, start)
+    if title is None:
+        raise Exception("No H1 header was found in the markdown")
+    return title.group(1).decode("utf-8").strip()
+
+def iter_block_nodes(blocks, words=None):
+    """
+    yields the html node of each markdown block, blocks can be any iterable such as iter_markdown_blocks.
+    The words of each block are appended to words when it is given
+    """
+    if block_cache is not None:
+        from blockcache import block_key
+    for markdown_block in blocks:
+        if block_cache is None:
+            # get the block type and its lines in one scan
+            markdown_type, lines = classify_block(markdown_block)
+            # get child nodes of main parent
+            node = block_to_html_parent_node(markdown_block, markdown_type, lines)
+            if words is not None:
+                words.extend(node_words(node))
+            yield node
+            continue
+        # identical blocks are rendered once, later copies reuse the html as an untagged leaf
+        key = block_key(markdown_block)
+        if responsive_images is not None and "![" in markdown_block:
+            # the img attributes of the block depend on the images too
+            key += responsive_images.digest
+        block_html = block_cache.get(key)
+        if block_html is None:
+            node = block_to_html_parent_node(markdown_block, *classify_block(markdown_block))
+            block_html = node.to_html()
+            block_cache.put(key, block_html)
+            if words is not None:
+                words.extend(node_words(node))
+        elif words is not None:
+            words.extend(block_words(markdown_block))
+        yield leafnode.LeafNode(None, block_html)
 
 def markdown_to_html_node(markdown):
     # break down the markdown doc string into independent blocks
-    block_lst = markdown_to_blocks(markdown)
+    return blocks_to_html_node(markdown_to_blocks(markdown))
 
+def blocks_to_html_node(block_lst, words=None):
     main_parent_node_tag = "div"
-    # create a list for the children of main parent node
-    chidren_nodes = []
+    # the children of main parent node, one per block
+    return parentnode.ParentNode(main_parent_node_tag, list(iter_block_nodes(block_lst, words)))
+
+def add_block_references(block, links, images):
+    """appends the urls of the links and images in a block to links and images, code blocks and code spans have none"""
+    if block.startswith("```") and block.endswith("```"):
+        return
+    if "[" not in block:
+        return
+    if "`" in block:
+        # a link written inside a code span renders as its text, it links nowhere
+        block = patterns.CODE_SPAN.sub("", block)
+    images.extend(url for _, url in extract_markdown_images(block))
+    links.extend(url for _, url in extract_markdown_links(block))
+
+def node_words(node):
+    """
+    the casefolded words of the text under a block's html node: the text nodes it was built from, img alt
+    text included, so link urls and markup never count
+    """
+    texts = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag == "pre":
+            # code is escaped html split into tokens, its words are those of the code itself
+            texts.append(html.unescape("".join(leaf.value for leaf in node.children[0].children)))
+        elif node.children is not None:
+            stack.extend(reversed(node.children))
+        elif node.tag == "img":
+            texts.append(node.props["alt"])
+        elif node.value:
+            texts.append(node.value)
+    return tuple(patterns.SEARCH_WORD.findall(" ".join(texts).casefold()))
+
+@functools.lru_cache(maxsize=4096)
+def block_words(block):
+    """the node_words of a block that was not rendered here: served from the block cache or only scanned"""
+    try:
+        node = block_to_html_parent_node(block, *classify_block(block))
+    except ValueError:
+        # the page fails to render anyway
+        return ()
+    return node_words(node)
+
+def page_info(title, links, images, words=None, meta=None):
+    """
+    what the site index keeps of a page, each url listed once in first seen order, and its front matter.
+    With words, "terms" maps each of them to its positions in the page
+    """
+    info = {"title": title, "links": list(dict.fromkeys(links)), "images": list(dict.fromkeys(images)), "meta": meta if meta is not None else {}}
+    if words is not None:
+        terms = {}
+        for position, word in enumerate(words):
+            terms.setdefault(word, []).append(position)
+        info["terms"] = terms
+    return info
+
+def scan_page_info(from_path):
+    """the page_info of a markdown file, without rendering it"""
+    with open(from_path, "r", encoding="utf-8") as fd:
+        meta, markdown = split_front_matter(fd.read())
+    links, images = [], []
+    words = [] if search_terms else None
+    for block in markdown_to_blocks(markdown):
+        add_block_references(block, links, images)
+        if search_terms:
+            words.extend(block_words(block))
+    return page_info(meta.get("title") or extract_title(markdown), links, images, words, meta)
+
+def scan_page_meta(from_path):
+    """the (title, front matter) of a markdown file, found without parsing any of its blocks"""
+    with open(from_path, "r", encoding="utf-8") as fd:
+        meta, markdown = split_front_matter(fd.read())
+    return meta.get("title") or extract_title(markdown), meta
 
-    # loop through the blocks
-    for markdown_block in block_lst:
-        # get the block type 
-        markdown_type = block_to_block_type(markdown_block)
-        # get child nodes of main parent
-        chidren_nodes.append(block_to_html_parent_node(markdown_block, markdown_type))
-    return parentnode.ParentNode(main_parent_node_tag, chidren_nodes)
+def iter_markdown_html(blocks, words=None):
+    """
+    yields the same html as markdown_to_html_node(...).iter_html() one block at a time, so a page streamed
+    from iter_markdown_blocks is never held in memory as a whole
+    """
+    yield "<div>"
+    for node in iter_block_nodes(blocks, words):
+        yield from node.iter_html()
+    yield "</div>"
+
+def enable_block_cache(max_entries=4096, path=None):
+    """turns on the rendered block cache, loading it from path when one is given, and returns it"""
+    global block_cache, block_cache_path
+    import blockcache
+    block_cache_path = path
+    if path is not None:
+        block_cache = blockcache.BlockCache.load(path, max_entries, RENDER_VERSION)
+    else:
+        block_cache = blockcache.BlockCache(max_entries, RENDER_VERSION)
+    return block_cache
+
+def disable_block_cache():
+    global block_cache, block_cache_path
+    block_cache = None
+    block_cache_path = None
 
 # function that recursively creates a public directory with folders and subdirectories from a source folder
-def create_public_dir(dest_path):
+def create_public_dir(dest_path, build_manifest=None, static_path="static", hardlink=False):
+    """
+    fills dest_path with the static/ folder. Without a manifest the destination is wiped and recopied,
+    with one the folders are synced: unchanged assets are skipped, changed ones copied and stale copies removed
+    """
     path_des = dest_path
-    path_src = f"static"
+    path_src = static_path
     # check if destination and source directories exist based on current working directory
     doesDesExist = os.path.exists(path_des) 
     doesSrcExist = os.path.exists(path_src)
 
     # if the source folder is not found raise an error
     if not doesSrcExist:
-        raise Exception("No Source directory called static was found.")
+        raise Exception(f"No Source directory called {path_src} was found.")
+    # incremental builds keep the destination and only sync what changed
+    if build_manifest is not None:
+        import assetsync
+        assetsync.sync_static(path_src, path_des, build_manifest, hardlink=hardlink)
+        return
+    import shutil
     # if destination is found then delete it and all its contents
     if doesDesExist:
         shutil.rmtree(path_des)
@@ -372,11 +693,12 @@ def create_public_dir(dest_path):
     os.mkdir(path_des, mode=0o755)
 
     # get initial list of items in the source folder
-    init_lst = os.listdir(f"static")
+    init_lst = os.listdir(path_src)
     # perform recursive to fill des folder with src folder items
     helper_fill_folder(init_lst, path_src, path_des)
 
 def helper_fill_folder(source_lst, src_path, des_path):
+    import shutil
     for item in source_lst:
         # if the item is a file then copy it to des folder
         if os.path.isfile(f"{src_path}/{item}"):
@@ -391,100 +713,407 @@ def helper_fill_folder(source_lst, src_path, des_path):
             helper_fill_folder(new_src_lst, f"{src_path}/{item}", f"{des_path}/{item}")
     return
 
-def helper_fill_folder_with_html(source_lst, src_path, des_path, template_path, base_path):
+def page_url(output, dest_path, base_path):
+    """docs/blog/tom/index.html -> /blog/tom/ under the base path"""
+    rel_path = os.path.relpath(output, dest_path).replace(os.sep, "/")
+    if rel_path == "index.html":
+        rel_path = ""
+    elif rel_path.endswith("/index.html"):
+        rel_path = rel_path[:-len("index.html")]
+    return f"{base_path}{rel_path}"
+
+def page_file_name(item):
+    """the .html file name a markdown file name renders to"""
+    if ".html" in item.lower():
+        return item
+    return patterns.FILE_EXTENSION.sub(".html", item)
+
+def page_dest_path(from_path, dir_path_content, dest_dir_path):
+    """the output path of one markdown file under dir_path_content, as the recursive build names it"""
+    rel_dir, item = os.path.split(os.path.relpath(from_path, dir_path_content))
+    if rel_dir:
+        return f"{dest_dir_path}/{rel_dir}/{page_file_name(item)}"
+    return f"{dest_dir_path}/{page_file_name(item)}"
+
+def helper_find_markdown_pages(source_lst, src_path, des_path, pages):
+    """collects (source, destination) pairs for every markdown file and creates the destination folders"""
     for item in source_lst:
-        # if the item is a file then copy it to des folder
+        # if the item is a file then queue it with its .html destination
         if os.path.isfile(f"{src_path}/{item}"):
-            if not (".html" in item.lower()):
-                modified_item = re.sub(r"\.[a-zA-Z]{1,16}$", ".html", item)
-            generate_page(f"{src_path}/{item}", template_path, f"{des_path}/{modified_item}", base_path)
+            pages.append((f"{src_path}/{item}", f"{des_path}/{page_file_name(item)}"))
         # else if it is a folder
         elif os.path.isdir(f"{src_path}/{item}"):
             # get its list of items
             new_src_lst = os.listdir(f"{src_path}/{item}")
-            # create folder in the des folder
-            os.mkdir(f"{des_path}/{item}")
+            # create folder in the des folder up front so parallel workers never race on it
+            os.makedirs(f"{des_path}/{item}", exist_ok=True)
             # recursively go through the subfolder items
-            helper_fill_folder_with_html(new_src_lst, f"{src_path}/{item}", f"{des_path}/{item}", template_path, base_path)
-    return
+            helper_find_markdown_pages(new_src_lst, f"{src_path}/{item}", f"{des_path}/{item}", pages)
+    return pages
 
 def extract_title(markdown):
     """Return the first H1 header title with no leading or trailing spaces"""
-    # capture all h1 header titles
-    titles = re.findall(r"# (.*)\s{0,4}", markdown)
+    title = patterns.TITLE_PATTERN.search(markdown)
     # use the first one if it exist, stripped of leading spaces or ending spaces
-    if len(titles) >= 1:
-        return titles[0].strip()
+    if title is not None:
+        return title.group(1).strip()
     else:
         raise Exception("No H1 header was found in the markdown")
 
-def helper_build_des_path(des_path):
-    # if the path exists then jsut return true
-    if os.path.exists(des_path):
-        return True
-        
-    # break up the path
-    des_path_lst = des_path.split("/")
-    build_path = ""
-    # check that each component of the path exists
-    for i,item in enumerate(des_path_lst):
-        # if the item is a potential file with it exists or not
-        if re.search(r".*\.[a-zA-Z]{1,16}", item):
-            build_path += item
-            # make sure a file item is the last item in the list or the path is broken by a file
-            if i == (len(des_path_lst) - 1):
-                return True
-            else:
-                return False
-    
-        # if the component is a single dot or double then ignore
-        if item == "." or item == "" or item == "..":
-            build_path += item + "/"
+def parse_front_matter(text):
+    """
+    the {key: value} of front matter lines, keys are lowercased and quotes around a value dropped.
+    "tags" is a list, written "tags: a, b" or "tags: [a, b]". Lines without a key are ignored
+    """
+    meta = {}
+    for line in text.split("\n"):
+        key, sep, value = line.partition(":")
+        key = key.strip().lower()
+        if not sep or not key:
             continue
-        elif not os.path.exists(build_path + item):
-            os.mkdir(build_path + item)
-        build_path += item + "/"
+        value = value.strip()
+        if key == "tags":
+            tags = (tag.strip().strip("\"'") for tag in value.strip("[]").split(","))
+            meta[key] = [tag for tag in tags if tag]
+        else:
+            if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            meta[key] = value
+    return meta
+
+def split_front_matter(markdown):
+    """returns (front matter, the rest of the doc), a doc without front matter comes back whole with {}"""
+    # most docs have none, the check costs nothing next to a match
+    if not markdown.startswith("---"):
+        return {}, markdown
+    front = patterns.FRONT_MATTER.match(markdown)
+    if front is None:
+        return {}, markdown
+    return parse_front_matter(front.group(1) or ""), markdown[front.end():]
+
+def mapped_front_matter(buffer):
+    """split_front_matter for the raw utf-8 bytes of a doc, returns the front matter and the offset the doc goes on at"""
+    if buffer[:3] != b"---":
+        return {}, 0
+    front = patterns.FRONT_MATTER_BYTES.match(buffer)
+    if front is None:
+        return {}, 0
+    return parse_front_matter(_decode_chunk(front.group(1) or b"")), front.end()
+
+class PageBuildError(Exception):
+    """raised after a build when one or more pages failed, carries every (source, error) pair"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        lines = [f"{src}: {err}" for src, err in errors]
+        super().__init__(f"{len(errors)} page(s) failed to build:\n" + "\n".join(lines))
+
+class _HashingStream:
+    """the text stream a streamed page is written to, writes the utf-8 bytes to fd and hashes them on the way"""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.digest = hashlib.blake2b()
+        self.size = 0
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.digest.update(data)
+        self.size += len(data)
+        self.fd.write(data)
+
+def _file_digest(path):
+    """the blake2b digest of a file, read in chunks"""
+    digest = hashlib.blake2b()
+    with open(path, "rb") as fd:
+        for chunk in iter(lambda: fd.read(io.DEFAULT_BUFFER_SIZE), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+def helper_write_atomic(dest_path, write):
+    """
+    calls write(stream) on a temp file that replaces dest_path, so a page that fails half way never replaces a good one.
+    Like pagewriter.write_if_changed an unchanged page is left alone, the temp file is dropped when its hash matches
+    the file already there. Returns True when the file was written
+    """
+    tmp_path = f"{dest_path}.tmp"
+    try:
+        with open(tmp_path, "wb") as fd:
+            stream = _HashingStream(fd)
+            write(stream)
+        try:
+            unchanged = os.path.getsize(dest_path) == stream.size and _file_digest(dest_path) == stream.digest.digest()
+        except OSError:
+            unchanged = False
+        if unchanged:
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
     return True
 
-def generate_page(from_path, template_path, dest_path, BASEPATH):
-    """Creates a page"""
-    print(f"Generating page from {from_path} to {dest_path} using {template_path} using base path {BASEPATH}")
+def generate_page(from_path, template_path, dest_path, BASEPATH, template_text=None, writer=None):
+    """
+    Creates a page, template_text can be passed in when the template was already loaded.
+    With a pagewriter.PageWriter the page is handed to its threads instead of written here.
+    Returns the page_info of the page for the site index
+    """
+    # formatted only when info is enabled, a quiet build renders every page without building this string
+    logger.info("Generating page from %s to %s using %s using base path %s", from_path, dest_path, template_path, BASEPATH)
+    profile = profiler.active
+    clock = time.perf_counter()
+    links, images = [], []
+    words = [] if search_terms else None
+
+    # the compiled template is cached, the file is only read again when it changed
+    if template_text is None:
+        page_template = pagetemplate.load_template(template_path, BASEPATH)
+    else:
+        page_template = pagetemplate.compile_template(template_text, BASEPATH)
+
+    # an empty file cannot be mapped, it is read like any small page
+    size = os.path.getsize(from_path)
+    if profile is None and size > 0 and size >= STREAM_PAGE_BYTES:
+        # big pages are mapped instead of read, blocks are decoded one at a time as they are rendered
+        def referenced_blocks(blocks):
+            for block in blocks:
+                add_block_references(block, links, images)
+                yield block
+
+        import mmap
+        with open(from_path, "rb") as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            meta, start = mapped_front_matter(buffer)
+            title = meta.get("title") or mapped_title(buffer, start)
+            # streamed straight into the file, it is never held whole to be queued or compared
+            os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+            helper_write_atomic(dest_path, lambda out: page_template.write(out, title, iter_markdown_html(referenced_blocks(iter_mapped_blocks(buffer, start)), words)))
+        return page_info(title, links, images, words, meta)
 
     full_Md_text = None
     # retrieve the full .md file text from the path given
     with open(from_path, "r", encoding="utf-8") as fd:
         full_Md_text = fd.read() 
-
-    template_text = None
-    # retrieve the full template file text from the path given
+    # the front matter is not part of the page, a title set there wins over the H1
+    meta, full_Md_text = split_front_matter(full_Md_text)
+    block_lst = markdown_to_blocks(full_Md_text)
+    for block in block_lst:
+        add_block_references(block, links, images)
+
+    if profile is None:
+        # get the html node of full MD text, with the words of its text nodes when a search index wants them
+        html_node = blocks_to_html_node(block_lst, words)
+        # get md title text
+        title = meta.get("title") or extract_title(full_Md_text)
+        # fill {{ Title }} and stream the html in where {{ Content }} was, encoded as it is written so the
+        # page is held once as bytes, not as text, its copy and its encoding
+        page = io.BytesIO()
+        out = io.TextIOWrapper(page, encoding="utf-8", newline="")
+        page_template.write(out, title, html_node.iter_html())
+        out.detach()
+        if writer is not None:
+            writer.submit(dest_path, page.getvalue(), from_path)
+        else:
+            pagewriter.write_if_changed(dest_path, page.getvalue())
+        return page_info(title, links, images, words, meta)
+
+    # profiled pages are built in separate steps so each one can be timed, the bytes are the same
+    stages = {}
+    def lap(stage):
+        nonlocal clock
+        now = time.perf_counter()
+        stages[stage] = now - clock
+        clock = now
+
+    lap("read")
+    inline_before = profile.inline_seconds
+    html_node = blocks_to_html_node(block_lst, words)
+    lap("parse")
+    stages["inline"] = profile.inline_seconds - inline_before
+    stages["parse"] -= stages["inline"]
+    title = meta.get("title") or extract_title(full_Md_text)
+    lap("title")
+    html_str = "".join(html_node.iter_html())
+    lap("serialize")
+    page = page_template.render(title, html_str)
+    lap("template")
+    # profiled pages are written here even with a writer, so the write stage is their own
+    pagewriter.write_if_changed(dest_path, page)
+    lap("write")
+    profile.add_page(from_path, stages)
+    return page_info(title, links, images, words, meta)
+
+# template text loaded once per worker process by the pool initializer
+_worker_template = None
+
+def _init_page_worker(template_path, log_level, profiling, cache_entries, cache_path, images, search):
+    global _worker_template, responsive_images, search_terms
     with open(template_path, "r", encoding="utf-8") as fd:
-        template_text = fd.read()
-    
-    # get the html node of full MD text
-    html_node = markdown_to_html_node(full_Md_text)
-    # get the string of the html
-    html_str = html_node.to_html()
-    
-    # get md title text
-    title = extract_title(full_Md_text)
-
-    # Replace the {{ Title }} and {{ Content }} placeholders in the template with title Md and html Md string
-    template_text = template_text.replace("{{ Title }}", title, 1)
-    template_text = template_text.replace("{{ Content }}", html_str, 1)
-
-    # replace instances with base_path
-    template_text = template_text.replace("href=\"/", f"href=\"{BASEPATH}")
-    template_text = template_text.replace("src=\"/", f"src=\"{BASEPATH}")
-
-    if helper_build_des_path(dest_path):
-        with open(dest_path, "w", encoding="utf-8") as fd:
-            fd.write(template_text)
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, base_path):
+        _worker_template = fd.read()
+    # workers start with the logging level and profiling state of the build that spawned them
+    logger.setLevel(log_level)
+    if profiling:
+        profiler.enable()
+    # each worker keeps its own block cache, seeded from the persisted one. What it adds goes back with
+    # every page and is merged into the build's cache, which is the one that gets saved
+    if cache_entries:
+        enable_block_cache(cache_entries, cache_path).track_new()
+    responsive_images = images
+    search_terms = search
+
+def _try_generate_page(from_path, template_path, dest_path, base_path, template_text, writer=None):
+    """renders one page and returns (None, page_info), or (error message, None) so one bad page never stops the build"""
+    try:
+        info = generate_page(from_path, template_path, dest_path, base_path, template_text, writer)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", None
+    return None, info
+
+def _render_page_job(from_path, template_path, dest_path, base_path):
+    """
+    worker side of render_pages, returns the error, the page_info, the page's profiled stages and
+    what its render added to the worker's block cache (BlockCache.drain)
+    """
+    error, info = _try_generate_page(from_path, template_path, dest_path, base_path, _worker_template)
+    stages = profiler.active.pages.pop(from_path, None) if profiler.active is not None else None
+    cached = block_cache.drain() if block_cache is not None else None
+    return error, info, stages, cached
+
+def render_pages(pages, template_path, base_path, jobs=1, infos=None):
+    """
+    renders a list of (source, destination) pairs, in a process pool when jobs > 1.
+    Returns the (source, error) pairs of the pages that failed, the page_info of the others goes into infos when given
+    """
+    if jobs <= 1 or len(pages) <= 1:
+        with open(template_path, "r", encoding="utf-8") as fd:
+            template_text = fd.read()
+        # the next page renders while the writer threads write the previous ones
+        writer = pagewriter.PageWriter()
+        try:
+            results = [_try_generate_page(src, template_path, dest, base_path, template_text, writer) for src, dest in pages]
+        finally:
+            write_errors = dict(writer.close())
+        results = [(write_errors[src], None) if src in write_errors else result for (src, _), result in zip(pages, results)]
+    else:
+        sources = [src for src, _ in pages]
+        dests = [dest for _, dest in pages]
+        # hand out pages in chunks so the per-task pickling overhead stays small
+        chunksize = max(1, len(pages) // (jobs * 4))
+        cache_entries = block_cache.max_entries if block_cache is not None else 0
+        initargs = (template_path, logger.getEffectiveLevel(), profiler.active is not None, cache_entries, block_cache_path, responsive_images, search_terms)
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_init_page_worker, initargs=initargs) as pool:
+            jobs_results = list(pool.map(_render_page_job, sources, itertools.repeat(template_path), dests, itertools.repeat(base_path), chunksize=chunksize))
+        results = [(error, info) for error, info, _, _ in jobs_results]
+        # page timings and new cache entries come back from the workers and are merged into this build's
+        if profiler.active is not None:
+            for src, (_, _, stages, _) in zip(sources, jobs_results):
+                if stages is not None:
+                    profiler.active.add_page(src, stages)
+        if block_cache is not None:
+            for _, _, _, cached in jobs_results:
+                if cached is not None:
+                    block_cache.merge(*cached)
+    if infos is not None:
+        for (src, _), (_, info) in zip(pages, results):
+            if info is not None:
+                infos[src] = info
+    return [(src, err) for (src, _), (err, _) in zip(pages, results) if err is not None]
+
+def page_template_key(template_path):
+    """
+    what every page record keeps of the template and renderer it was built with: the template hash, the
+    render version and, with responsive images on, their digest. A change to any of them renders every page again
+    """
+    import manifest
+    key = f"{manifest.file_hash(template_path)}+render:{RENDER_VERSION}"
+    if responsive_images is not None:
+        # pages are rendered again with the new attributes of changed images
+        key = f"{key}+images:{responsive_images.digest}"
+    return key
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, base_path, build_manifest=None, jobs=1, site_index=None, shard=None, search_index=None, collections=None):
+    """
+    renders every markdown file under dir_path_content, using `jobs` worker processes. With a manifest only
+    pages whose markdown, template or base path changed are re-rendered and outputs of deleted sources are pruned.
+    With a site index every page's title, output, links and images are recorded in it.
+    With a search index (and search_terms on) the words of every re-rendered page replace its old ones there.
+    With collections the title and front matter of every post go into them, from the render or, for pages
+    skipped as current, from what the collections kept. Their pages are written by collections.write().
+    A shard (i, N) renders only the pages shards.page_shard puts in slice i of N.
+    Raises PageBuildError listing every failed page once all the others were written
+    """
     # get initial list of items in the source folder
     init_lst = os.listdir(dir_path_content)
-    # use helper recursive function
-    helper_fill_folder_with_html(init_lst, dir_path_content, dest_dir_path, template_path, base_path)
+    # discover every page first so they can be rendered in any order
+    pages = helper_find_markdown_pages(init_lst, dir_path_content, dest_dir_path, [])
+    if shard is not None:
+        import shards
+        pages = [(src, dest) for src, dest in pages if shards.in_shard(src, dir_path_content, shard)]
+
+    pending = []
+    hashes = {}
+    if build_manifest is None:
+        pending = pages
+    else:
+        import manifest
+        # every page this build does not visit is stale
+        build_manifest.seen_pages.clear()
+        template_hash = page_template_key(template_path)
+        for src, dest in pages:
+            hashes[src] = manifest.file_hash(src)
+            # skip pages whose markdown, template and base path are unchanged since the last build
+            if not build_manifest.page_is_current(src, hashes[src], template_hash, base_path, dest):
+                pending.append((src, dest))
+
+    infos = {}
+    errors = render_pages(pending, template_path, base_path, jobs, infos)
+
+    failed = {src for src, _ in errors}
+    if build_manifest is not None:
+        # failed pages stay out of the manifest so the next build retries them
+        for src, dest in pending:
+            if src not in failed:
+                build_manifest.record_page(src, hashes[src], template_hash, base_path, dest)
+        build_manifest.prune_pages()
+
+    if site_index is not None:
+        site_index.retain(src for src, _ in pages)
+        for src, dest in pages:
+            if src in infos:
+                site_index.record(src, dest, infos[src])
+            elif src in failed:
+                site_index.forget(src)
+            elif not site_index.has(src, dest):
+                # skipped as current but unknown to the index (first indexed build), read it without rendering
+                site_index.record(src, dest, scan_page_info(src))
+
+    if search_index is not None:
+        search_index.retain(src for src, _ in pages)
+        for src, dest in pages:
+            if src in failed:
+                search_index.forget(src)
+            elif src in infos or not search_index.has(src):
+                info = infos[src] if src in infos else scan_page_info(src)
+                search_index.record(src, page_url(dest, dest_dir_path, base_path), info["title"], info["terms"])
+
+    if collections is not None:
+        collections.retain(src for src, _ in pages)
+        for src, dest in pages:
+            if collections.collection_of(src) is None:
+                continue
+            if src in failed:
+                collections.forget(src)
+            elif src in infos:
+                # listings link root relative, the template points them at the base path
+                collections.record(src, page_url(dest, dest_dir_path, "/"), infos[src]["title"], infos[src]["meta"])
+            elif not collections.has(src):
+                collections.record(src, page_url(dest, dest_dir_path, "/"), *scan_page_meta(src))
+
+    if errors:
+        raise PageBuildError(errors)
 
 
 # lst = markdown_to_blocks("""# Tolkien Fan Club